@@ -0,0 +1,92 @@
+# benchmarks/bench_payload_builders.py
+"""Coste por mensaje de construir el cuerpo de un envío de WhatsApp.
+
+Compara, hasta los bytes que salen por la red:
+- catalog: modelos del catálogo validados en cada envío + `OutgoingMessage.build`
+  + `json.dumps` (lo que hace httpx con `json=`);
+- compiled: `CompiledMessage` validado y serializado una vez; por mensaje solo
+  se sustituyen los huecos en los bytes.
+
+Casos: una tarjeta de botones con cabecera de imagen (estática salvo `to`) y
+una plantilla con dos parámetros (lo que envía una campaña).
+
+Uso:
+    PYTHONPATH=src python benchmarks/bench_payload_builders.py [iteraciones]
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+from typing import Callable
+
+from adapters.whatsapp_business.catalog import (
+    ButtonsMessage,
+    MediaHeader,
+    OutgoingMessage,
+    ReplyButton,
+    TemplateMessage,
+)
+from adapters.whatsapp_business.compiled import CompiledMessage, slot
+
+TO = "34600000000"
+BODY = "👋 Hola!\nTu pedido está en camino. ¿Necesitas algo más?"
+
+
+def _card() -> ButtonsMessage:
+    return ButtonsMessage(
+        body_text=BODY,
+        header=MediaHeader(kind="image", link="https://example.com/pedido.png"),
+        buttons=[
+            ReplyButton(id="track", title="📦 Seguimiento"),
+            ReplyButton(id="agent", title="💬 Hablar"),
+            ReplyButton(id="ok", title="👍 Gracias"),
+        ],
+        footer_text="Tienda de ejemplo",
+    )
+
+
+def _template(name: str, order: str) -> TemplateMessage:
+    params = [{"type": "text", "text": name}, {"type": "text", "text": order}]
+    return TemplateMessage(
+        name="pedido_enviado", language_code="es", components=[{"type": "body", "parameters": params}]
+    )
+
+
+def _dumps(payload: dict) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+CARD = CompiledMessage(_card())
+TEMPLATE = CompiledMessage(_template(slot("name"), slot("order")))
+
+CASES: dict[str, tuple[Callable[[int], bytes], Callable[[int], bytes]]] = {
+    "card": (
+        lambda i: _dumps(OutgoingMessage(to=TO, component=_card()).build()),
+        lambda i: CARD.render(TO),
+    ),
+    "template": (
+        lambda i: _dumps(OutgoingMessage(to=TO, component=_template("Ana", f"#{i}")).build()),
+        lambda i: TEMPLATE.render(TO, name="Ana", order=f"#{i}"),
+    ),
+}
+
+
+def _time(fn: Callable[[int], bytes], iterations: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    return (time.perf_counter() - t0) / iterations * 1e6
+
+
+def main(iterations: int) -> None:
+    print(f"{iterations} mensajes por caso")
+    for name, (catalog, compiled) in CASES.items():
+        assert json.loads(catalog(7)) == json.loads(compiled(7))
+        a, b = _time(catalog, iterations), _time(compiled, iterations)
+        print(f"  {name:<9} catalog {a:7.2f} µs   compiled {b:6.2f} µs   x{a / b:.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
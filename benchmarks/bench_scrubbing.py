@@ -0,0 +1,68 @@
+# benchmarks/bench_scrubbing.py
+"""Coste de scrubbing por span: regex de logfire vs. decisión por clave.
+
+Genera spans "de agente" con prompts/historiales grandes en los atributos y
+mide el tiempo por span de:
+- logfire `Scrubber.scrub_span` (lo que corre hoy en cada `on_end`),
+- `AttributeScrubber` en modo denylist y allowlist (decisión cacheada por clave).
+
+Uso:
+    PYTHONPATH=src python benchmarks/bench_scrubbing.py [n_spans] [history_kb]
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+
+from logfire._internal.scrubbing import Scrubber
+from logfire._internal.utils import span_to_dict
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from observability.langfuse.configure import scrubbing_callback
+from observability.scrubbing import DEFAULT_ALLOWLIST, DEFAULT_DENYLIST, AttributeScrubber
+
+
+def _spans(n: int, history_kb: int):
+    sink = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(sink))
+    tracer = provider.get_tracer("bench")
+    turn = {"role": "user", "content": "Hola, quería saber el estado de mi pedido número 12345. " * 4}
+    history = json.dumps([turn] * max(1, history_kb * 1024 // len(json.dumps(turn))))
+    for i in range(n):
+        with tracer.start_as_current_span("agent run") as span:
+            span.set_attribute("langfuse.session.id", f"wa-{i}")
+            span.set_attribute("gen_ai.system", "openai")
+            span.set_attribute("gen_ai.request.model", "gpt-4.1-mini")
+            span.set_attribute("all_messages_events", history)
+            span.set_attribute("final_result", "Tu pedido está en reparto.")
+            span.set_attribute("http.request.header.authorization", "Bearer abc")
+    return sink.get_finished_spans()
+
+
+def _time(label: str, fn, spans) -> None:
+    t0 = time.perf_counter()
+    for s in spans:
+        fn(s)
+    us = (time.perf_counter() - t0) / len(spans) * 1e6
+    print(f"  {label:<34} {us:10.1f} µs/span")
+
+
+def main(n: int, history_kb: int) -> None:
+    spans = _spans(n, history_kb)
+    print(f"{n} spans, historial ≈{history_kb} KB por span")
+    logfire_scrubber = Scrubber(None, scrubbing_callback)
+    _time("logfire Scrubber (regex k+v)", lambda s: logfire_scrubber.scrub_span(span_to_dict(s)), spans)
+    deny = AttributeScrubber(DEFAULT_DENYLIST)
+    _time("AttributeScrubber denylist", deny.scrub_span, spans)
+    allow = AttributeScrubber(DEFAULT_ALLOWLIST, mode="allowlist")
+    _time("AttributeScrubber allowlist", allow.scrub_span, spans)
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*(args + [500, 64][len(args):]))
@@ -0,0 +1,105 @@
+# benchmarks/bench_status_ingest.py
+"""Coste por POST de los callbacks de estado de WhatsApp (tráfico de statuses).
+
+Compara, para un POST firmado con `n` statuses (sent/delivered/read
+alternos, como los que genera una campaña):
+- full: lo que hacía la ruta: HMAC + `Webhook.model_validate_json` completo +
+  `iter_messages` (vacío) + `get_memory_manager()` de la dependencia;
+- fast: HMAC + `is_status_only` sobre los bytes + `StatusWebhook` mínimo +
+  agregación en `StatusTracker` (contadores e índice wamid).
+
+Uso:
+    PYTHONPATH=src python benchmarks/bench_status_ingest.py [iteraciones] [statuses_por_post]
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import sys
+import time
+
+from adapters.whatsapp_business.handler import (
+    get_memory_manager,
+    iter_messages,
+    parse_webhook,
+    verify_whatsapp_signature,
+)
+from adapters.whatsapp_business.statuses import get_status_tracker, ingest_statuses, is_status_only
+
+SECRET = "bench-secret"
+STATES = ("sent", "delivered", "read")
+
+
+def _payload(n: int, seq: int) -> bytes:
+    statuses = [
+        {
+            "id": f"wamid.HBgLMzQ2MDAwMDAwMDAVAgARGBI{(seq * n + i) // 3:08d}",
+            "status": STATES[(seq * n + i) % 3],
+            "timestamp": "1760000000",
+            "recipient_id": "34600000000",
+            "conversation": {"id": "c0ffee", "origin": {"type": "marketing"}},
+            "pricing": {"billable": True, "pricing_model": "CBP", "category": "marketing"},
+        }
+        for i in range(n)
+    ]
+    body = {
+        "object": "whatsapp_business_account",
+        "entry": [
+            {
+                "id": "102290129340398",
+                "changes": [
+                    {
+                        "field": "messages",
+                        "value": {
+                            "messaging_product": "whatsapp",
+                            "metadata": {"display_phone_number": "15550783881", "phone_number_id": "106540352242922"},
+                            "statuses": statuses,
+                        },
+                    }
+                ],
+            }
+        ],
+    }
+    return json.dumps(body).encode()
+
+
+def full(raw: bytes, sig: str) -> None:
+    ok, _p, _e = verify_whatsapp_signature(SECRET, raw, sig)
+    assert ok
+    get_memory_manager()  # Depends(get_memory_manager) se resolvía en cada POST
+    webhook = parse_webhook(raw)
+    assert webhook is not None and not list(iter_messages(webhook))
+
+
+def fast(raw: bytes, sig: str) -> None:
+    ok, _p, _e = verify_whatsapp_signature(SECRET, raw, sig)
+    assert ok and is_status_only(raw)
+    ingest_statuses(raw)
+
+
+def _time(label: str, fn, bodies: list, iterations: int) -> None:
+    t0 = time.perf_counter()
+    for i in range(iterations):
+        raw, sig = bodies[i % len(bodies)]
+        fn(raw, sig)
+    us = (time.perf_counter() - t0) / iterations * 1e6
+    print(f"  {label:<6} {us:10.1f} µs/POST   {iterations / (time.perf_counter() - t0):10.0f} POST/s")
+
+
+def main(iterations: int, n: int) -> None:
+    bodies = []
+    for seq in range(64):
+        raw = _payload(n, seq)
+        bodies.append((raw, "sha256=" + hmac.new(SECRET.encode(), raw, hashlib.sha256).hexdigest()))
+    print(f"{iterations} POST, {n} statuses/POST ({len(bodies[0][0])} bytes)")
+    _time("full", full, bodies, iterations)
+    _time("fast", fast, bodies, iterations)
+    tracker = get_status_tracker()
+    print(f"  tracker: {dict(tracker.counts)} índice={len(tracker)}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*(args + [20000, 1][len(args):]))
@@ -0,0 +1,72 @@
+# benchmarks/bench_telegram_polling.py
+"""Throughput del long polling de Telegram contra una Bot API local.
+
+Sirve `n` updates repartidos entre `chats` desde el stand-in de tests
+(tests/standins.py) y mide cuánto tarda `TelegramPoller` en procesarlos todos
+con un turno simulado de `turn_ms`, con concurrencia 1 (equivalente a procesar
+el lote en serie) y con la concurrencia configurada.
+
+Uso:
+    PYTHONPATH=src python benchmarks/bench_telegram_polling.py [updates] [chats] [turn_ms] [concurrencia]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests"))
+
+from standins import StandInServer  # noqa: E402
+
+from adapters.telegram.polling import TelegramPoller  # noqa: E402
+from infrastructure.http import HttpClientPool  # noqa: E402
+
+
+async def _run(updates: list, turn_s: float, concurrency: int) -> float:
+    async def bot_api(req):
+        body = req.json() or {}
+        offset = body.get("offset", 0)
+        result = [u for u in updates if u["update_id"] >= offset][: body.get("limit", 100)]
+        if not result:
+            await asyncio.sleep(0.01)
+        return 200, {"Content-Type": "application/json"}, json.dumps({"ok": True, "result": result}).encode()
+
+    async def handle(update):
+        await asyncio.sleep(turn_s)
+
+    async with StandInServer(bot_api) as srv:
+        pool = HttpClientPool()
+        poller = TelegramPoller(
+            "bench", handle=handle, client=pool.get("telegram"), api_base_url=srv.url,
+            poll_timeout_s=1, concurrency=concurrency, max_pending=len(updates),
+        )
+        t0 = time.perf_counter()
+        await poller.start(delete_webhook=False)
+        while poller.processed < len(updates):
+            await asyncio.sleep(0.001)
+        elapsed = time.perf_counter() - t0
+        await poller.stop()
+        await pool.aclose()
+    return elapsed
+
+
+async def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    chats = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    turn_s = (float(sys.argv[3]) if len(sys.argv) > 3 else 20.0) / 1000
+    concurrency = int(sys.argv[4]) if len(sys.argv) > 4 else 16
+    updates = [
+        {"update_id": i + 1, "message": {"chat": {"id": i % chats}, "text": f"m{i}"}} for i in range(n)
+    ]
+    print(f"{n} updates, {chats} chats, turno {turn_s * 1000:.0f} ms")
+    for label, c in (("serie", 1), (f"concurrencia {concurrency}", concurrency)):
+        elapsed = await _run(updates, turn_s, c)
+        print(f"{label:>16}: {elapsed:7.2f} s  {n / elapsed:8.1f} updates/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+# benchmarks/bench_traced_tool.py
+"""Overhead por llamada de `traced_tool` según la política de trazas.
+
+Compara la serialización antigua (str() de args/kwargs/resultado, RunContext
+completo con deps e historial) con la política acotada, con sampling y con
+el camino no-op. Usa un TracerProvider en memoria (sin red) para medir solo
+el coste en proceso.
+
+Uso:
+    PYTHONPATH=src python benchmarks/bench_traced_tool.py [n_calls]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+from functools import wraps
+
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from pydantic_ai import RunContext
+from pydantic_ai.messages import ModelRequest, UserPromptPart
+from pydantic_ai.models.test import TestModel
+from pydantic_ai.usage import RunUsage
+
+from core.deps import Deps
+from observability.langfuse import tracing
+from observability.langfuse.tracing import TracingPolicy, traced_tool
+
+exporter = InMemorySpanExporter()
+provider = TracerProvider()
+provider.add_span_processor(SimpleSpanProcessor(exporter))
+tracing.tracer = provider.get_tracer("bench")
+
+
+def legacy_traced_tool(tool_name: str):
+    """Comportamiento anterior: str() eager de todo en cada llamada."""
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with tracing.tracer.start_as_current_span(f"tool:{tool_name}") as span:
+                span.set_attribute("tool.args", str(args))
+                span.set_attribute("tool.kwargs", str(kwargs))
+                try:
+                    result = await func(*args, **kwargs)
+                    span.set_attribute("tool.result", str(result))
+                    return result
+                except Exception as e:
+                    span.record_exception(e)
+                    span.set_status(trace.Status(trace.StatusCode.ERROR, str(e)))
+                    raise
+
+        return wrapper
+
+    return decorator
+
+
+async def _tool(ctx: RunContext[Deps], payload: str = "") -> str:
+    return f"TOOL_OK: {payload}"
+
+
+def _context(history_len: int = 30) -> RunContext[Deps]:
+    history = [ModelRequest(parts=[UserPromptPart("mensaje de usuario " * 40)]) for _ in range(history_len)]
+    return RunContext(deps=Deps(extra={"catalogo": list(range(500))}), model=TestModel(), usage=RunUsage(), messages=history)
+
+
+async def _bench(fn, ctx, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        await fn(ctx, payload="consulta")
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+async def main(n: int) -> None:
+    ctx = _context()
+    cases = [
+        ("baseline (sin decorador)", None, _tool),
+        ("legacy str() eager", None, legacy_traced_tool("bench")(_tool)),
+        ("policy summary 100%", TracingPolicy(), traced_tool("bench")(_tool)),
+        ("policy summary 10% + tail", TracingPolicy(sample_rate=0.1), traced_tool("bench")(_tool)),
+        ("policy disabled (no-op)", TracingPolicy(enabled=False), traced_tool("bench")(_tool)),
+    ]
+    print(f"{n} llamadas por caso, historial de {len(ctx.messages)} mensajes")
+    for label, policy, fn in cases:
+        tracing.set_tracing_policy(policy)
+        await _bench(fn, ctx, min(n, 200))  # calentamiento
+        exporter.clear()
+        us = await _bench(fn, ctx, n)
+        attr_bytes = sum(len(str(v)) for s in exporter.get_finished_spans() for v in (s.attributes or {}).values())
+        per_span = attr_bytes // max(1, len(exporter.get_finished_spans()))
+        print(f"  {label:<28} {us:8.1f} µs/llamada   spans={len(exporter.get_finished_spans()):>6}  attrs≈{per_span} B/span")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
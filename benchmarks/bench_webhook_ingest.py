@@ -0,0 +1,111 @@
+# benchmarks/bench_webhook_ingest.py
+"""Coste por petición de la ingesta del webhook de WhatsApp.
+
+Compara, para un POST firmado con `n` mensajes:
+- legacy: HMAC sobre los bytes + `json.loads` (lo que hacía `request.json()`)
+  + extracción a mano sobre dicts;
+- typed: HMAC + `Webhook.model_validate_json` (un solo parseo, directo a
+  modelos) + `iter_messages` / `extract_user_text` tipados.
+
+La validación tipada no es gratis (≈10-20 µs más por POST de 1 mensaje frente
+a dicts sin validar); a cambio el cuerpo se parsea una vez, los tipos
+desconocidos no rompen nada y no hay KeyError por campos ausentes. El coste es
+despreciable frente a un turno del LLM; este script permite vigilarlo.
+
+Uso:
+    PYTHONPATH=src python benchmarks/bench_webhook_ingest.py [iteraciones] [mensajes_por_post]
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import sys
+import time
+
+from adapters.whatsapp_business.handler import (
+    extract_user_text,
+    iter_messages,
+    parse_webhook,
+    verify_whatsapp_signature,
+)
+
+SECRET = "bench-secret"
+
+
+def _payload(n: int) -> bytes:
+    messages = [
+        {
+            "from": f"3460000{i:04d}",
+            "id": f"wamid.HBgLMzQ2MDAwMDAwMDAVAgASGBQzQUJDREVGMDEyMzQ1Njc4OUFC{i}",
+            "timestamp": "1760000000",
+            "type": "text",
+            "text": {"body": "Hola, quería saber el estado de mi pedido número 12345"},
+        }
+        for i in range(n)
+    ]
+    body = {
+        "object": "whatsapp_business_account",
+        "entry": [
+            {
+                "id": "102290129340398",
+                "changes": [
+                    {
+                        "field": "messages",
+                        "value": {
+                            "messaging_product": "whatsapp",
+                            "metadata": {"display_phone_number": "15550783881", "phone_number_id": "106540352242922"},
+                            "contacts": [{"profile": {"name": "Cliente"}, "wa_id": m["from"]} for m in messages],
+                            "messages": messages,
+                        },
+                    }
+                ],
+            }
+        ],
+    }
+    return json.dumps(body).encode()
+
+
+def legacy(raw: bytes, sig: str) -> list:
+    ok, _p, _e = verify_whatsapp_signature(SECRET, raw, sig)
+    assert ok
+    body = json.loads(raw)  # request.json() volvía a parsear los bytes ya leídos
+    out = []
+    for entry in body.get("entry") or []:
+        for change in entry.get("changes") or []:
+            value = change.get("value") or {}
+            for msg in value.get("messages") or []:
+                out.append((msg.get("from"), msg["text"]["body"]))
+    return out
+
+
+def typed(raw: bytes, sig: str) -> list:
+    ok, _p, _e = verify_whatsapp_signature(SECRET, raw, sig)
+    assert ok
+    webhook = parse_webhook(raw)
+    assert webhook is not None
+    return [(wa_id, extract_user_text(msg)) for wa_id, msg in iter_messages(webhook)]
+
+
+def _time(label: str, fn, raw: bytes, sig: str, iterations: int) -> None:
+    fn(raw, sig)
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        fn(raw, sig)
+    us = (time.perf_counter() - t0) / iterations * 1e6
+    print(f"  {label:<10} {us:10.1f} µs/petición")
+
+
+def main(iterations: int, n: int) -> None:
+    raw = _payload(n)
+    sig = "sha256=" + hmac.new(SECRET.encode(), raw, hashlib.sha256).hexdigest()
+    assert legacy(raw, sig) == typed(raw, sig)
+    print(f"{iterations} peticiones, {n} mensajes/POST ({len(raw)} bytes)")
+    _time("legacy", legacy, raw, sig, iterations)
+    _time("typed", typed, raw, sig, iterations)
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*(args + [5000, 1][len(args):]))
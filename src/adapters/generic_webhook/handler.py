@@ -1,7 +1,34 @@
+# src/adapters/generic_webhook/handler.py
+"""Webhook genérico para integraciones internas (APIRouter).
+
+- `POST /generic-webhook`: un mensaje → un turno del grafo (`run_turn` →
+  `run_with_memory`, canal "generic") y la respuesta en el cuerpo.
+- `POST /generic-webhook/batch`: una lista de `{session_id, message}` en una
+  sola petición (procesos de back-office masivos sin un round trip por
+  mensaje). Sesiones distintas en paralelo, como mucho
+  `generic_webhook_batch_concurrency` turnos a la vez; los mensajes de una
+  misma sesión van en orden (comparten historial). Los resultados vuelven en
+  el orden de entrada y un fallo solo afecta a su elemento.
+
+Auth: header `x-api-key`; si `generic_webhook_api_key` está configurada debe
+coincidir, si no basta con que exista (template).
+"""
+
 from __future__ import annotations
-from fastapi import APIRouter, Header, HTTPException
+
+import asyncio
+import hmac
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException
 from pydantic import BaseModel
 
+from core.memory import get_memory_store, get_usage_store
+from core.memory.manager import HistoryStore, MemoryManager
+from core.runtime import run_turn
+from infrastructure.settings import settings
+
 router = APIRouter()
 
 GENERIC_HEADER = "x-api-key"
@@ -13,13 +40,81 @@ class WebhookIn(BaseModel):
 class WebhookOut(BaseModel):
     response: str
 
+class BatchItemOut(BaseModel):
+    session_id: str
+    response: Optional[str] = None
+    error: Optional[str] = None  # tipo de la excepción si el turno falló
+
+class BatchOut(BaseModel):
+    results: List[BatchItemOut]
+
 def _check_api_key(x_api_key: str | None) -> None:
-    # En el template dummy, basta con comprobar que existe el header
     if not x_api_key:
         raise HTTPException(status_code=401, detail="Missing x-api-key")
+    expected = settings.generic_webhook_api_key
+    if expected and not hmac.compare_digest(x_api_key.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Invalid x-api-key")
+
+
+def get_memory_manager() -> MemoryManager:
+    """Crear MemoryManager con el/los store(s) configurados."""
+    base_store = get_memory_store()
+    stores: list[HistoryStore] = []
+    if isinstance(base_store, list):
+        stores.extend(base_store)
+    elif base_store is not None:
+        stores.append(base_store)
+    return MemoryManager(store=stores, usage=get_usage_store())
+
 
 @router.post("/generic-webhook", response_model=WebhookOut)
-async def generic_webhook(payload: WebhookIn, x_api_key: str | None = Header(None, alias=GENERIC_HEADER)):
+async def generic_webhook(
+    payload: WebhookIn,
+    x_api_key: str | None = Header(None, alias=GENERIC_HEADER),
+    mm: MemoryManager = Depends(get_memory_manager),
+):
+    _check_api_key(x_api_key)
+    reply, _history = await run_turn(mm, payload.session_id, payload.message, channel="generic")
+    return WebhookOut(response=reply)
+
+
+async def run_batch(
+    items: List[WebhookIn], mm: MemoryManager, *, concurrency: int
+) -> List[BatchItemOut]:
+    """Un turno por elemento: sesiones en paralelo (acotado), orden dentro de cada sesión."""
+    sem = asyncio.Semaphore(max(1, concurrency))
+    by_session: Dict[str, List[int]] = {}
+    for i, item in enumerate(items):
+        by_session.setdefault(item.session_id, []).append(i)
+
+    async def _one(item: WebhookIn) -> BatchItemOut:
+        async with sem:
+            try:
+                reply, _history = await run_turn(mm, item.session_id, item.message, channel="generic")
+            except Exception as e:  # un elemento fallido no tumba el lote
+                logging.exception("generic batch: fallo en la sesión %s: %s", item.session_id, e)
+                return BatchItemOut(session_id=item.session_id, error=type(e).__name__)
+            return BatchItemOut(session_id=item.session_id, response=reply)
+
+    async def _session(indices: List[int]) -> List[Tuple[int, BatchItemOut]]:
+        return [(i, await _one(items[i])) for i in indices]
+
+    per_session = await asyncio.gather(*(_session(indices) for indices in by_session.values()))
+    results = dict(pair for pairs in per_session for pair in pairs)
+    return [results[i] for i in range(len(items))]
+
+
+@router.post("/generic-webhook/batch", response_model=BatchOut)
+async def generic_webhook_batch(
+    payload: List[WebhookIn],
+    x_api_key: str | None = Header(None, alias=GENERIC_HEADER),
+    mm: MemoryManager = Depends(get_memory_manager),
+):
     _check_api_key(x_api_key)
-    # Respuesta mínima para smoke tests
-    return WebhookOut(response=f"Agente dummy recibió: {payload.message}")
+    if len(payload) > settings.generic_webhook_batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large (max {settings.generic_webhook_batch_max_items} items)",
+        )
+    results = await run_batch(payload, mm, concurrency=settings.generic_webhook_batch_concurrency)
+    return BatchOut(results=results)
@@ -2,8 +2,8 @@
 """Telegram webhook handler (APIRouter). Opción A mínima.
 
 - Config vía os.environ (migrar a settings en Opción B).
-- Grafo creado en import (migrar a carga perezosa en Opción B).
-- Envío directo a la API de Telegram (migrar a sender.py + puerto MessageSender en Opción B).
+- Grafo perezoso vía core.runtime (se construye en la 1ª petición o en el warm-up).
+- Envío vía adapters/telegram/sender.py (puerto MessageSender, pool + rate limit compartidos).
 
 Si no hay TELEGRAM_BOT_TOKEN:
 - El router puede seguir montado (recibe webhooks), pero el envío será NO-OP (no envía).
@@ -13,18 +13,20 @@ Si no hay TELEGRAM_BOT_TOKEN:
 from fastapi import APIRouter, Depends, HTTPException, Header
 from pydantic import BaseModel
 import os
-import httpx
-from typing import Optional
-from core.memory import get_memory_store
+from functools import partial
+from typing import Any, Callable, Optional
+from core.memory import get_memory_store, get_usage_store
 from core.memory.manager import MemoryManager, HistoryStore
-from core.graph import create_graph, run_with_memory
+from core.runtime import run_turn
+from adapters.telegram.sender import telegram_sender
+from infrastructure.http import http_clients
+from infrastructure.dedup import get_deduplicator, safe_remember_reply
+from infrastructure.inbound import InboundJob, get_inbound_pool, register_job_handler
+from infrastructure.presence import PresenceNotifier, maybe_during
+from infrastructure.settings import settings
 
 router = APIRouter()
 
-# ⚠️ Opción A: carga del grafo en import (rápido, pero puede ser costoso).
-# 👉 Opción B: usa un singleton perezoso get_graph_and_deps() para inicializar on-demand.
-graph, deps = create_graph()
-
 # ⚠️ Opción A: config vía env (simple).
 # 👉 Opción B: mover a infrastructure/settings.py con env_prefix BLAKIA_*
 TELEGRAM_BOT_TOKEN: Optional[str] = os.environ.get("TELEGRAM_BOT_TOKEN")
@@ -33,7 +35,7 @@ TELEGRAM_SECRET_TOKEN: Optional[str] = os.environ.get("TELEGRAM_SECRET_TOKEN")
 TELEGRAM_API_BASE: Optional[str]
 
 if TELEGRAM_BOT_TOKEN:
-    TELEGRAM_API_BASE = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
+    TELEGRAM_API_BASE = f"{settings.telegram_api_base_url.rstrip('/')}/bot{TELEGRAM_BOT_TOKEN}"
 else:
     TELEGRAM_API_BASE = None  # sin token → API deshabilitada (NO-OP al enviar)
     # También puedes evitar montar el router desde infrastructure.server.
@@ -69,26 +71,63 @@ def get_memory_manager() -> MemoryManager:
         stores.extend(base_store)
     elif base_store is not None:
         stores.append(base_store)
-    return MemoryManager(store=stores)
+    return MemoryManager(store=stores, usage=get_usage_store())
 
 
-async def tg_send_text(chat_id: int | str, text: str) -> None:
-    """Opción A: envío directo vía API de Telegram.
+async def tg_send_text(
+    chat_id: int | str,
+    text: str,
+    *,
+    start: int = 0,
+    on_sent: Optional[Callable[[int], Any]] = None,
+) -> None:
+    """Envía `text` vía `TelegramMessageSender` (pool compartido + limitador).
 
-    👉 Opción B: mover a adapters/telegram/sender.py e implementar el puerto MessageSender.
+    Textos de más de 4096 (UTF-16) se trocean y se envían en orden; `start`
+    salta los trozos ya entregados (reenvío tras un fallo parcial).
     """
-    if not TELEGRAM_API_BASE:
+    sender = telegram_sender() if TELEGRAM_API_BASE else None
+    if sender is None:
         # NO-OP si no hay token; el servidor sigue funcionando.
         # (Recomendado además: no montar este router si no hay token.)
         print("⚠️ Telegram disabled: no TELEGRAM_BOT_TOKEN configured; skipping send.")
         return
+    await sender.send_text(str(chat_id), text, start=start, on_sent=on_sent)
+
+
+async def tg_send_chat_action(chat_id: int | str, action: str = "typing") -> None:
+    """Chat action (p. ej. "escribiendo…", dura 5 s o hasta el siguiente mensaje). Best effort."""
+    if not TELEGRAM_API_BASE:
+        return
+    r = await http_clients.get("telegram").post(
+        f"{TELEGRAM_API_BASE}/sendChatAction",
+        json={"chat_id": chat_id, "action": action},
+        timeout=5,
+    )
+    r.raise_for_status()
+
+
+async def _presence_ping(chat_id: str, _ctx: Any) -> None:
+    await tg_send_chat_action(chat_id)
+
+
+_presence: Optional[PresenceNotifier] = None
 
-    async with httpx.AsyncClient(timeout=10) as client:
-        r = await client.post(
-            f"{TELEGRAM_API_BASE}/sendMessage",
-            json={"chat_id": chat_id, "text": text},
+
+def telegram_presence() -> Optional[PresenceNotifier]:
+    """Notifier de presencia compartido (None si `presence_enabled` es False o no hay token)."""
+    global _presence
+    if not settings.presence_enabled or not TELEGRAM_API_BASE:
+        return None
+    if _presence is None:
+        _presence = PresenceNotifier(
+            "telegram",
+            _presence_ping,
+            interval_s=settings.telegram_typing_refresh_s,
+            min_gap_s=settings.presence_min_gap_s,
+            exit_wait_s=settings.presence_exit_wait_s,
         )
-        r.raise_for_status()
+    return _presence
 
 
 def _extract_chat_and_text(update: TGUpdate) -> tuple[int | None, str | None]:
@@ -102,6 +141,35 @@ def _extract_chat_and_text(update: TGUpdate) -> tuple[int | None, str | None]:
     return chat_id, text
 
 
+async def accept_update(payload: TGUpdate) -> Optional[InboundJob]:
+    """Update → InboundJob listo para `process_update`.
+
+    None si no hay nada que procesar: update sin texto, comando ya respondido
+    o reintento de un update ya procesado (o en curso). Común al webhook y al
+    long polling (adapters.telegram.polling).
+    """
+    chat_id, text = _extract_chat_and_text(payload)
+    if not chat_id or not text:
+        return None
+
+    # Comandos simples (ejemplo mínimo)
+    if text.strip().lower() in {"/start", "start"}:
+        await tg_send_text(chat_id, "¡Hola! Envía tu consulta.")
+        return None
+
+    # Usamos el chat_id como session_id para mantener memoria por conversación
+    job = InboundJob(channel="telegram", session_id=str(chat_id), text=text, meta={"chat_id": chat_id})
+    dedup = get_deduplicator()
+    if dedup is not None and payload.update_id is not None:
+        job.meta["dedup_key"] = f"telegram:{payload.update_id}"
+        fresh, cached_reply = dedup.claim(job.meta["dedup_key"], "telegram")
+        if not fresh:
+            return None  # reintento de un update ya procesado o en curso
+        if cached_reply is not None:
+            job.meta["cached_reply"] = cached_reply
+    return job
+
+
 @router.post("/webhook")
 async def telegram_webhook(
     payload: TGUpdate,
@@ -109,24 +177,67 @@ async def telegram_webhook(
     mm: MemoryManager = Depends(get_memory_manager),
 ):
     """Procesa un Update de Telegram y responde usando tu grafo."""
-    chat_id, text = _extract_chat_and_text(payload)
-    if not chat_id or not text:
+    job = await accept_update(payload)
+    if job is None:
         # Nada que procesar: confirmamos para que Telegram no reintente en bucle.
         return {"ok": True}
 
-    # Comandos simples (ejemplo mínimo)
-    if text.strip().lower() in {"/start", "start"}:
-        await tg_send_text(chat_id, "¡Hola! Envía tu consulta.")
-        return {"ok": True}
+    pool = get_inbound_pool()
+    if pool is None:
+        await process_update(job, mm)
+    elif not await pool.submit(job):
+        dedup = get_deduplicator()
+        if dedup is not None and "cached_reply" in job.meta:
+            dedup.unlease(job.meta.get("dedup_key"))  # se conserva la respuesta para el reintento
+        elif dedup is not None:
+            dedup.release(job.meta.get("dedup_key"))
+        # Backpressure: Telegram reintenta los updates no confirmados
+        raise HTTPException(status_code=503, detail="Inbound queue full")
 
-    # Usamos el chat_id como session_id para mantener memoria por conversación
-    session_id = str(chat_id)
+    # Telegram espera 200 OK; devolver JSON es opcional
+    return {"ok": True}
 
-    reply, _history = await run_with_memory(graph, deps, mm, session_id, text)
 
-    # En Opción A respondemos enviando un mensaje posterior vía API (NO-OP si no hay token).
-    await tg_send_text(chat_id, reply)
+async def process_update(job: InboundJob, mm: Optional[MemoryManager] = None) -> None:
+    """Ejecuta el turno de un mensaje de Telegram y envía la respuesta.
+
+    Como en WhatsApp, la respuesta ya calculada queda en el dedup: una
+    reentrega de la cola duradera tras un envío fallido la reenvía desde el
+    primer trozo pendiente sin repetir el turno.
+    """
+    dedup_key = job.meta.get("dedup_key")
+    dedup = get_deduplicator() if dedup_key else None
+    reply = job.meta.get("cached_reply")
+    if reply is None and dedup is not None:
+        reply = dedup.reply(dedup_key)  # reentrega tras un envío fallido
+        if reply is not None and not dedup.lease(dedup_key):
+            return  # otro intento ya está reenviando la respuesta
+    resend = reply is not None
+    try:
+        if reply is None:
+            chat_id = job.meta.get("chat_id", job.session_id)
+            async with maybe_during(telegram_presence(), str(chat_id)):
+                reply, _history = await run_turn(
+                    mm or get_memory_manager(), job.session_id, job.text, channel="telegram"
+                )
+            safe_remember_reply(dedup, dedup_key, reply)
+
+        # En Opción A respondemos enviando un mensaje posterior vía API (NO-OP si no hay token).
+        start = dedup.progress(dedup_key) if dedup is not None and resend else 0
+        await tg_send_text(
+            job.meta.get("chat_id", job.session_id),
+            reply,
+            start=start,
+            on_sent=partial(dedup.mark_progress, dedup_key) if dedup is not None else None,
+        )
+    except BaseException:  # también CancelledError (stop() del polling): el claim no debe quedar colgado
+        if dedup is not None and reply is None:
+            dedup.release(dedup_key)  # sin respuesta: el reintento debe volver a procesarse
+        elif dedup is not None:
+            dedup.unlease(dedup_key)  # envío fallido: el reintento reenvía la respuesta
+        raise
+    if dedup is not None:
+        dedup.mark_sent(dedup_key)
 
-    # Telegram espera 200 OK; devolver JSON es opcional
-    return {"ok": True}
 
+register_job_handler("telegram", process_update)
@@ -0,0 +1,275 @@
+# src/adapters/telegram/polling.py
+"""Ingesta de Telegram por long polling (`getUpdates`), alternativa al webhook.
+
+Para despliegues sin URL pública: con `telegram_ingest_mode = "polling"` el
+lifespan arranca un `TelegramPoller` (o, en un proceso aparte,
+`PYTHONPATH=src python -m adapters.telegram.polling`).
+
+- Long polling: `getUpdates` espera hasta `telegram_poll_timeout_s` a que haya
+  updates y devuelve hasta `telegram_poll_limit` de golpe.
+- Confirmación por lotes: el `offset` de cada llamada confirma de una vez
+  todos los updates anteriores ya terminados. Solo avanza hasta el update
+  más antiguo aún en curso (marca de agua contigua): lo que estaba en vuelo
+  al caer o parar el proceso no se confirma y Telegram lo reentrega (el
+  dedup descarta lo que ya se había respondido).
+- Concurrencia entre chats, orden dentro de cada chat: cada update espera al
+  anterior de su chat y un semáforo acota los turnos en paralelo
+  (`telegram_poll_concurrency`).
+- Backpressure: con `telegram_poll_max_pending` updates sin terminar se deja
+  de pedir más; los no confirmados esperan en Telegram.
+- Mismo pipeline que el webhook: `accept_update` (comandos, dedup) y
+  `process_update` (presencia, `run_turn`, envío troceado).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import signal
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from adapters.telegram.handler import TGUpdate, accept_update, process_update
+from adapters.telegram.sender import TelegramAPIError
+from infrastructure.http import http_clients
+from infrastructure.ratelimit import backoff_delay
+from infrastructure.settings import settings
+from observability.metrics import QUEUE_DEPTH, TELEGRAM_POLLS, TELEGRAM_UPDATES, bound
+
+UpdateHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+ALLOWED_UPDATES = ["message", "edited_message", "channel_post"]
+IN_FLIGHT_WAIT_S = 1.0  # con updates sin confirmar no hay long poll: latencia máxima para los nuevos
+
+
+async def handle_update(update: Dict[str, Any]) -> None:
+    """Procesa un update crudo con el mismo pipeline que el webhook."""
+    job = await accept_update(TGUpdate.model_validate(update))
+    if job is not None:
+        await process_update(job)
+
+
+def _chat_key(update: Dict[str, Any]) -> str:
+    for kind in ALLOWED_UPDATES:
+        msg = update.get(kind)
+        if isinstance(msg, dict) and isinstance(msg.get("chat"), dict) and "id" in msg["chat"]:
+            return str(msg["chat"]["id"])
+    return f"update:{update.get('update_id')}"  # sin chat: no hay orden que respetar
+
+
+class TelegramPoller:
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        *,
+        handle: UpdateHandler = handle_update,
+        client: Optional[httpx.AsyncClient] = None,
+        api_base_url: Optional[str] = None,
+        poll_timeout_s: int = 25,
+        limit: int = 100,
+        concurrency: int = 16,
+        max_pending: int = 1000,
+        allowed_updates: Optional[List[str]] = None,
+    ):
+        token = token or settings.telegram_bot_token
+        if not token:
+            raise ValueError("TelegramPoller requiere un bot token")
+        base = (api_base_url or settings.telegram_api_base_url).rstrip("/")
+        self.api_base = f"{base}/bot{token}"
+        self.handle = handle
+        self.client = client
+        self.poll_timeout_s = poll_timeout_s
+        self.limit = max(1, min(100, limit))
+        self.max_pending = max(1, max_pending)
+        self.allowed_updates = allowed_updates or ALLOWED_UPDATES
+        self._seen: Optional[int] = None  # mayor update_id lanzado
+        self.processed = 0
+        self._sem = asyncio.Semaphore(max(1, concurrency))
+        self._pending: Dict[int, asyncio.Task[None]] = {}
+        self._tails: Dict[str, asyncio.Task[None]] = {}  # último update en curso de cada chat
+        self._stop = asyncio.Event()
+        self._task: Optional[asyncio.Task[None]] = None
+        self._depth = bound(QUEUE_DEPTH, "telegram_polling")
+
+    @classmethod
+    def from_settings(cls, **kwargs: Any) -> "TelegramPoller":
+        return cls(
+            poll_timeout_s=settings.telegram_poll_timeout_s,
+            limit=settings.telegram_poll_limit,
+            concurrency=settings.telegram_poll_concurrency,
+            max_pending=settings.telegram_poll_max_pending,
+            **kwargs,
+        )
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def offset(self) -> Optional[int]:
+        """Siguiente `offset` a enviar: confirma todo lo anterior al update en curso más antiguo."""
+        if self._pending:
+            return min(self._pending)
+        return None if self._seen is None else self._seen + 1
+
+    async def _call(self, method: str, body: Dict[str, Any], timeout: float) -> Any:
+        client = self.client or http_clients.get("telegram")
+        resp = await client.post(f"{self.api_base}/{method}", json=body, timeout=timeout)
+        try:
+            data = resp.json()
+        except Exception:
+            data = {"ok": False, "description": resp.text}
+        if resp.status_code >= 400 or not isinstance(data, dict) or not data.get("ok"):
+            description = str(data.get("description", "")) if isinstance(data, dict) else ""
+            raise TelegramAPIError(resp.status_code, description)
+        return data.get("result")
+
+    async def poll_once(self, timeout_s: Optional[int] = None) -> int:
+        """Un `getUpdates`: confirma el lote anterior y lanza el nuevo; devuelve cuántos lanzó."""
+        timeout_s = self.poll_timeout_s if timeout_s is None else timeout_s
+        body: Dict[str, Any] = {"timeout": timeout_s, "limit": self.limit, "allowed_updates": self.allowed_updates}
+        offset = self.offset
+        if offset is not None:
+            body["offset"] = offset
+            if self._pending:
+                body["timeout"] = 0  # hay updates sin confirmar: Telegram respondería al momento
+        updates = await self._call("getUpdates", body, timeout=timeout_s + 10)
+        started = 0
+        for update in updates or []:
+            update_id = update.get("update_id") if isinstance(update, dict) else None
+            if not isinstance(update_id, int):
+                continue
+            if self._seen is not None and update_id <= self._seen:
+                # aún en curso (sin confirmar) o reentrega de algo ya terminado
+                if update_id not in self._pending:
+                    bound(TELEGRAM_UPDATES, "duplicate").inc()
+                continue
+            self._seen = update_id
+            self._start(update_id, update)
+            started += 1
+        bound(TELEGRAM_POLLS, "ok" if started else "empty").inc()
+        self._depth.set(len(self._pending))
+        if not started and self._pending:
+            # solo updates en curso: se espera a que termine alguno (como mucho
+            # IN_FLIGHT_WAIT_S) antes de volver a preguntar, sin bucle activo
+            await asyncio.wait(set(self._pending.values()), timeout=IN_FLIGHT_WAIT_S, return_when=asyncio.FIRST_COMPLETED)
+        return started
+
+    def _start(self, update_id: int, update: Dict[str, Any]) -> None:
+        chat = _chat_key(update)
+        task = asyncio.create_task(self._process(update, self._tails.get(chat)))
+        self._pending[update_id] = task
+        self._tails[chat] = task
+        task.add_done_callback(partial(self._finished, update_id, chat))
+
+    async def _process(self, update: Dict[str, Any], previous: Optional[asyncio.Task[None]]) -> None:
+        if previous is not None:
+            await asyncio.wait([previous])  # orden dentro del chat (un fallo previo no bloquea)
+        async with self._sem:
+            try:
+                await self.handle(update)
+            except Exception as e:  # un update fallido no debe parar el bucle
+                logging.exception("telegram polling: fallo procesando update %s: %s", update.get("update_id"), e)
+                bound(TELEGRAM_UPDATES, "error").inc()
+            else:
+                bound(TELEGRAM_UPDATES, "ok").inc()
+                self.processed += 1
+
+    def _finished(self, update_id: int, chat: str, task: asyncio.Task[None]) -> None:
+        self._pending.pop(update_id, None)
+        if self._tails.get(chat) is task:
+            del self._tails[chat]
+        self._depth.set(len(self._pending))
+
+    async def run(self) -> None:
+        """Bucle de long polling hasta `stop()`."""
+        attempt = 0
+        while not self._stop.is_set():
+            if len(self._pending) >= self.max_pending:
+                # backpressure: sin confirmar más hasta que termine alguno
+                await asyncio.wait(set(self._pending.values()), return_when=asyncio.FIRST_COMPLETED)
+                continue
+            try:
+                await self.poll_once()
+                attempt = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 409: hay un webhook configurado u otro proceso haciendo polling
+                attempt += 1
+                bound(TELEGRAM_POLLS, "error").inc()
+                logging.warning("telegram polling: getUpdates falló (%d): %s", attempt, e)
+                await asyncio.sleep(backoff_delay(attempt, 1.5, 30.0))
+
+    async def start(self, *, delete_webhook: bool = True) -> None:
+        """Lanza `run()` en segundo plano (getUpdates no funciona con un webhook activo)."""
+        if self._task is not None:
+            return
+        if delete_webhook:
+            try:
+                await self._call("deleteWebhook", {"drop_pending_updates": False}, timeout=10)
+            except Exception as e:
+                logging.warning("telegram polling: deleteWebhook falló: %s", e)
+        self._stop.clear()
+        self._task = asyncio.create_task(self.run(), name="telegram-poller")
+
+    async def stop(self, drain_timeout_s: float = 20.0) -> int:
+        """Para el bucle, drena los updates en curso y confirma el último lote.
+
+        Devuelve cuántos updates quedaron sin terminar.
+        """
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()  # corta el long poll en vuelo: lo no confirmado se reentrega
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._pending:
+            await asyncio.wait(set(self._pending.values()), timeout=drain_timeout_s)
+        left = len(self._pending)
+        # lo que no terminó no se confirma: Telegram lo reentrega al volver
+        ack = self.offset
+        for task in list(self._pending.values()):
+            task.cancel()
+        if ack is not None:
+            try:  # timeout=0, limit=1: solo confirma, lo devuelto se ignora
+                await self._call("getUpdates", {"offset": ack, "timeout": 0, "limit": 1}, timeout=10)
+            except Exception as e:
+                logging.warning("telegram polling: no se pudo confirmar el último lote: %s", e)
+        return left
+
+
+async def serve() -> None:
+    """Proceso dedicado de long polling (sin servidor HTTP)."""
+    from infrastructure.presence import aclose_presence
+    from infrastructure.startup import configure_observability
+
+    try:
+        configure_observability()
+    except Exception as e:  # la observabilidad nunca debe tumbar el proceso
+        logging.exception("configure_observability failed: %s", e)
+    poller = TelegramPoller.from_settings()
+    loop = asyncio.get_running_loop()
+    done = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, done.set)
+    await poller.start()
+    logging.info("telegram polling: %s", settings.telegram_api_base_url)
+    try:
+        await done.wait()
+    finally:
+        left = await poller.stop(settings.inbound_drain_timeout_s)
+        if left:
+            logging.warning("telegram polling: %d updates sin terminar al apagar", left)
+        await aclose_presence()
+        await http_clients.aclose()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# src/adapters/telegram/sender.py
+"""Implementación Telegram del puerto `ports.messages.MessageSender`.
+
+- Pool compartido (keep-alive) `http_clients.get("telegram")`, no un cliente
+  por mensaje.
+- Límite compartido global del bot (~30 msg/s) y por chat (~1 msg/s, con
+  ráfagas cortas): Redis si `rate_limit_backend=redis`, así se cumple entre
+  réplicas.
+- 429: se espera `parameters.retry_after` (frenando ese chat en el limitador,
+  para que los demás envíos al chat también esperen) y se reintenta; 5xx y
+  errores de red con backoff exponencial.
+- Latencia por llamada (`agent_outbound_send_seconds{channel="telegram"}`) y
+  reintentos por motivo.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import httpx
+
+from infrastructure.chunking import TELEGRAM_TEXT_LIMIT, send_ordered, split_text, utf16_len
+from infrastructure.http import http_clients
+from infrastructure.ratelimit import RedisTokenBucket, SendLimiter, TokenBucket, backoff_delay
+from infrastructure.settings import settings
+from observability.metrics import OUTBOUND_RETRIES, OUTBOUND_SEND_ERRORS, OUTBOUND_SEND_SECONDS, bound, timed
+from ports.messages import Card, MessageSender
+
+# Límite del caption de sendPhoto (unidades UTF-16)
+TELEGRAM_CAPTION_LIMIT = 1024
+# callback_data admite como mucho 64 bytes
+_CALLBACK_DATA_MAX = 64
+
+
+class TelegramAPIError(Exception):
+    """La Bot API respondió `ok: false` (o un status no reintentable)."""
+
+    def __init__(self, status: int, description: str):
+        super().__init__(f"Telegram {status}: {description}")
+        self.status = status
+        self.description = description
+
+
+def _should_retry(status: int) -> bool:
+    return status in (429, 500, 502, 503, 504)
+
+
+def _retry_after(data: Any) -> Optional[float]:
+    params = data.get("parameters") if isinstance(data, dict) else None
+    value = params.get("retry_after") if isinstance(params, dict) else None
+    return float(value) if isinstance(value, (int, float)) else None
+
+
+def _keyboard(card: Card) -> Optional[Dict[str, Any]]:
+    rows: List[List[Dict[str, str]]] = []
+    for action in card.get("actions") or []:
+        label = action.get("label") or action.get("value") or ""
+        value = action.get("value") or label
+        if not label:
+            continue
+        if action.get("type") == "url" and value:
+            rows.append([{"text": label, "url": value}])
+        else:
+            rows.append([{"text": label, "callback_data": value.encode()[:_CALLBACK_DATA_MAX].decode(errors="ignore")}])
+    return {"inline_keyboard": rows} if rows else None
+
+
+def _card_text(card: Card) -> str:
+    # Texto plano (sin parse_mode): un título con `_` o `*` no rompe el envío
+    parts = [card.get("title") or "", card.get("description") or "", card.get("url") or ""]
+    return "\n".join(p for p in parts if p)
+
+
+class TelegramMessageSender(MessageSender):
+    """Sender de Telegram sobre el pool compartido y el limitador compartido."""
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        *,
+        client: Optional[httpx.AsyncClient] = None,
+        limiter: Optional[SendLimiter] = None,
+        api_base_url: Optional[str] = None,
+        retries: int = 2,
+        backoff: float = 1.5,
+        timeout: float = 10.0,
+    ):
+        token = token or settings.telegram_bot_token
+        if not token:
+            raise ValueError("TelegramMessageSender requiere un bot token")
+        base = (api_base_url or settings.telegram_api_base_url).rstrip("/")
+        self.api_base = f"{base}/bot{token}"
+        self.client = client
+        self.limiter = limiter
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+    async def call(self, method: str, body: Dict[str, Any], *, chat_id: Any = None) -> Any:
+        """Llama a `method` de la Bot API respetando el limitador; devuelve `result`."""
+        with timed(OUTBOUND_SEND_SECONDS, "telegram", errors=OUTBOUND_SEND_ERRORS):
+            return await self._post_with_retries(method, body, None if chat_id is None else str(chat_id))
+
+    async def _post_with_retries(self, method: str, body: Dict[str, Any], chat: Optional[str]) -> Any:
+        client = self.client or http_clients.get("telegram")
+        url = f"{self.api_base}/{method}"
+        cap = settings.telegram_retry_max_delay_s
+        attempt = 0
+        while True:
+            attempt += 1
+            if self.limiter is not None:
+                await self.limiter.acquire(chat)
+            try:
+                resp = await client.post(url, json=body, timeout=self.timeout)
+            except httpx.RequestError as e:
+                if attempt > self.retries:
+                    raise
+                reason = "timeout" if isinstance(e, httpx.TimeoutException) else "network"
+                logging.warning("TG %s %s (%d/%d): %s", method, reason, attempt, self.retries, e)
+                bound(OUTBOUND_RETRIES, "telegram", reason).inc()
+                await asyncio.sleep(backoff_delay(attempt, self.backoff, cap))
+                continue
+
+            try:
+                data = resp.json()
+            except Exception:
+                data = {"description": resp.text}
+            if resp.status_code < 400 and (not isinstance(data, dict) or data.get("ok", True)):
+                return data.get("result") if isinstance(data, dict) else data
+
+            description = str(data.get("description", "")) if isinstance(data, dict) else ""
+            if attempt > self.retries or not _should_retry(resp.status_code):
+                logging.error("TG %s <- %s %s", method, resp.status_code, description)
+                raise TelegramAPIError(resp.status_code, description)
+            bound(OUTBOUND_RETRIES, "telegram", str(resp.status_code)).inc()
+            retry_after = _retry_after(data)
+            if retry_after is None:
+                await asyncio.sleep(backoff_delay(attempt, self.backoff, cap))
+            elif self.limiter is not None:
+                # Flood control: frena el chat en el limitador (lo comparten todos los envíos)
+                await self.limiter.penalize(min(cap, retry_after), chat)
+            else:
+                await asyncio.sleep(min(cap, retry_after))
+
+    async def send_text(
+        self,
+        chat_id: str,
+        text: str,
+        *,
+        start: int = 0,
+        on_sent: Optional[Callable[[int], Any]] = None,
+    ) -> None:
+        """Envía `text` troceado (4096 UTF-16) en orden; `start` salta trozos ya entregados."""
+        chunks = split_text(text, TELEGRAM_TEXT_LIMIT, measure=utf16_len) or [" "]
+        await send_ordered(
+            chunks,
+            lambda body: self.call("sendMessage", body, chat_id=chat_id),
+            prepare=lambda chunk: {"chat_id": chat_id, "text": chunk},
+            start=start,
+            on_sent=on_sent,
+        )
+
+    async def send_cards(self, chat_id: str, cards: Iterable[Card]) -> None:
+        """Una tarjeta por mensaje: foto con caption si hay `image_url`, texto si no."""
+        for card in cards:
+            text = _card_text(card)
+            body: Dict[str, Any] = {"chat_id": chat_id}
+            keyboard = _keyboard(card)
+            if keyboard is not None:
+                body["reply_markup"] = keyboard
+            image = card.get("image_url")
+            if image and utf16_len(text) <= TELEGRAM_CAPTION_LIMIT:
+                await self.call("sendPhoto", {**body, "photo": image, "caption": text}, chat_id=chat_id)
+            else:
+                await self.call("sendMessage", {**body, "text": text or " "}, chat_id=chat_id)
+
+
+def build_telegram_limiter() -> SendLimiter:
+    """Limitador global del bot + por chat (Redis si `rate_limit_backend=redis`)."""
+    bot = (settings.telegram_bot_token or "default").split(":", 1)[0]  # id del bot, sin el secreto
+    client = None
+    if settings.rate_limit_backend == "redis":
+        from core.memory import get_redis_client
+
+        client = get_redis_client()
+    if client is not None:
+        return SendLimiter(
+            RedisTokenBucket(
+                client, f"ratelimit:tg:{bot}", settings.telegram_rate_per_s,
+                settings.telegram_rate_burst, name="telegram",
+            ),
+            lambda chat: RedisTokenBucket(
+                client, f"ratelimit:tg:{bot}:{chat}", settings.telegram_chat_rate_per_s,
+                settings.telegram_chat_burst, name="telegram_chat",
+            ),
+        )
+    return SendLimiter(
+        TokenBucket(settings.telegram_rate_per_s, settings.telegram_rate_burst, name="telegram"),
+        lambda chat: TokenBucket(
+            settings.telegram_chat_rate_per_s, settings.telegram_chat_burst, name="telegram_chat",
+        ),
+    )
+
+
+_sender: Optional[TelegramMessageSender] = None
+
+
+def telegram_sender() -> Optional[TelegramMessageSender]:
+    """Sender compartido (None si no hay `telegram_bot_token`: el envío es NO-OP)."""
+    global _sender
+    if not settings.telegram_bot_token:
+        return None
+    if _sender is None:
+        limiter = build_telegram_limiter() if settings.telegram_rate_limit_enabled else None
+        _sender = TelegramMessageSender(limiter=limiter)
+    return _sender
@@ -0,0 +1,277 @@
+# src/adapters/whatsapp_business/campaign.py
+"""Envío masivo de plantillas (HSM) a listas grandes de destinatarios.
+
+    PYTHONPATH=src python -m adapters.whatsapp_business.campaign destinatarios.csv \\
+        --template pedido_enviado --lang es --checkpoint campaña.jsonl --concurrency 16
+
+- Destinatarios en streaming (CSV con columna `to` o JSONL con `{"to", "params"}`):
+  nunca se carga la lista entera; las columnas extra del CSV son los
+  parámetros del body de la plantilla, en orden.
+- Concurrencia acotada (`concurrency` envíos en vuelo) sobre el cliente y el
+  rate limiter compartidos de `client.send_message`; la plantilla se compila
+  una vez (`compiled.CompiledMessage`) y cada envío solo rellena huecos.
+- Checkpoint JSONL: antes de cada envío se anota `pending` y después `sent` /
+  `failed` / `unknown`. Al reanudar se salta todo destinatario con estado
+  previo; un `pending` sin resultado (caída a mitad) cuenta como `unknown` y
+  no se reenvía salvo `retry_unknown` — preferimos no duplicar.
+- `failed` = la API rechazó el mensaje (4xx/5xx definitivo): nunca se entregó y
+  se reintenta con `retry_failed`. Timeouts/errores de red = `unknown`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+from collections import Counter
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+import httpx
+
+from adapters.whatsapp_business.catalog import TemplateMessage
+from adapters.whatsapp_business.client import _normalize_to, send_message, whatsapp_client
+from adapters.whatsapp_business.compiled import CompiledMessage, slot
+from infrastructure.ratelimit import SendLimiter
+from observability.metrics import CAMPAIGN_MESSAGES, bound
+
+
+@dataclass
+class Recipient:
+    to: str
+    params: List[str] = field(default_factory=list)
+
+
+def iter_recipients(path: str) -> Iterator[Recipient]:
+    """Lee destinatarios de un CSV (columna `to`) o JSONL, línea a línea."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    yield Recipient(str(row["to"]), [str(p) for p in row.get("params") or []])
+            return
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return
+        to_col = header.index("to") if "to" in header else 0
+        for row in reader:
+            if row and row[to_col].strip():
+                yield Recipient(row[to_col], [v for i, v in enumerate(row) if i != to_col])
+
+
+@dataclass
+class CampaignReport:
+    total: int = 0
+    sent: int = 0
+    failed: int = 0
+    unknown: int = 0
+    skipped: int = 0
+    elapsed_s: float = 0.0
+    errors: Counter = field(default_factory=Counter)
+
+    @property
+    def throughput(self) -> float:
+        """Mensajes aceptados por segundo."""
+        return self.sent / self.elapsed_s if self.elapsed_s > 0 else 0.0
+
+    def format(self) -> str:
+        lines = [
+            f"total={self.total} sent={self.sent} failed={self.failed} "
+            f"unknown={self.unknown} skipped={self.skipped}",
+            f"{self.elapsed_s:.1f} s, {self.throughput:.1f} msg/s",
+        ]
+        lines += [f"  {n:6d}  {err}" for err, n in self.errors.most_common(10)]
+        return "\n".join(lines)
+
+
+class Checkpoint:
+    """Registro append-only (JSONL) del estado por destinatario."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.state: Dict[str, str] = {}
+        self._f: Optional[TextIO] = None
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # última línea truncada por una caída
+                    self.state[rec["to"]] = rec["status"]
+
+    def previous(self, to: str) -> Optional[str]:
+        """Estado anterior (`pending` sin cerrar se trata como `unknown`)."""
+        status = self.state.get(to)
+        return "unknown" if status == "pending" else status
+
+    def record(self, to: str, status: str, **extra: Any) -> None:
+        self.state[to] = status
+        if not self.path:
+            return
+        if self._f is None:
+            self._f = open(self.path, "a", encoding="utf-8")
+        self._f.write(json.dumps({"to": to, "status": status, **extra}) + "\n")
+        self._f.flush()
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+class Campaign:
+    def __init__(
+        self,
+        template: str,
+        language_code: str = "en_US",
+        *,
+        checkpoint: Optional[str] = None,
+        concurrency: int = 16,
+        client: Optional[httpx.AsyncClient] = None,
+        limiter: Optional[SendLimiter] = None,
+        retry_failed: bool = False,
+        retry_unknown: bool = False,
+    ):
+        self.template = template
+        self.language_code = language_code
+        self.checkpoint = Checkpoint(checkpoint)
+        self.concurrency = max(1, concurrency)
+        self.client = client
+        self.limiter = limiter
+        self.retry_failed = retry_failed
+        self.retry_unknown = retry_unknown
+        self.report = CampaignReport()
+        self._compiled: Dict[int, CompiledMessage] = {}
+
+    def payload(self, r: Recipient) -> bytes:
+        """Cuerpo JSON del envío: plantilla compilada una vez por nº de parámetros."""
+        n = len(r.params)
+        compiled = self._compiled.get(n)
+        if compiled is None:
+            components = None
+            if n:
+                params = [{"type": "text", "text": slot(f"p{i}")} for i in range(n)]
+                components = [{"type": "body", "parameters": params}]
+            compiled = self._compiled[n] = CompiledMessage(
+                TemplateMessage(name=self.template, language_code=self.language_code, components=components)
+            )
+        return compiled.render(r.to, **{f"p{i}": p for i, p in enumerate(r.params)})
+
+    def _should_send(self, to: str) -> bool:
+        prev = self.checkpoint.previous(to)
+        return (
+            prev is None
+            or (prev == "failed" and self.retry_failed)
+            or (prev == "unknown" and self.retry_unknown)
+        )
+
+    async def _send(self, r: Recipient) -> None:
+        self.checkpoint.record(r.to, "pending")
+        try:
+            data = await send_message(self.payload(r), to=r.to, client=self.client, limiter=self.limiter)
+        except httpx.HTTPStatusError as e:
+            self._done(r.to, "failed", f"HTTP {e.response.status_code}")
+        except (httpx.RequestError, asyncio.TimeoutError) as e:
+            # puede haberse entregado: no lo reintentamos automáticamente
+            self._done(r.to, "unknown", type(e).__name__)
+        else:
+            wamid = ((data.get("messages") or [{}])[0]).get("id") if isinstance(data, dict) else None
+            self.checkpoint.record(r.to, "sent", wamid=wamid)
+            self.report.sent += 1
+            bound(CAMPAIGN_MESSAGES, "sent").inc()
+
+    def _done(self, to: str, status: str, error: str) -> None:
+        self.checkpoint.record(to, status, error=error)
+        setattr(self.report, status, getattr(self.report, status) + 1)
+        self.report.errors[error] += 1
+        bound(CAMPAIGN_MESSAGES, status).inc()
+
+    async def run(self, recipients: Iterable[Recipient] | AsyncIterator[Recipient]) -> CampaignReport:
+        """Envía a todos los destinatarios pendientes y devuelve el informe."""
+        if self.client is None:
+            self.client = whatsapp_client()
+        queue: asyncio.Queue[Optional[Recipient]] = asyncio.Queue(maxsize=self.concurrency * 2)
+        started = time.perf_counter()
+
+        async def worker() -> None:
+            while (r := await queue.get()) is not None:
+                try:
+                    await self._send(r)
+                except Exception as e:  # un destinatario no debe parar la campaña
+                    logging.exception("campaign: fallo inesperado con %s: %s", r.to, e)
+                    self._done(r.to, "unknown", type(e).__name__)
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            async for r in _aiter(recipients):
+                r.to = _normalize_to(r.to)
+                self.report.total += 1
+                if not self._should_send(r.to):
+                    self.report.skipped += 1
+                    bound(CAMPAIGN_MESSAGES, "skipped").inc()
+                    continue
+                await queue.put(r)  # backpressure: como mucho 2×concurrency en memoria
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for w in workers:
+                w.cancel()
+            self.checkpoint.close()
+            self.report.elapsed_s = time.perf_counter() - started
+        return self.report
+
+
+async def _aiter(items: Iterable[Recipient] | AsyncIterator[Recipient]) -> AsyncIterator[Recipient]:
+    if isinstance(items, AsyncIterator):
+        async for item in items:
+            yield item
+    else:
+        for i, item in enumerate(items):
+            yield item
+            if i % 256 == 255:
+                await asyncio.sleep(0)  # no acaparar el loop leyendo el fichero
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> Tuple[argparse.Namespace, str]:
+    p = argparse.ArgumentParser(description="Campaña de plantillas WhatsApp")
+    p.add_argument("recipients", help="CSV (columna 'to') o JSONL ({'to', 'params'})")
+    p.add_argument("--template", required=True)
+    p.add_argument("--lang", default="en_US")
+    p.add_argument("--checkpoint", default=None, help="JSONL de progreso (permite reanudar)")
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--retry-failed", action="store_true")
+    p.add_argument("--retry-unknown", action="store_true")
+    args = p.parse_args(argv)
+    return args, args.checkpoint or f"{args.recipients}.checkpoint.jsonl"
+
+
+async def _main(argv: Optional[List[str]] = None) -> CampaignReport:
+    from infrastructure.http import http_clients
+
+    args, checkpoint = _parse_args(argv)
+    campaign = Campaign(
+        args.template,
+        args.lang,
+        checkpoint=checkpoint,
+        concurrency=args.concurrency,
+        retry_failed=args.retry_failed,
+        retry_unknown=args.retry_unknown,
+    )
+    try:
+        return await campaign.run(iter_recipients(args.recipients))
+    finally:
+        await http_clients.aclose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    print(asyncio.run(_main()).format())
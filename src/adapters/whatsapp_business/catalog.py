@@ -1,7 +1,7 @@
 # whatsappMessages/catalog.py
 from __future__ import annotations
 from typing import List, Optional, Dict, Any, Literal
-from pydantic import BaseModel, HttpUrl, field_validator
+from pydantic import BaseModel, HttpUrl, field_validator, model_validator
 
 
 # =========================
@@ -12,6 +12,23 @@ class MessageComponent(BaseModel):
         raise NotImplementedError
 
 
+class MediaRef(BaseModel):
+    """Media por `link` público o por `media_id` ya subido (ver `media.MediaUploader`)."""
+
+    link: Optional[HttpUrl] = None
+    media_id: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _link_or_id(self):
+        if not self.link and not self.media_id:
+            raise ValueError("El media requiere 'link' o 'media_id'.")
+        return self
+
+    def media_payload(self) -> Dict[str, Any]:
+        # con media_id WhatsApp no vuelve a descargar el recurso para cada destinatario
+        return {"id": self.media_id} if self.media_id else {"link": str(self.link)}
+
+
 # =========================
 # Text
 # =========================
@@ -29,12 +46,11 @@ class TextMessage(MessageComponent):
 # =========================
 # Image
 # =========================
-class ImageMessage(MessageComponent):
-    link: HttpUrl
+class ImageMessage(MessageComponent, MediaRef):
     caption: Optional[str] = None
 
     def to_payload(self) -> Dict[str, Any]:
-        p: Dict[str, Any] = {"type": "image", "image": {"link": str(self.link)}}
+        p: Dict[str, Any] = {"type": "image", "image": self.media_payload()}
         if self.caption:
             p["image"]["caption"] = self.caption
         return p
@@ -43,13 +59,12 @@ class ImageMessage(MessageComponent):
 # =========================
 # Document
 # =========================
-class DocumentMessage(MessageComponent):
-    link: HttpUrl
+class DocumentMessage(MessageComponent, MediaRef):
     filename: Optional[str] = None
     caption: Optional[str] = None
 
     def to_payload(self) -> Dict[str, Any]:
-        doc: Dict[str, Any] = {"link": str(self.link)}
+        doc: Dict[str, Any] = self.media_payload()
         if self.filename:
             doc["filename"] = self.filename
         if self.caption:
@@ -76,6 +91,7 @@ class MediaHeader(BaseModel):
     kind: Literal["text", "image", "video", "document"]
     text: Optional[str] = None
     link: Optional[HttpUrl] = None
+    media_id: Optional[str] = None
 
     @field_validator("text")
     @classmethod
@@ -84,12 +100,17 @@ class MediaHeader(BaseModel):
             raise ValueError("Header 'text' requiere 'text'.")
         return v
 
-    @field_validator("link")
-    @classmethod
-    def _link_required_for_media_kind(cls, v, info):
-        if info.data.get("kind") in ("image", "video", "document") and not v:
-            raise ValueError("Header media requiere 'link'.")
-        return v
+    @model_validator(mode="after")
+    def _media_required_for_media_kind(self):
+        if self.kind != "text" and not self.link and not self.media_id:
+            raise ValueError("Header media requiere 'link' o 'media_id'.")
+        return self
+
+    def to_payload(self) -> Dict[str, Any]:
+        if self.kind == "text":
+            return {"type": "text", "text": self.text}
+        ref = {"id": self.media_id} if self.media_id else {"link": str(self.link)}
+        return {"type": self.kind, self.kind: ref}
 
 
 class ButtonsMessage(MessageComponent):
@@ -100,7 +121,7 @@ class ButtonsMessage(MessageComponent):
 
     def to_payload(self) -> Dict[str, Any]:
         buttons_payload = [
-            {"type": "reply", "reply": b.model_dump()} for b in self.buttons
+            {"type": "reply", "reply": {"id": b.id, "title": b.title}} for b in self.buttons
         ]
         interactive: Dict[str, Any] = {
             "type": "button",
@@ -110,23 +131,7 @@ class ButtonsMessage(MessageComponent):
         if self.footer_text:
             interactive["footer"] = {"text": self.footer_text}
         if self.header:
-            if self.header.kind == "text":
-                interactive["header"] = {"type": "text", "text": self.header.text}
-            elif self.header.kind == "image":
-                interactive["header"] = {
-                    "type": "image",
-                    "image": {"link": str(self.header.link)},
-                }
-            elif self.header.kind == "video":
-                interactive["header"] = {
-                    "type": "video",
-                    "video": {"link": str(self.header.link)},
-                }
-            elif self.header.kind == "document":
-                interactive["header"] = {
-                    "type": "document",
-                    "document": {"link": str(self.header.link)},
-                }
+            interactive["header"] = self.header.to_payload()
         return {"type": "interactive", "interactive": interactive}
 
 
@@ -234,6 +239,13 @@ class ListSectionRow(BaseModel):
     title: str
     description: Optional[str] = None
 
+    def to_payload(self) -> Dict[str, Any]:
+        # equivalente a model_dump(exclude_none=True) sin pasar por el serializador
+        row = {"id": self.id, "title": self.title}
+        if self.description is not None:
+            row["description"] = self.description
+        return row
+
 
 class ListSection(BaseModel):
     title: str
@@ -263,7 +275,7 @@ class ListMessage(MessageComponent):
                 "sections": [
                     {
                         "title": s.title,
-                        "rows": [r.model_dump(exclude_none=True) for r in s.rows],
+                        "rows": [r.to_payload() for r in s.rows],
                     }
                     for s in self.sections
                 ],
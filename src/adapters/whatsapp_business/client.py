@@ -5,7 +5,23 @@ import re
 from typing import Any, Dict
 
 import httpx
+from infrastructure.http import http_clients
+from infrastructure.presence import PresenceNotifier
+from infrastructure.ratelimit import (
+    RedisTokenBucket,
+    SendLimiter,
+    TokenBucket,
+    backoff_delay,
+    parse_retry_after,
+)
 from infrastructure.settings import settings
+from observability.metrics import (
+    OUTBOUND_RETRIES,
+    OUTBOUND_SEND_ERRORS,
+    OUTBOUND_SEND_SECONDS,
+    bound,
+    timed,
+)
 from adapters.whatsapp_business.catalog import OutgoingMessage  # ✅ tu catálogo
 
 # =====================================================
@@ -15,7 +31,7 @@ from adapters.whatsapp_business.catalog import OutgoingMessage  # ✅ tu catálo
 
 def _endpoint() -> str:
     return (
-        f"https://graph.facebook.com/"
+        f"{settings.whatsapp_graph_base_url.rstrip('/')}/"
         f"{settings.whatsapp_api_version}/"
         f"{settings.whatsapp_phone_id}/messages"
     )
@@ -37,6 +53,10 @@ def _should_retry(status: int) -> bool:
     return status in (429, 500, 502, 503, 504)
 
 
+# Código de error de la Graph API para el límite por destinatario (pair rate)
+PAIR_RATE_ERROR_CODE = 131056
+
+
 def _shorten(s: str, limit: int = 120) -> str:
     if not s:
         return ""
@@ -65,68 +85,213 @@ def get_text_message_input(
 # =====================================================
 # Core Sender
 # =====================================================
+def whatsapp_client() -> httpx.AsyncClient:
+    """Cliente compartido de la Graph API (HTTP/2 si hay `h2`, límites propios)."""
+    return http_clients.get("whatsapp")
+
+
+_limiter: SendLimiter | None = None
+
+
+def build_whatsapp_limiter() -> SendLimiter:
+    """Limitador por phone_id + por destinatario (Redis si `rate_limit_backend=redis`)."""
+    phone = settings.whatsapp_phone_id or "default"
+    client = None
+    if settings.rate_limit_backend == "redis":
+        from core.memory import get_redis_client
+
+        client = get_redis_client()
+    if client is not None:
+        return SendLimiter(
+            RedisTokenBucket(
+                client, f"ratelimit:wa:{phone}", settings.whatsapp_rate_per_s,
+                settings.whatsapp_rate_burst, name="whatsapp",
+            ),
+            lambda to: RedisTokenBucket(
+                client, f"ratelimit:wa:{phone}:{to}", settings.whatsapp_recipient_rate_per_s,
+                settings.whatsapp_recipient_burst, name="whatsapp_recipient",
+            ),
+        )
+    return SendLimiter(
+        TokenBucket(settings.whatsapp_rate_per_s, settings.whatsapp_rate_burst, name="whatsapp"),
+        lambda to: TokenBucket(
+            settings.whatsapp_recipient_rate_per_s, settings.whatsapp_recipient_burst,
+            name="whatsapp_recipient",
+        ),
+    )
+
+
+def whatsapp_limiter() -> SendLimiter | None:
+    """Limitador compartido de envíos (None si `whatsapp_rate_limit_enabled` es False)."""
+    global _limiter
+    if not settings.whatsapp_rate_limit_enabled:
+        return None
+    if _limiter is None:
+        _limiter = build_whatsapp_limiter()
+    return _limiter
+
+
+async def send_read_receipt(
+    wamid: str,
+    *,
+    typing: bool = True,
+    client: httpx.AsyncClient | None = None,
+    timeout: float = 5.0,
+) -> None:
+    """Marca `wamid` como leído y, con `typing`, muestra "escribiendo…" (hasta 25 s
+    o hasta la respuesta). Best effort: sin reintentos ni rate limiter."""
+    payload: Dict[str, Any] = {"messaging_product": "whatsapp", "status": "read", "message_id": wamid}
+    if typing:
+        payload["typing_indicator"] = {"type": "text"}
+    resp = await (client or whatsapp_client()).post(
+        _endpoint(), headers=_headers(), json=payload, timeout=timeout
+    )
+    resp.raise_for_status()
+
+
+async def _presence_ping(wa_id: str, wamid: Any) -> None:
+    if wamid:  # el read receipt/typing de WhatsApp va ligado a un mensaje entrante
+        await send_read_receipt(str(wamid))
+
+
+_presence: PresenceNotifier | None = None
+
+
+def whatsapp_presence() -> PresenceNotifier | None:
+    """Notifier de presencia compartido (None si `presence_enabled` es False)."""
+    global _presence
+    if not settings.presence_enabled:
+        return None
+    if _presence is None:
+        _presence = PresenceNotifier(
+            "whatsapp",
+            _presence_ping,
+            interval_s=settings.whatsapp_typing_refresh_s,
+            min_gap_s=settings.presence_min_gap_s,
+            exit_wait_s=settings.presence_exit_wait_s,
+        )
+    return _presence
+
+
 async def send_message(
-    payload: Dict[str, Any],
+    payload: Dict[str, Any] | bytes,
     *,
+    to: str | None = None,
+    client: httpx.AsyncClient | None = None,
+    limiter: SendLimiter | None = None,
     timeout: float = 30.0,
     retries: int = 2,
     backoff: float = 1.5,
 ) -> Dict[str, Any]:
     """
-    Envía un payload ya construido (dict).
+    Envía un payload ya construido (dict, o bytes JSON ya serializados de
+    `compiled.CompiledMessage`; en ese caso `to` alimenta el límite por destinatario).
     Devuelve la respuesta JSON (o lanza excepción con logging).
+    `client` permite inyectar otro cliente (tests, Deps.http); por defecto el pool compartido.
+    `limiter` idem con el rate limiter; por defecto el compartido por phone_id/destinatario.
     """
     url, headers = _endpoint(), _headers()
 
     # Debug de request
-    try:
-        to_dbg = payload.get("to") or "<no-to>"
-        msg_type = payload.get("type")
-        body_dbg = ""
-        if msg_type == "text":
-            body_dbg = _shorten(payload.get("text", {}).get("body", ""))
-        logging.info(
-            "WA SEND -> %s to=%s type=%s body=%r", url, to_dbg, msg_type, body_dbg
+    if isinstance(payload, bytes):
+        logging.info("WA SEND -> %s to=%s precompiled bytes=%d", url, to or "<no-to>", len(payload))
+    else:
+        try:
+            to_dbg = payload.get("to") or "<no-to>"
+            msg_type = payload.get("type")
+            body_dbg = ""
+            if msg_type == "text":
+                body_dbg = _shorten(payload.get("text", {}).get("body", ""))
+            logging.info(
+                "WA SEND -> %s to=%s type=%s body=%r", url, to_dbg, msg_type, body_dbg
+            )
+        except Exception:
+            logging.info("WA SEND -> %s payload_keys=%s", url, list(payload.keys()))
+
+    # Latencia total (con reintentos) y fallos definitivos por canal
+    with timed(OUTBOUND_SEND_SECONDS, "whatsapp", errors=OUTBOUND_SEND_ERRORS):
+        return await _post_with_retries(
+            client or whatsapp_client(),
+            url,
+            headers,
+            payload,
+            timeout,
+            retries,
+            backoff,
+            limiter or whatsapp_limiter(),
+            to,
         )
-    except Exception:
-        logging.info("WA SEND -> %s payload_keys=%s", url, list(payload.keys()))
 
+
+async def _post_with_retries(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Dict[str, str],
+    payload: Dict[str, Any] | bytes,
+    timeout: float,
+    retries: int,
+    backoff: float,
+    limiter: SendLimiter | None = None,
+    to: str | None = None,
+) -> Dict[str, Any]:
+    body: Dict[str, Any]
+    if isinstance(payload, dict):
+        to = payload.get("to")
+        body = {"json": payload}
+    else:
+        body = {"content": payload}  # ya serializado: httpx no vuelve a hacer json.dumps
+    cap = settings.whatsapp_retry_max_delay_s
     attempt = 0
     last_exc: Exception | None = None
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        while attempt <= retries:
-            attempt += 1
+    while attempt <= retries:
+        attempt += 1
+        if limiter is not None:
+            await limiter.acquire(to)
+        try:
+            resp = await client.post(url, headers=headers, timeout=timeout, **body)
             try:
-                resp = await client.post(url, headers=headers, json=payload)
-                try:
-                    data = resp.json()
-                except Exception:
-                    data = {"raw": resp.text}
-
-                if resp.status_code >= 400:
-                    logging.error("WA RESP <- %s %s", resp.status_code, data)
-                    if attempt <= retries and _should_retry(resp.status_code):
-                        await asyncio.sleep(backoff ** (attempt - 1))
-                        continue
-                    resp.raise_for_status()
-                else:
-                    logging.info("WA RESP <- %s %s", resp.status_code, data)
-                    return data
-
-            except (httpx.TimeoutException, httpx.ReadTimeout) as e:
-                logging.error("WA TIMEOUT (%d/%d): %s", attempt, retries, e)
-                last_exc = e
-                if attempt <= retries:
-                    await asyncio.sleep(backoff ** (attempt - 1))
-                    continue
-                raise
-            except httpx.RequestError as e:
-                logging.error("WA REQUEST ERROR (%d/%d): %s", attempt, retries, e)
-                last_exc = e
-                if attempt <= retries:
-                    await asyncio.sleep(backoff ** (attempt - 1))
+                data = resp.json()
+            except Exception:
+                data = {"raw": resp.text}
+
+            if resp.status_code >= 400:
+                logging.error("WA RESP <- %s %s", resp.status_code, data)
+                if attempt <= retries and _should_retry(resp.status_code):
+                    bound(OUTBOUND_RETRIES, "whatsapp", str(resp.status_code)).inc()
+                    retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                    if retry_after is None:
+                        delay = backoff_delay(attempt, backoff, cap)
+                    else:
+                        delay = min(cap, retry_after)
+                    if resp.status_code == 429 and limiter is not None:
+                        # Throttling compartido: frena a todos los envíos (o al destinatario)
+                        error = data.get("error") if isinstance(data, dict) else None
+                        pair = isinstance(error, dict) and error.get("code") == PAIR_RATE_ERROR_CODE
+                        await limiter.penalize(delay, to if pair else None)
+                    else:
+                        await asyncio.sleep(delay)
                     continue
-                raise
+                resp.raise_for_status()
+            else:
+                logging.info("WA RESP <- %s %s", resp.status_code, data)
+                return data
+
+        except (httpx.TimeoutException, httpx.ReadTimeout) as e:
+            logging.error("WA TIMEOUT (%d/%d): %s", attempt, retries, e)
+            last_exc = e
+            if attempt <= retries:
+                bound(OUTBOUND_RETRIES, "whatsapp", "timeout").inc()
+                await asyncio.sleep(backoff_delay(attempt, backoff, cap))
+                continue
+            raise
+        except httpx.RequestError as e:
+            logging.error("WA REQUEST ERROR (%d/%d): %s", attempt, retries, e)
+            last_exc = e
+            if attempt <= retries:
+                bound(OUTBOUND_RETRIES, "whatsapp", "network").inc()
+                await asyncio.sleep(backoff_delay(attempt, backoff, cap))
+                continue
+            raise
 
     if last_exc:
         raise last_exc
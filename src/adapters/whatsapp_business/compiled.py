@@ -0,0 +1,77 @@
+# adapters/whatsapp_business/compiled.py
+"""Payloads precompilados del catálogo para envíos de alto volumen.
+
+Construir la misma tarjeta miles de veces con el catálogo repite validación
+pydantic (`HttpUrl`, validadores de títulos), `to_payload`/`build` y el
+`json.dumps` de httpx. `CompiledMessage` hace todo eso UNA vez y guarda los
+bytes JSON ya serializados, con huecos (`slot("nombre")`) que en cada envío se
+rellenan concatenando bytes:
+
+    tpl = CompiledMessage(TemplateMessage(name="pedido", components=[
+        {"type": "body", "parameters": [{"type": "text", "text": slot("nombre")}]},
+    ]))
+    await send_message(tpl.render(to, nombre="Ana"), to=to)
+
+- Un componente sin huecos (tarjeta estática) queda en prefijo + `to` + sufijo.
+- Un hueco puede ir dentro de un texto más largo (`f"Hola {slot('n')}"`).
+- Los valores se escapan como strings JSON pero NO pasan por los validadores
+  del modelo (camino de confianza): úsalos en texto libre (body, parámetros de
+  plantilla), no en campos con restricciones (títulos ≤ 20, URLs).
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Dict, List, Optional
+
+from adapters.whatsapp_business.catalog import MessageComponent, OutgoingMessage
+
+_MARK = "\x00"  # json.dumps lo escribe siempre como \u0000: no choca con texto normal
+_SLOT_RE = re.compile(rb"\\u0000([A-Za-z_][A-Za-z0-9_]*)\\u0000")
+_NEEDS_ESCAPE = re.compile(r'[\x00-\x1f"\\]')
+
+
+def slot(name: str) -> str:
+    """Marcador de hueco para usar como (parte de) un campo de texto del componente."""
+    if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", name):
+        raise ValueError(f"nombre de hueco inválido: {name!r}")
+    return f"{_MARK}{name}{_MARK}"
+
+
+def _escape(value: str) -> bytes:
+    if _NEEDS_ESCAPE.search(value) is None:  # caso común: nombres, números de pedido
+        return value.encode()
+    return json.dumps(value, ensure_ascii=False)[1:-1].encode()
+
+
+class CompiledMessage:
+    """Mensaje validado y serializado una vez; `render` solo sustituye huecos."""
+
+    __slots__ = ("slots", "_parts", "_names")
+
+    def __init__(self, component: MessageComponent, *, context_message_id: Optional[str] = None):
+        payload = OutgoingMessage(
+            to=slot("to"), component=component, context_message_id=context_message_id
+        ).build()
+        raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+        pieces = _SLOT_RE.split(raw)
+        self._parts: List[bytes] = pieces[0::2]
+        self._names: List[str] = [p.decode() for p in pieces[1::2]]
+        self.slots = frozenset(self._names) - {"to"}
+
+    def render(self, to: str, **values: str) -> bytes:
+        """Cuerpo JSON listo para `send_message` con `to` y los huecos rellenos."""
+        missing = self.slots.difference(values)
+        if missing:
+            raise KeyError(f"faltan huecos: {', '.join(sorted(missing))}")
+        escaped: Dict[str, bytes] = {"to": _escape(to)}
+        parts = self._parts
+        out = [parts[0]]
+        for i, name in enumerate(self._names, 1):
+            value = escaped.get(name)
+            if value is None:
+                value = escaped[name] = _escape(str(values[name]))
+            out.append(value)
+            out.append(parts[i])
+        return b"".join(out)
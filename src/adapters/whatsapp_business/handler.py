@@ -1,25 +1,38 @@
 # handler.py
+import asyncio
 import binascii
 import logging
 import hmac
 import hashlib
-from typing import Any, Dict, Optional
+import json
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type, TypeVar
 
 from fastapi import APIRouter, Request, Response, HTTPException, Depends
+from pydantic import BaseModel, ValidationError
 
 # --- Tu stack ---
-from core.memory import get_memory_store
+from core.memory import get_memory_store, get_usage_store
 from core.memory.manager import MemoryManager, HistoryStore
-from core.graph import run_with_memory, create_graph
+from core.runtime import get_graph_and_deps, run_turn
+from infrastructure.chunking import WHATSAPP_TEXT_LIMIT, send_ordered, split_text
+from infrastructure.dedup import get_deduplicator, safe_remember_reply
+from infrastructure.inbound import InboundJob, get_inbound_pool, register_job_handler
+from infrastructure.presence import maybe_during
 from infrastructure.settings import settings
+from observability.metrics import WHATSAPP_INVALID, bound
+from ports.outbound import CatalogSender
 
 from adapters.whatsapp_business.catalog import OutgoingMessage, TextMessage
-from .client import send_catalog_message
+from adapters.whatsapp_business.client import whatsapp_presence
+from adapters.whatsapp_business.media import archive_inbound_media, inbound_media
+from adapters.whatsapp_business.models import Change, Contact, Entry, Message, Metadata, Status, Value, Webhook
+from adapters.whatsapp_business.statuses import get_status_tracker, ingest_statuses, is_status_only
+from .sender import WhatsAppCatalogSender
 
 router = APIRouter()
 
-# Crear una instancia de la aplicación y los dependencias
-graph, deps = create_graph()
+# El grafo se construye bajo demanda (core.runtime) o en el warm-up del lifespan.
 
 
 # ======================================================
@@ -32,7 +45,14 @@ def get_memory_manager() -> MemoryManager:
         stores.extend(base_store)
     elif base_store is not None:
         stores.append(base_store)
-    return MemoryManager(store=stores)
+    return MemoryManager(store=stores, usage=get_usage_store())
+
+
+def get_catalog_sender() -> CatalogSender:
+    """Sender saliente: Deps.catalog_sender si se inyectó; si no, WhatsApp sobre Deps.http
+    (o el pool compartido con HTTP/2 si Deps.http es None)."""
+    _graph, deps = get_graph_and_deps()
+    return deps.catalog_sender or WhatsAppCatalogSender(client=deps.http)
 
 
 def _calc_sig(app_secret: str, raw: bytes) -> str:
@@ -50,10 +70,8 @@ def verify_whatsapp_signature(
     return hmac.compare_digest(expected, provided_sig), provided_sig, expected
 
 
-async def verify_signature(request: Request):
-    raw = await request.body()
-    sig_hdr = request.headers.get("X-Hub-Signature-256", "")
-
+def check_signature(raw: bytes, sig_hdr: str) -> None:
+    """Lanza HTTPException(400) si la firma X-Hub-Signature-256 no cuadra con `raw`."""
     if not settings.meta_app_secret:
         logging.error("META_APP_SECRET no configurado")
         raise HTTPException(
@@ -75,30 +93,122 @@ async def verify_signature(request: Request):
         raise HTTPException(status_code=400, detail="Invalid signature")
 
 
-def pick_value(body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+async def verify_signature(request: Request) -> bytes:
+    """Lee el cuerpo una sola vez, verifica la firma y devuelve los bytes."""
+    raw = await request.body()
+    check_signature(raw, request.headers.get("X-Hub-Signature-256", ""))
+    return raw
+
+
+def parse_webhook(raw: bytes) -> Optional[Webhook]:
+    """Bytes -> modelos tipados en un solo paso (parser JSON de pydantic-core).
+
+    Si algo no valida, se valida elemento a elemento y solo se descarta lo
+    roto (contado en `agent_whatsapp_invalid_elements_total`): un mensaje
+    malformado no se lleva por delante al resto del lote, que Meta ya no
+    reentregaría tras nuestro 200.
+    """
     try:
-        return body["entry"][0]["changes"][0]["value"]
-    except Exception:
+        return Webhook.model_validate_json(raw)
+    except ValidationError as e:
+        logging.warning("POST /webhook: %d errores de validación, se descartan solo esos elementos", e.error_count())
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        bound(WHATSAPP_INVALID, "body").inc()
         return None
+    if not isinstance(data, dict):
+        bound(WHATSAPP_INVALID, "body").inc()
+        return None
+    return _salvage_webhook(data)
+
 
+M = TypeVar("M", bound=BaseModel)
 
-def pick_first_message(value: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    msgs = value.get("messages") or []
-    return msgs[0] if msgs else None
 
+def _valid(model: Type[M], item: Any, kind: str) -> Optional[M]:
+    try:
+        return model.model_validate(item)
+    except ValidationError:
+        bound(WHATSAPP_INVALID, kind).inc()
+        return None
 
-def pick_contact(value: Dict[str, Any]) -> Dict[str, Any]:
-    contacts = value.get("contacts") or [{}]
-    return contacts[0]
+
+def _valid_list(model: Type[M], items: Any, kind: str) -> List[M]:
+    out: List[M] = []
+    for item in items if isinstance(items, list) else []:
+        parsed = _valid(model, item, kind)
+        if parsed is not None:
+            out.append(parsed)
+    return out
+
+
+def _salvage_webhook(data: Dict[str, Any]) -> Webhook:
+    """Reconstruye el lote conservando todo lo que sí valida."""
+    entries: List[Entry] = []
+    raw_entries = data.get("entry")
+    for raw_entry in raw_entries if isinstance(raw_entries, list) else []:
+        # las changes se validan aparte: se valida el "cascarón" de la entry
+        entry = _valid(Entry, {**raw_entry, "changes": []} if isinstance(raw_entry, dict) else raw_entry, "entry")
+        if entry is None:
+            continue
+        raw_changes = raw_entry.get("changes")
+        for raw_change in raw_changes if isinstance(raw_changes, list) else []:
+            change = _valid(Change, {**raw_change, "value": {}} if isinstance(raw_change, dict) else raw_change, "change")
+            raw_value = raw_change.get("value") if change is not None else None
+            if change is None or not isinstance(raw_value, dict):
+                continue
+            value = Value(
+                messaging_product=raw_value.get("messaging_product") if isinstance(raw_value.get("messaging_product"), str) else None,
+                metadata=_valid(Metadata, raw_value["metadata"], "metadata") if raw_value.get("metadata") is not None else None,
+                contacts=_valid_list(Contact, raw_value.get("contacts"), "contact"),
+                messages=_valid_list(Message, raw_value.get("messages"), "message"),
+                statuses=_valid_list(Status, raw_value.get("statuses"), "status"),
+            )
+            entry.changes.append(change.model_copy(update={"value": value}))
+        entries.append(entry)
+    return Webhook(object=data.get("object") if isinstance(data.get("object"), str) else None, entry=entries)
+
+
+async def ingest(request: Request) -> Optional[Webhook]:
+    """Etapa única de ingesta: bytes -> firma -> modelos (sin `request.json()`).
+
+    Los POST de solo statuses se agregan aquí mismo (camino rápido) y devuelven None.
+    """
+    raw = await verify_signature(request)
+    if is_status_only(raw):
+        ingest_statuses(raw)
+        return None
+    return parse_webhook(raw)
 
 
-def extract_user_text(msg: Dict[str, Any]) -> str:
-    t = msg.get("type")
+def iter_values(webhook: Webhook) -> Iterator[Value]:
+    """Todos los `value` del lote: Meta agrupa varias entries/changes por POST."""
+    for entry in webhook.entry:
+        for change in entry.changes:
+            yield change.value
+
+
+def iter_messages(webhook: Webhook) -> Iterator[Tuple[str, Message]]:
+    """(wa_id, mensaje) de todos los mensajes del lote, en el orden recibido."""
+    for value in iter_values(webhook):
+        contacts = [c.wa_id for c in value.contacts if c.wa_id]
+        for msg in value.messages:
+            # `from` es el wa_id del remitente; contacts[0] como respaldo
+            wa_id = msg.from_number or (contacts[0] if contacts else None)
+            if not wa_id:
+                logging.warning("POST /webhook: mensaje sin wa_id (id=%s)", msg.id)
+                continue
+            yield wa_id, msg
+
+
+def extract_user_text(msg: Message) -> str:
+    t = msg.type
     if t == "text":
-        return msg["text"]["body"]
+        return msg.text.body if msg.text else ""
 
     if t == "interactive":
-        inter = msg.get("interactive") or {}
+        inter = msg.interactive or {}
         if "button_reply" in inter:
             r = inter["button_reply"]
             return f"[button:{r.get('id')}] {r.get('title')}"
@@ -108,14 +218,14 @@ def extract_user_text(msg: Dict[str, Any]) -> str:
         return "[interactive]"
 
     if t == "image":
-        cap = (msg.get("image") or {}).get("caption")
+        cap = (msg.image or {}).get("caption")
         return cap or "[image]"
 
     if t == "reaction":
-        return f"[reaction] {msg.get('reaction', {}).get('emoji')}"
+        return f"[reaction] {(msg.reaction or {}).get('emoji')}"
 
     if t == "location":
-        loc = msg.get("location") or {}
+        loc = msg.location or {}
         return f"[location] {loc.get('latitude')},{loc.get('longitude')}"
 
     return f"[{t}]"
@@ -124,60 +234,158 @@ def extract_user_text(msg: Dict[str, Any]) -> str:
 # ======================================================
 # Webhook
 # ======================================================
-@router.post("/webhook", dependencies=[Depends(verify_signature)])
-async def webhook_post(
-    request: Request, mm: MemoryManager = Depends(get_memory_manager)
-):
-    try:
-        body = await request.json()
-    except Exception:
-        logging.warning("POST /webhook: cuerpo no JSON o vacío")
-        return Response(status_code=200)
-
-    value = pick_value(body)
-    if not value:
-        logging.warning("POST /webhook: sin 'value' utilizable en payload")
+@router.post("/webhook")
+async def webhook_post(webhook: Optional[Webhook] = Depends(ingest)):
+    if webhook is None:
         return Response(status_code=200)
 
-    msg = pick_first_message(value)
-    if not msg:
-        logging.info("POST /webhook: 'messages' vacío")
+    # Lote mixto: los statuses que vengan junto a mensajes también se agregan
+    get_status_tracker().record_all(s for value in iter_values(webhook) for s in value.statuses)
+    dedup = get_deduplicator()
+    jobs: list[InboundJob] = []
+    for wa_id, msg in iter_messages(webhook):
+        user_text = extract_user_text(msg)
+        wamid = msg.id
+        meta: Dict[str, Any] = {"wa_id": wa_id, "wamid": wamid}
+        media = inbound_media(msg)
+        if media is not None:
+            meta["media"] = media  # se descarga en el worker, no en el ack del webhook
+        if dedup is not None and wamid:
+            meta["dedup_key"] = f"whatsapp:{wamid}"
+            fresh, cached_reply = dedup.claim(meta["dedup_key"], "whatsapp")
+            if not fresh:
+                logging.info("IN dup: wa_id=%s wamid=%s (ignorado)", wa_id, wamid)
+                continue
+            if cached_reply is not None:
+                meta["cached_reply"] = cached_reply  # reintento: reenviar sin llamar al LLM
+        logging.info("IN: wa_id=%s kind=%s text=%r", wa_id, msg.type, user_text)
+        jobs.append(InboundJob(channel="whatsapp", session_id=wa_id, text=user_text, meta=meta))
+    if not jobs:
+        logging.info("POST /webhook: sin mensajes (statuses u otro evento)")
         return Response(status_code=200)
 
-    contact = pick_contact(value)
-    wa_id = contact.get("wa_id")
-    
-    # Ensure wa_id is not None
-    if not wa_id:
-        logging.warning("POST /webhook: missing wa_id in contact")
+    pool = get_inbound_pool()
+    if pool is None:
+        # Modo sync: wa_ids distintos en paralelo, en orden dentro de cada uno
+        try:
+            await process_batch(jobs, get_memory_manager())
+        except Exception as e:
+            # Meta reintenta el POST: lo ya enviado se ignora y lo fallido reenvía su respuesta
+            logging.warning("POST /webhook: envío fallido, se pide reintento a Meta: %s", e)
+            return Response(status_code=500)
         return Response(status_code=200)
 
-    user_text = extract_user_text(msg)
-    logging.info("IN: wa_id=%s kind=%s text=%r", wa_id, msg.get("type"), user_text)
+    # El pool conserva el orden por sesión; encolamos en el orden recibido
+    rejected = 0
+    for job in jobs:
+        if not await pool.submit(job):
+            rejected += 1
+            if dedup is not None and "cached_reply" in job.meta:
+                dedup.unlease(job.meta.get("dedup_key"))  # se conserva la respuesta para el reintento
+            elif dedup is not None:
+                dedup.release(job.meta.get("dedup_key"))  # que el reintento de Meta sí entre
+    if rejected:
+        # Backpressure: Meta reintentará el webhook más tarde
+        logging.warning("POST /webhook: %d/%d mensajes rechazados (cola llena)", rejected, len(jobs))
+        return Response(status_code=503)
 
-    # Ejecuta tu pipeline
-    try:
-        reply_text, _ctx = await run_with_memory(
-            graph,
-            deps,
-            mm,
-            session_id=wa_id,
-            user_text=user_text,
-        )
-    except Exception as e:
-        logging.exception("run_graph_with_memory failed: %s", e)
-        reply_text = "Ha ocurrido un error momentáneo. Intenta de nuevo."
+    return Response(status_code=200)
 
-    # Construir mensaje con el catálogo
-    out_msg = OutgoingMessage(to=wa_id, component=TextMessage(body=reply_text))
 
+async def process_batch(jobs: list[InboundJob], mm: Optional[MemoryManager] = None) -> None:
+    """Procesa un lote: concurrente entre sesiones, secuencial dentro de cada una.
+
+    Si un mensaje falla, los siguientes de su sesión no se procesan (se liberan
+    en el dedup para que el reintento los procese en orden) y, cuando terminan
+    las demás sesiones, se relanza el primer error.
+    """
+    by_session: Dict[str, list[InboundJob]] = {}
+    for job in jobs:
+        by_session.setdefault(job.session_id, []).append(job)
+
+    async def _session(session_jobs: list[InboundJob]) -> None:
+        for i, job in enumerate(session_jobs):
+            try:
+                await process_message(job, mm)
+            except Exception:
+                dedup = get_deduplicator()
+                if dedup is not None:
+                    for pending in session_jobs[i + 1:]:
+                        dedup.release(pending.meta.get("dedup_key"))
+                raise
+
+    results = await asyncio.gather(*(_session(js) for js in by_session.values()), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
+async def process_message(job: InboundJob, mm: Optional[MemoryManager] = None) -> None:
+    """Ejecuta el turno de un mensaje de WhatsApp y envía la respuesta.
+
+    Un envío fallido se propaga (y, desde la cola duradera, también un turno
+    fallido): el webhook en modo sync responde 5xx y el worker duradero no
+    confirma y reintenta (hasta `inbound_max_attempts`, después dead letter).
+    La respuesta ya calculada queda en el dedup: el reintento la reenvía sin
+    repetir el turno.
+    """
+    wa_id = job.meta.get("wa_id") or job.session_id
+    dedup_key = job.meta.get("dedup_key")
+    dedup = get_deduplicator() if dedup_key else None
+
+    reply_text = job.meta.get("cached_reply")
+    if reply_text is None and dedup is not None:
+        reply_text = dedup.reply(dedup_key)  # reentrega tras un envío fallido
+        if reply_text is not None and not dedup.lease(dedup_key):
+            logging.info("WA %s: otro intento ya está reenviando la respuesta", dedup_key)
+            return
+    resend = reply_text is not None
+    if reply_text is None:
+        # Ejecuta tu pipeline; leído + "escribiendo…" en segundo plano mientras tanto
+        try:
+            async with maybe_during(whatsapp_presence(), wa_id, job.meta.get("wamid")):
+                media = job.meta.get("media")
+                if media and settings.whatsapp_media_dir:
+                    archive_inbound_media(media)  # el texto ya lo señala ("[image]", caption...)
+                reply_text, _ctx = await run_turn(
+                    mm or get_memory_manager(),
+                    session_id=job.session_id,
+                    user_text=job.text,
+                    channel="whatsapp",
+                )
+        except Exception as e:
+            logging.exception("run_graph_with_memory failed: %s", e)
+            if settings.inbound_mode == "durable":
+                raise  # la cola duradera reintenta el turno
+            reply_text = "Ha ocurrido un error momentáneo. Intenta de nuevo."
+        else:
+            safe_remember_reply(dedup, dedup_key, reply_text)
+
+    # Respuesta troceada dentro del límite de WhatsApp, en orden; en un reenvío
+    # se continúa tras los trozos ya entregados
+    chunks = split_text(reply_text, WHATSAPP_TEXT_LIMIT) or [" "]
+    start = dedup.progress(dedup_key) if dedup is not None and resend else 0
     try:
-        out = await send_catalog_message(out_msg)
-        logging.info("OUT ok: %s", out)
+        await send_ordered(
+            chunks,
+            get_catalog_sender().send_catalog_message,
+            prepare=lambda chunk: OutgoingMessage(to=wa_id, component=TextMessage(body=chunk)),
+            start=start,
+            on_sent=partial(dedup.mark_progress, dedup_key) if dedup is not None else None,
+        )
     except Exception as e:
+        # Se propaga: en sync el webhook responde 5xx y Meta reintenta; en la cola
+        # duradera no se confirma y se reentrega. Ambos reenvían la respuesta cacheada
         logging.exception("send_message failed: %s", e)
+        if dedup is not None:
+            dedup.unlease(dedup_key)
+        raise
+    logging.info("OUT ok: wa_id=%s chunks=%d", wa_id, len(chunks))
+    if dedup is not None:
+        dedup.mark_sent(dedup_key)
 
-    return Response(status_code=200)
+
+register_job_handler("whatsapp", process_message)
 
 
 @router.get("/webhook")
@@ -0,0 +1,308 @@
+# adapters/whatsapp_business/media.py
+"""Media de WhatsApp: descarga entrante en streaming y media ids salientes cacheados.
+
+Entrante: `download_media(media_id)` resuelve la URL temporal en la Graph API
+y la baja por trozos a un fichero en disco (memoria acotada a un trozo),
+cortando si supera `whatsapp_media_max_bytes` y comprobando el sha256 que
+declara Meta. El fichero se nombra por contenido: el mismo media no se duplica.
+`archive_inbound_media` la lanza en segundo plano (nunca en el camino de la
+respuesta) y purga de `whatsapp_media_dir` lo que supere
+`whatsapp_media_retention_s`.
+
+Saliente: con `link`, WhatsApp vuelve a descargar el recurso para CADA
+destinatario. `MediaUploader` lo sube una vez (`POST /{phone_id}/media`) y
+cachea el id devuelto con TTL (memoria o Redis, `dedup.TTLCache`):
+- clave `sha:<sha256 del contenido>`: el mismo fichero desde otra URL reutiliza el id;
+- clave `url:<sha256 de la URL>`: los envíos siguientes ni siquiera descargan;
+- subidas concurrentes del mismo recurso se agrupan en una sola.
+`prepare(component)` cambia `link` por `media_id` en imágenes, documentos y
+cabeceras de botones; si la subida falla se envía con `link` como antes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import logging
+import mimetypes
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import IO, Any, Awaitable, Callable, Dict, Optional, Set, Tuple, Union
+
+import httpx
+
+from adapters.whatsapp_business.catalog import ButtonsMessage, DocumentMessage, ImageMessage, MessageComponent
+from adapters.whatsapp_business.client import whatsapp_client
+from adapters.whatsapp_business.models import Message
+from infrastructure.dedup import InMemoryTTLCache, RedisTTLCache, TTLCache
+from infrastructure.http import http_clients
+from infrastructure.settings import settings
+from observability.metrics import WHATSAPP_MEDIA, bound
+
+CHUNK_BYTES = 64 * 1024
+PRUNE_EVERY_S = 600.0  # como mucho una purga del directorio cada 10 min
+MEDIA_TYPES = ("image", "document", "audio", "video", "sticker")
+
+
+class MediaTooLarge(ValueError):
+    pass
+
+
+def _graph_url(path: str) -> str:
+    return f"{settings.whatsapp_graph_base_url.rstrip('/')}/{settings.whatsapp_api_version}/{path}"
+
+
+def _auth() -> Dict[str, str]:
+    return {"Authorization": f"Bearer {settings.whatsapp_token}"}
+
+
+def inbound_media(msg: Message) -> Optional[Dict[str, Any]]:
+    """{kind, id, mime_type} si el mensaje trae un media descargable."""
+    if msg.type not in MEDIA_TYPES:
+        return None
+    data = getattr(msg, msg.type, None) or (msg.model_extra or {}).get(msg.type)
+    if not isinstance(data, dict) or not data.get("id"):
+        return None
+    return {"kind": msg.type, "id": data["id"], "mime_type": data.get("mime_type")}
+
+
+async def stream_to_file(
+    client: httpx.AsyncClient,
+    url: str,
+    dest_dir: Union[str, Path],
+    *,
+    headers: Optional[Dict[str, str]] = None,
+    max_bytes: Optional[int] = None,
+) -> Tuple[Path, str, str]:
+    """Descarga `url` a un temporal en `dest_dir` trozo a trozo: (ruta, sha256, mime)."""
+    limit = max_bytes or settings.whatsapp_media_max_bytes
+    os.makedirs(dest_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=dest_dir, suffix=".part")
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async with client.stream("GET", url, headers=headers, follow_redirects=True) as resp:
+                resp.raise_for_status()
+                if int(resp.headers.get("Content-Length") or 0) > limit:
+                    raise MediaTooLarge(f"{url}: {resp.headers['Content-Length']} bytes > {limit}")
+                size = 0
+                async for chunk in resp.aiter_bytes(CHUNK_BYTES):
+                    size += len(chunk)
+                    if size > limit:
+                        raise MediaTooLarge(f"{url}: más de {limit} bytes")
+                    digest.update(chunk)
+                    f.write(chunk)  # disco local y trozos de 64 KiB: no compensa un hilo
+                mime = resp.headers.get("Content-Type", "application/octet-stream").split(";")[0].strip()
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+    return Path(tmp), digest.hexdigest(), mime
+
+
+async def download_media(
+    media_id: str,
+    dest_dir: Union[str, Path, None] = None,
+    *,
+    client: Optional[httpx.AsyncClient] = None,
+    max_bytes: Optional[int] = None,
+) -> Path:
+    """Descarga el media entrante `media_id` a `dest_dir` (por defecto `whatsapp_media_dir`)."""
+    dest = dest_dir or settings.whatsapp_media_dir or tempfile.gettempdir()
+    limit = max_bytes or settings.whatsapp_media_max_bytes
+    client = client or whatsapp_client()
+    try:
+        resp = await client.get(_graph_url(media_id), headers=_auth())
+        resp.raise_for_status()
+        info = resp.json()
+        if int(info.get("file_size") or 0) > limit:
+            raise MediaTooLarge(f"media {media_id}: {info['file_size']} bytes > {limit}")
+        tmp, sha, mime = await stream_to_file(client, info["url"], dest, headers=_auth(), max_bytes=limit)
+        if info.get("sha256") and info["sha256"] != sha:
+            os.unlink(tmp)
+            raise ValueError(f"media {media_id}: sha256 no coincide")
+        final = Path(dest) / f"{sha}{mimetypes.guess_extension(info.get('mime_type') or mime) or ''}"
+        os.replace(tmp, final)
+    except Exception:
+        bound(WHATSAPP_MEDIA, "download", "error").inc()
+        raise
+    bound(WHATSAPP_MEDIA, "download", "ok").inc()
+    return final
+
+
+_archiving: Set["asyncio.Task[None]"] = set()
+_last_prune = 0.0
+
+
+def archive_inbound_media(media: Dict[str, Any]) -> None:
+    """Descarga `media` (ver `inbound_media`) a `whatsapp_media_dir` en segundo plano."""
+    task = asyncio.create_task(_archive(media["id"]))
+    _archiving.add(task)
+    task.add_done_callback(_archiving.discard)
+
+
+async def _archive(media_id: str) -> None:
+    global _last_prune
+    try:
+        await download_media(media_id)
+    except Exception as e:
+        logging.warning("WA media %s no descargado: %s", media_id, e)
+    now = time.monotonic()
+    if settings.whatsapp_media_dir and now - _last_prune >= PRUNE_EVERY_S:
+        _last_prune = now
+        await asyncio.to_thread(prune_media_dir, settings.whatsapp_media_dir, settings.whatsapp_media_retention_s)
+
+
+def prune_media_dir(dest_dir: Union[str, Path], max_age_s: float) -> int:
+    """Borra los ficheros de `dest_dir` modificados hace más de `max_age_s`; devuelve cuántos."""
+    cutoff = time.time() - max_age_s
+    removed = 0
+    for path in Path(dest_dir).iterdir():
+        with contextlib.suppress(OSError):  # otro proceso puede haberlo borrado ya
+            if path.is_file() and path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+    if removed:
+        bound(WHATSAPP_MEDIA, "prune", "ok").inc(removed)
+    return removed
+
+
+def _sha256_file(path: Union[str, Path]) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MediaUploader:
+    def __init__(
+        self,
+        cache: TTLCache,
+        *,
+        client: Optional[httpx.AsyncClient] = None,
+        fetch_client: Optional[httpx.AsyncClient] = None,
+        phone_id: Optional[str] = None,
+    ):
+        self.cache = cache
+        self.client = client
+        self.fetch_client = fetch_client
+        self.phone_id = phone_id or settings.whatsapp_phone_id or "default"
+        self.prefix = f"wa-media:{self.phone_id}:"  # los ids son por número emisor
+        self._inflight: Dict[str, asyncio.Task[str]] = {}
+
+    async def media_id_for_url(self, url: str) -> str:
+        key = "url:" + hashlib.sha256(url.encode()).hexdigest()
+        return await self._coalesced(key, lambda: self._upload_url(url))
+
+    async def media_id_for_file(self, path: Union[str, Path], mime_type: Optional[str] = None) -> str:
+        mime = mime_type or mimetypes.guess_type(str(path))[0] or "application/octet-stream"
+        sha = await asyncio.to_thread(_sha256_file, path)
+        return await self._coalesced("sha:" + sha, lambda: self._upload_file(path, mime))
+
+    async def media_id_for_bytes(self, data: bytes, mime_type: str, filename: str = "file") -> str:
+        sha = hashlib.sha256(data).hexdigest()
+        return await self._coalesced("sha:" + sha, lambda: self._upload(data, mime_type, filename))
+
+    async def prepare(self, component: MessageComponent) -> MessageComponent:
+        """Copia de `component` con `media_id` en lugar de `link` (o el original si falla)."""
+        if isinstance(component, (ImageMessage, DocumentMessage)):
+            if component.link and not component.media_id:
+                media_id = await self._try(str(component.link))
+                if media_id:
+                    return component.model_copy(update={"media_id": media_id})
+        elif isinstance(component, ButtonsMessage):
+            header = component.header
+            if header and header.kind != "text" and header.link and not header.media_id:
+                media_id = await self._try(str(header.link))
+                if media_id:
+                    header = header.model_copy(update={"media_id": media_id})
+                    return component.model_copy(update={"header": header})
+        return component
+
+    async def _try(self, url: str) -> Optional[str]:
+        try:
+            return await self.media_id_for_url(url)
+        except Exception as e:
+            logging.warning("WA media: no se pudo subir %s, se envía por link: %s", url, e)
+            return None
+
+    async def _coalesced(self, key: str, make: Callable[[], Awaitable[str]]) -> str:
+        cached = self.cache.get(self.prefix + key)
+        if cached:
+            bound(WHATSAPP_MEDIA, "cache", "hit").inc()
+            return cached
+        task = self._inflight.get(key)
+        if task is None:
+            bound(WHATSAPP_MEDIA, "cache", "miss").inc()
+            task = self._inflight[key] = asyncio.ensure_future(self._fill(key, make))
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        # shield: si un emisor se cancela, la subida sigue para los demás
+        return await asyncio.shield(task)
+
+    async def _fill(self, key: str, make: Callable[[], Awaitable[str]]) -> str:
+        media_id = await make()
+        self.cache.add(self.prefix + key, media_id)
+        return media_id
+
+    async def _upload_url(self, url: str) -> str:
+        fetch = self.fetch_client or http_clients.get("media")
+        tmp_dir = settings.whatsapp_media_dir or tempfile.gettempdir()
+        path, sha, mime = await stream_to_file(fetch, url, tmp_dir)
+        try:
+            name = os.path.basename(httpx.URL(url).path) or "file"
+            return await self._coalesced("sha:" + sha, lambda: self._upload_file(path, mime, name))
+        finally:
+            with contextlib.suppress(OSError):
+                os.unlink(path)
+
+    async def _upload_file(self, path: Union[str, Path], mime: str, name: Optional[str] = None) -> str:
+        with open(path, "rb") as f:  # httpx lo envía por trozos en el multipart
+            return await self._upload(f, mime, name or os.path.basename(path))
+
+    async def _upload(self, content: Union[bytes, IO[bytes]], mime: str, filename: str) -> str:
+        client = self.client or whatsapp_client()
+        try:
+            resp = await client.post(
+                _graph_url(f"{self.phone_id}/media"),
+                headers=_auth(),
+                data={"messaging_product": "whatsapp", "type": mime},
+                files={"file": (filename, content, mime)},
+                timeout=60.0,
+            )
+            resp.raise_for_status()
+            media_id = str(resp.json()["id"])
+        except Exception:
+            bound(WHATSAPP_MEDIA, "upload", "error").inc()
+            raise
+        bound(WHATSAPP_MEDIA, "upload", "ok").inc()
+        return media_id
+
+
+_uploader: Optional[MediaUploader] = None
+
+
+def build_media_uploader() -> MediaUploader:
+    cache: TTLCache = InMemoryTTLCache(settings.whatsapp_media_cache_ttl_s, 10_000)
+    if settings.whatsapp_media_cache_backend == "redis":
+        from core.memory import get_redis_client
+
+        client = get_redis_client()
+        if client is not None:
+            cache = RedisTTLCache(client, prefix="", ttl_s=settings.whatsapp_media_cache_ttl_s)
+        else:
+            logging.warning("whatsapp_media_cache_backend=redis sin Redis configurado: caché en memoria")
+    return MediaUploader(cache)
+
+
+def whatsapp_media_uploader() -> Optional[MediaUploader]:
+    """Uploader compartido (None si `whatsapp_media_cache_enabled` es False)."""
+    global _uploader
+    if not settings.whatsapp_media_cache_enabled:
+        return None
+    if _uploader is None:
+        _uploader = build_media_uploader()
+    return _uploader
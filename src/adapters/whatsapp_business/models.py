@@ -1,43 +1,107 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+"""Modelos del webhook entrante de la Cloud API (tolerantes).
+
+Se validan directamente desde los bytes (`Webhook.model_validate_json`, parser
+JSON de pydantic-core) tras verificar la firma. Todo es opcional o tiene valor
+por defecto y los campos desconocidos se ignoran o se conservan: un tipo de
+mensaje o de status nuevo de Meta no rompe la ingesta.
+"""
+
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Any, Dict, List, Optional
 
 
 class WhatsAppBase(BaseModel):
-    object: str
+    object: Optional[str] = None
+
+
+class Contact(BaseModel):
+    # solo lo que usamos: el resto (profile...) se ignora sin construir dicts
+    wa_id: Optional[str] = None
+
+
+class Text(BaseModel):
+    body: str = ""
+
+
+class Message(BaseModel):
+    # extra="allow": tipos nuevos (order, sticker...) conservan su contenido
+    model_config = ConfigDict(populate_by_name=True, extra="allow")
+
+    from_number: Optional[str] = Field(default=None, alias="from")
+    id: Optional[str] = None
+    timestamp: Optional[str] = None
+    type: str = "unknown"
+    text: Optional[Text] = None
+    interactive: Optional[Dict[str, Any]] = None
+    image: Optional[Dict[str, Any]] = None
+    reaction: Optional[Dict[str, Any]] = None
+    location: Optional[Dict[str, Any]] = None
+
+
+class StatusError(BaseModel):
+    code: Optional[int] = None
+
+
+class Status(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+    id: Optional[str] = None
+    status: str = "unknown"
+    timestamp: Optional[str] = None
+    recipient_id: Optional[str] = None
+    errors: List[StatusError] = []
+
+
+class Metadata(BaseModel):
+    display_phone_number: Optional[str] = None
+    phone_number_id: Optional[str] = None
+
+
+class Value(BaseModel):
+    messaging_product: Optional[str] = None
+    metadata: Optional[Metadata] = None
+    contacts: List[Contact] = []
+    messages: List[Message] = []
+    statuses: List[Status] = []
 
 
 class Change(BaseModel):
-    value: dict
-    field: str
+    value: Value = Value()
+    field: Optional[str] = None
 
 
 class Entry(BaseModel):
-    id: str
-    changes: List[Change]
+    id: Optional[str] = None
+    changes: List[Change] = []
 
 
 class Webhook(WhatsAppBase):
-    entry: List[Entry]
+    entry: List[Entry] = []
 
 
-class Message(BaseModel):
-    from_number: str = Field(..., alias="from")
-    id: str
-    timestamp: str
-    text: dict
-    type: str
+# --- Camino rápido de statuses: solo lo que se agrega (sin contacts/messages,
+# sin conservar pricing/conversation) ---
+class StatusEvent(BaseModel):
+    id: Optional[str] = None
+    status: str = "unknown"
+    timestamp: Optional[str] = None
+    errors: List[StatusError] = []
 
 
-class Metadata(BaseModel):
-    display_phone_number: str
-    phone_number_id: str
+class StatusValue(BaseModel):
+    statuses: List[StatusEvent] = []
 
 
-class Value(BaseModel):
-    messaging_product: str
-    metadata: Metadata
-    contacts: List[dict]
-    messages: List[Message]
+class StatusChange(BaseModel):
+    value: StatusValue = StatusValue()
+
+
+class StatusEntry(BaseModel):
+    changes: List[StatusChange] = []
+
+
+class StatusWebhook(BaseModel):
+    entry: List[StatusEntry] = []
 
 
 class OutgoingMessage(BaseModel):
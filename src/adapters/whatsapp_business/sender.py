@@ -1,8 +1,22 @@
+from typing import Optional
+
+import httpx
+
 from ports.outbound import CatalogSender
 from adapters.whatsapp_business.client import send_catalog_message as _send
 from adapters.whatsapp_business.catalog import OutgoingMessage
+from adapters.whatsapp_business.media import whatsapp_media_uploader
 
 
 class WhatsAppCatalogSender(CatalogSender):
+    """Sender del catálogo sobre el pool compartido (o el `client` inyectado, p. ej. Deps.http)."""
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self.client = client
+
     async def send_catalog_message(self, payload: OutgoingMessage) -> None:
-        await _send(payload)
\ No newline at end of file
+        uploader = whatsapp_media_uploader()
+        if uploader is not None:
+            # media por id ya subido: WhatsApp no re-descarga el link en cada envío
+            payload = payload.model_copy(update={"component": await uploader.prepare(payload.component)})
+        await _send(payload, client=self.client)
@@ -0,0 +1,140 @@
+# adapters/whatsapp_business/statuses.py
+"""Camino rápido de los callbacks de estado (sent/delivered/read/failed).
+
+Meta envía muchos más `statuses` que mensajes de usuario. Un POST que solo
+trae statuses se reconoce sobre los bytes ya firmados (`is_status_only`), se
+valida contra modelos mínimos (`models.StatusWebhook`: sin contacts, messages
+ni pricing) y se agrega en `StatusTracker`, sin construir el MemoryManager ni
+tocar stores, dedup, cola o grafo.
+
+`StatusTracker` guarda:
+- contadores por estado (y `agent_whatsapp_statuses_total`) y por código de
+  error de los `failed`;
+- un índice acotado wamid -> (estado, timestamp) que nunca retrocede: un
+  `delivered` que llega después del `read` no lo pisa.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from collections import Counter, OrderedDict
+from typing import Iterable, Optional, Protocol, Sequence, Tuple
+
+from pydantic import ValidationError
+
+from adapters.whatsapp_business.models import StatusError, StatusWebhook
+from infrastructure.settings import settings
+from observability.metrics import WHATSAPP_STATUSES, bound
+
+# Orden del ciclo de vida; `failed` es terminal
+STATUS_RANK = {"sent": 1, "delivered": 2, "read": 3, "failed": 4}
+
+# Clave JSON `"messages":` (no el valor `"field": "messages"` que traen todos los
+# cambios, ni un `\"messages\"` escapado dentro de un texto de usuario)
+_MESSAGES_KEY = re.compile(rb'"messages"\s*:')
+
+
+class StatusLike(Protocol):
+    """`models.Status` (camino completo) o `models.StatusEvent` (camino rápido)."""
+
+    @property
+    def id(self) -> Optional[str]: ...
+    @property
+    def status(self) -> str: ...
+    @property
+    def timestamp(self) -> Optional[str]: ...
+    @property
+    def errors(self) -> Sequence[StatusError]: ...
+
+
+def is_status_only(raw: bytes) -> bool:
+    """True si el cuerpo trae statuses y ningún mensaje (sin parsear el JSON)."""
+    return b'"statuses"' in raw and _MESSAGES_KEY.search(raw) is None
+
+
+def parse_statuses(raw: bytes) -> Optional[StatusWebhook]:
+    try:
+        return StatusWebhook.model_validate_json(raw)
+    except ValidationError as e:
+        logging.warning("POST /webhook: statuses no válidos (%d errores)", e.error_count())
+        return None
+
+
+def iter_statuses(webhook: StatusWebhook) -> Iterable[StatusLike]:
+    for entry in webhook.entry:
+        for change in entry.changes:
+            yield from change.value.statuses
+
+
+def _label(status: str) -> str:
+    return status if status in STATUS_RANK else "other"  # etiqueta acotada
+
+
+class StatusTracker:
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self.counts: Counter[str] = Counter()
+        self.errors: Counter[int] = Counter()
+        self._index: OrderedDict[str, Tuple[str, Optional[str]]] = OrderedDict()
+
+    def record(self, event: StatusLike) -> None:
+        self._record(event)
+        bound(WHATSAPP_STATUSES, _label(event.status)).inc()
+
+    def record_all(self, events: Iterable[StatusLike]) -> int:
+        """Registra un lote; la métrica Prometheus se incrementa una vez por estado."""
+        seen: Counter[str] = Counter()
+        for event in events:
+            self._record(event)
+            seen[event.status] += 1
+        for status, n in seen.items():
+            bound(WHATSAPP_STATUSES, _label(status)).inc(n)
+        return sum(seen.values())
+
+    def _record(self, event: StatusLike) -> None:
+        status = event.status
+        self.counts[status] += 1
+        if status == "failed":
+            for err in event.errors:
+                if err.code is not None:
+                    self.errors[err.code] += 1
+            logging.warning(
+                "WA status failed: wamid=%s codes=%s", event.id, [e.code for e in event.errors]
+            )
+        if not event.id:
+            return
+        prev = self._index.get(event.id)
+        if prev is not None:
+            self._index.move_to_end(event.id)
+            if STATUS_RANK.get(prev[0], 0) >= STATUS_RANK.get(status, 0):
+                return  # llegó desordenado: no retrocedemos
+        self._index[event.id] = (status, event.timestamp)
+        if len(self._index) > self.max_entries:
+            self._index.popitem(last=False)
+
+    def get(self, wamid: str) -> Optional[str]:
+        """Último estado conocido del mensaje saliente `wamid` (None si no está en el índice)."""
+        entry = self._index.get(wamid)
+        return entry[0] if entry else None
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+_tracker: Optional[StatusTracker] = None
+
+
+def get_status_tracker() -> StatusTracker:
+    global _tracker
+    if _tracker is None:
+        _tracker = StatusTracker(settings.whatsapp_status_index_size)
+    return _tracker
+
+
+def ingest_statuses(raw: bytes) -> int:
+    """Agrega un POST de solo statuses; devuelve cuántos se registraron."""
+    webhook = parse_statuses(raw)
+    if webhook is None:
+        return 0
+    return get_status_tracker().record_all(iter_statuses(webhook))
@@ -1,27 +1,42 @@
 # src/core/agents.py
 from __future__ import annotations
 
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 from pydantic_ai import Agent
-from pydantic_ai.models.openai import OpenAIChatModel
-from pydantic_ai.providers.openai import OpenAIProvider
 
+import httpx
+
+from infrastructure.http import http_clients
 from infrastructure.settings import settings
 from core.deps import Deps
 from core.tools.dummy import dummy_tool
 from core.memory.processors import keep_recent_messages
 
-Agent.instrument_all()
+if TYPE_CHECKING:
+    from pydantic_ai.models.openai import OpenAIChatModel
+
+# Nota: la instrumentación global (Agent.instrument_all) ya no se hace al importar;
+# la activa infrastructure.startup.configure_observability() desde el lifespan.
 
 SYSTEM_PROMPT = """
 Eres un agente de ejemplo (plantilla). Responde de forma breve y neutral.
 Si procede, puedes llamar a herramientas (tools). No inventes información.
 """
 
-def _build_llm() -> OpenAIChatModel:
+def _build_llm(model_name: Optional[str] = None) -> OpenAIChatModel:
+    # Import perezoso: el SDK de OpenAI es lo más pesado del arranque.
+    from pydantic_ai.models.openai import OpenAIChatModel
+    from pydantic_ai.providers.openai import OpenAIProvider
+
+    # Cliente del pool compartido: el warm-up (infrastructure.warmup) lo mantiene caliente.
+    http_client = http_clients.get("openai", timeout=httpx.Timeout(600, connect=5))
     return OpenAIChatModel(
-        "gpt-4.1-mini",
-        provider=OpenAIProvider(api_key=settings.openai_api_key),
+        model_name or settings.llm_model,
+        provider=OpenAIProvider(
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url,
+            http_client=http_client,
+        ),
     )
 
 MAX_HISTORY = 15
@@ -16,6 +16,10 @@ class Deps:
     # Para el template: en vez de un objeto Model, exponemos un nombre de modelo.
     # P. ej. "test" en CI, o "openai:gpt-4.1-mini" en real.
     model_name: Optional[str] = "test"
+    # core.routing.ModelRouter opcional: si está, manda sobre model_name
+    model_router: Optional[Any] = None
+    # core.hedging.Hedger opcional alrededor de cada llamada al modelo
+    hedger: Optional[Any] = None
 
     # Campos opcionales que podrías querer inyectar más tarde
     empresas_api_token: Optional[str] = None
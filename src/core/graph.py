@@ -1,5 +1,6 @@
 # src/core/graph.py
 from __future__ import annotations
+import time
 from typing import Any, List, Tuple, Optional
 
 from langgraph.graph import StateGraph, END
@@ -20,6 +21,16 @@ from pydantic_ai.models.test import TestModel  # modelo concreto para tools
 from core.agents import create_agent
 from core.deps import Deps
 from core.tools.dummy import dummy_tool
+from core.usage import TurnUsage, record_usage_metrics
+from infrastructure.settings import settings
+from observability.metrics import (
+    GRAPH_NODE_SECONDS,
+    MEMORY_OP_SECONDS,
+    MODEL_CALL_ERRORS,
+    MODEL_CALL_SECONDS,
+    model_label,
+    timed,
+)
 
 
 # -------- util mensajes --------
@@ -37,6 +48,7 @@ class GraphState(BaseModel):
     agent_output: Optional[str] = None
     tool_output: Optional[str] = None
     history: List[ModelMessage] = Field(default_factory=list)
+    usage: Optional[TurnUsage] = None  # tokens/coste/latencia del turno (node_agent)
 
 
 # -------- nodos puros (reciben deps) --------
@@ -44,13 +56,29 @@ async def node_agent(state: GraphState, deps: Deps) -> GraphState:
     """
     Ejecuta el agente dummy. Para tipado correcto con pydantic-ai:
     pasamos el modelo por nombre en `agent.run(..., model=...)`.
+    Si deps.model_router está configurado, él elige el modelo (y los fallbacks);
+    si deps.hedger está configurado, cada llamada al modelo va con hedging.
     """
     agent = create_agent()  # el propio agente tiene su modelo por defecto
-    run_model = deps.model_name or "test"
-    result = await agent.run(state.user_input, model=run_model)
+    chosen = {"model": model_label(deps.model_name or "test")}
+
+    async def _call(model: Any) -> Any:
+        chosen["model"] = model_label(model)  # el último intento es el que respondió
+        with timed(MODEL_CALL_SECONDS, model_label(model), errors=MODEL_CALL_ERRORS):
+            if deps.hedger is not None:
+                # latencias por modelo: cada uno hedgea según su propia distribución
+                return await deps.hedger.run(lambda: agent.run(state.user_input, model=model), key=model_label(model))
+            return await agent.run(state.user_input, model=model)
+
+    t0 = time.perf_counter()
+    if deps.model_router is not None:
+        result = await deps.model_router.run(_call, state.user_input)
+    else:
+        result = await _call(deps.model_name or "test")
+    usage = TurnUsage.from_result(result, chosen["model"], time.perf_counter() - t0)
     reply_text = result.output or ""
     new_hist = (state.history or []) + [user_msg(state.user_input), assistant_msg(reply_text)]
-    return state.model_copy(update={"agent_output": reply_text, "history": new_hist})
+    return state.model_copy(update={"agent_output": reply_text, "history": new_hist, "usage": usage})
 
 
 async def node_tool(state: GraphState, deps: Deps) -> GraphState:
@@ -61,7 +89,7 @@ async def node_tool(state: GraphState, deps: Deps) -> GraphState:
     run_ctx = RunContext(
         deps=deps,
         model=TestModel(),           # evita abstractos; mypy OK
-        usage=RunUsage(),
+        usage=state.usage.to_run_usage() if state.usage else RunUsage(),
     )
     tool_reply = await dummy_tool(run_ctx, payload=state.agent_output or "")
     new_hist = (state.history or []) + [assistant_msg(tool_reply)]
@@ -75,12 +103,22 @@ def create_graph() -> Tuple[Any, Deps]:
     Currificamos deps en funciones internas para contentar al tipo de add_node.
     """
     deps = Deps()  # todos opcionales por defecto (model_name="test")
+    if settings.model_routing_enabled:
+        from core.routing import build_model_router
+
+        deps.model_router = build_model_router()
+    if settings.llm_hedging_enabled:
+        from core.hedging import build_hedger
+
+        deps.hedger = build_hedger()
 
     async def _agent_action(state: GraphState) -> GraphState:
-        return await node_agent(state, deps)
+        with timed(GRAPH_NODE_SECONDS, "agent"):
+            return await node_agent(state, deps)
 
     async def _tool_action(state: GraphState) -> GraphState:
-        return await node_tool(state, deps)
+        with timed(GRAPH_NODE_SECONDS, "tool"):
+            return await node_tool(state, deps)
 
     g = StateGraph(GraphState)
     g.add_node("agent", _agent_action)
@@ -100,9 +138,11 @@ async def run_with_memory(
     mm: Any,
     session_id: str,
     user_text: str,
-    MAX_HISTORY: int = 15
+    MAX_HISTORY: int = 15,
+    channel: str = "unknown",
 ) -> tuple[str, list[ModelMessage]]:
-    history_raw = mm.load(session_id) if mm is not None else []
+    with timed(MEMORY_OP_SECONDS, "load"):
+        history_raw = mm.load(session_id) if mm is not None else []
     history: list[ModelMessage] = ModelMessagesTypeAdapter.validate_python(history_raw or [])
 
     state = GraphState(session_id=session_id, user_input=user_text, history=history)
@@ -113,7 +153,14 @@ async def run_with_memory(
     appended = final.history or [user_msg(user_text), assistant_msg(reply)]
     all_msgs = history + appended
 
+    if final.usage is not None:
+        record_usage_metrics(final.usage, channel)
+        record = getattr(mm, "record_usage", None)
+        if record is not None:
+            record(session_id, channel, final.usage)
+
     if mm is not None:
-        await mm.save_from_result(session_id, all_msgs, MAX_HISTORY=MAX_HISTORY)
+        with timed(MEMORY_OP_SECONDS, "save"):
+            await mm.save_from_result(session_id, all_msgs, MAX_HISTORY=MAX_HISTORY)
 
     return reply, all_msgs
@@ -0,0 +1,175 @@
+# src/core/hedging.py
+"""Hedging de llamadas al modelo para recortar la latencia de cola.
+
+Si la llamada no ha respondido al llegar al percentil `percentile` de la
+latencia reciente, se lanza una segunda llamada idéntica; gana la primera que
+termine bien y la otra se cancela. Un presupuesto tipo token-bucket limita la
+carga extra: cada llamada deposita `budget_ratio` tokens y cada hedge gasta uno
+(con `budget_ratio=0.1`, como mucho ~10% de peticiones adicionales).
+
+La latencia se mide por `key` (el modelo): con routing, el modelo rápido y el
+lento tienen distribuciones muy distintas y un percentil mezclado hedgearía
+tarde al primero y casi siempre al segundo. El presupuesto es común.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Set, TypeVar
+
+from infrastructure.settings import settings
+from observability.metrics import MODEL_HEDGES
+
+T = TypeVar("T")
+
+
+class LatencyWindow:
+    """Ventana deslizante de latencias recientes (segundos)."""
+
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, latency_s: float) -> None:
+        self._samples.append(latency_s)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))
+        return ordered[idx]
+
+
+class HedgeBudget:
+    """Token bucket: `ratio` tokens por llamada, 1 token por hedge, tope `max_tokens`."""
+
+    def __init__(self, ratio: float = 0.1, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = 0.0
+
+    def deposit(self) -> None:
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class Hedger:
+    def __init__(
+        self,
+        *,
+        percentile: float = 95.0,
+        window: int = 200,
+        min_samples: int = 20,
+        initial_delay_s: Optional[float] = None,
+        min_delay_s: float = 0.0,
+        budget: Optional[HedgeBudget] = None,
+    ):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.initial_delay_s = initial_delay_s
+        self.min_delay_s = min_delay_s
+        self.window_size = window
+        self._windows: Dict[str, LatencyWindow] = {}
+        self.budget = budget or HedgeBudget()
+
+    def window(self, key: str = "") -> LatencyWindow:
+        """Ventana de latencias de `key` (p. ej. el modelo)."""
+        latencies = self._windows.get(key)
+        if latencies is None:
+            latencies = self._windows[key] = LatencyWindow(self.window_size)
+        return latencies
+
+    @property
+    def latencies(self) -> LatencyWindow:
+        return self.window()
+
+    def hedge_delay(self, key: str = "") -> Optional[float]:
+        """Espera antes de lanzar el hedge (None = sin datos suficientes: no hedgear)."""
+        latencies = self.window(key)
+        if len(latencies) < self.min_samples:
+            return self.initial_delay_s
+        p = latencies.percentile(self.percentile)
+        return None if p is None else max(self.min_delay_s, p)
+
+    async def run(self, factory: Callable[[], Awaitable[T]], key: str = "") -> T:
+        """Ejecuta `factory()` con hedging. `factory` debe poder invocarse dos veces.
+
+        `key` elige la ventana de latencias (el modelo al que va la llamada).
+
+        La ventana registra la latencia de la petición desde que arranca la
+        primaria (t0), gane quien gane: si gana el hedge, ese tiempo es una
+        cota inferior de lo que habría tardado la primaria cancelada. Si nos
+        cancelan con la primaria aún en vuelo pasado el retardo, se anota lo
+        transcurrido (>= retardo) como cota inferior: sin esto la ventana perdería justo las
+        llamadas lentas y el percentil se sesgaría a la baja.
+        """
+        self.budget.deposit()
+        latencies = self.window(key)
+        delay = self.hedge_delay(key)
+        t0 = time.perf_counter()
+        sampled = False
+
+        def sample() -> None:
+            nonlocal sampled
+            sampled = True
+            latencies.add(time.perf_counter() - t0)
+
+        primary: asyncio.Task[T] = asyncio.ensure_future(factory())
+        tasks: Set[asyncio.Task[T]] = {primary}
+        try:
+            if delay is not None:
+                await asyncio.wait(tasks, timeout=delay)
+            hedge_now = delay is not None and not primary.done()
+            if hedge_now and not self.budget.withdraw():
+                MODEL_HEDGES.labels("budget_exhausted").inc()
+                hedge_now = False
+            if not hedge_now:
+                result = await primary
+                sample()
+                return result
+
+            MODEL_HEDGES.labels("fired").inc()
+            hedge: asyncio.Task[T] = asyncio.ensure_future(factory())
+            tasks.add(hedge)
+            last_exc: Optional[BaseException] = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    exc = t.exception()
+                    if exc is None:
+                        MODEL_HEDGES.labels("won_hedge" if t is hedge else "won_primary").inc()
+                        sample()
+                        return t.result()
+                    last_exc = exc
+            assert last_exc is not None
+            raise last_exc
+        finally:
+            elapsed = time.perf_counter() - t0
+            if not sampled and delay is not None and elapsed >= delay and (not primary.done() or primary.cancelled()):
+                latencies.add(elapsed)
+            # cancela al perdedor (o a ambos si nos cancelan a nosotros)
+            for t in tasks:
+                if not t.done():
+                    t.cancel()
+
+
+def build_hedger() -> Hedger:
+    initial = settings.llm_hedge_initial_delay_ms
+    return Hedger(
+        percentile=settings.llm_hedge_percentile,
+        min_samples=settings.llm_hedge_min_samples,
+        initial_delay_s=initial / 1000 if initial else None,
+        budget=HedgeBudget(ratio=settings.llm_hedge_budget_ratio),
+    )
@@ -1,13 +1,25 @@
 # cordobai/core/memory/__init__.py
 from __future__ import annotations
 import os
-from typing import List, Optional
+from typing import TYPE_CHECKING, Any, List, Optional
 from redis import Redis
 
 from infrastructure.settings import settings
 from .in_memory import InMemoryHistory, memory_store
-from .manager import HistoryStore
-from .redis_store import RedisWindowStore
+from .usage_store import InMemoryUsage, RedisUsage, UsageStore, usage_store
+
+if TYPE_CHECKING:
+    from .manager import HistoryStore
+    from .redis_store import RedisWindowStore
+
+
+def __getattr__(name: str) -> Any:
+    # RedisWindowStore arrastra pydantic-ai (codec): se importa bajo demanda.
+    if name == "RedisWindowStore":
+        from .redis_store import RedisWindowStore
+
+        return RedisWindowStore
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def _env_str(key: str, default: str = "") -> str:
@@ -39,6 +51,11 @@ def _build_redis_client() -> Optional[Redis]:
     return None
 
 
+def get_redis_client() -> Optional[Redis]:
+    """Cliente Redis según REDIS_URL / REDIS_HOST (None si no hay configuración)."""
+    return _build_redis_client()
+
+
 def get_memory_store() -> HistoryStore | list[HistoryStore] | None:
     """
     Devuelve la(s) store(s) de memoria según settings.memory_backend:
@@ -46,6 +63,8 @@ def get_memory_store() -> HistoryStore | list[HistoryStore] | None:
     - 'redis'      -> RedisWindowStore si hay envs, si no, fallback a InMemoryHistory
     - 'combined'   -> [InMemoryHistory, (RedisWindowStore si hay envs)]
     """
+    from .redis_store import RedisWindowStore
+
     backend = getattr(settings, "memory_backend", "in_memory")
     client = _build_redis_client()
 
@@ -61,8 +80,27 @@ def get_memory_store() -> HistoryStore | list[HistoryStore] | None:
     return memory_store
 
 
+def get_usage_store() -> UsageStore:
+    """
+    Store del consumo por sesión, en el mismo backend que el historial:
+    - 'redis' / 'combined' con envs de Redis -> RedisUsage
+    - en otro caso                            -> InMemoryUsage (global)
+    """
+    backend = getattr(settings, "memory_backend", "in_memory")
+    if backend in ("redis", "combined"):
+        client = _build_redis_client()
+        if client:
+            return RedisUsage(client, ttl_s=settings.usage_ttl_s, top_size=settings.usage_top_size)
+    return usage_store
+
+
 __all__ = [
     "get_memory_store",
+    "get_usage_store",
+    "get_redis_client",
+    "InMemoryUsage",
+    "RedisUsage",
+    "usage_store",
     "InMemoryHistory",
     "RedisWindowStore",
     "memory_store",
@@ -1,9 +1,12 @@
 # core/memory/manager.py
 from __future__ import annotations
-from typing import Protocol, List
-from pydantic_ai.messages import ModelMessage
-from core.memory.processors import strip_tool_traffic
-from core.memory.processors import keep_recent_messages  # async
+from typing import TYPE_CHECKING, Any, Dict, Optional, Protocol, List
+
+if TYPE_CHECKING:
+    # Solo tipado: pydantic-ai se importa al guardar, no al arrancar los routers.
+    from pydantic_ai.messages import ModelMessage
+    from core.usage import TurnUsage
+    from .usage_store import UsageStore
 
 
 class HistoryStore(Protocol):
@@ -15,13 +18,18 @@ class HistoryStore(Protocol):
 class MemoryManager:
     """Coordina acceso a una o varias stores de historial."""
 
-    def __init__(self, store: HistoryStore | list[HistoryStore] | None):
+    def __init__(
+        self,
+        store: HistoryStore | list[HistoryStore] | None,
+        usage: Optional[UsageStore] = None,
+    ):
         if store is None:
             self.stores: List[HistoryStore] = []
         elif isinstance(store, list):
             self.stores = store
         else:
             self.stores = [store]
+        self.usage = usage
 
     def load(self, session_id: str) -> List[ModelMessage]:
         for store in self.stores:
@@ -33,12 +41,24 @@ class MemoryManager:
     async def save_from_result(
         self, session_id: str, all_messages: List[ModelMessage], MAX_HISTORY: int = 15
     ) -> List[ModelMessage]:
+        from core.memory.processors import keep_recent_messages, strip_tool_traffic
+
         cleaned = strip_tool_traffic(all_messages)
         cropped = await keep_recent_messages(cleaned, MAX_HISTORY=MAX_HISTORY)
         for store in self.stores:
             store.set(session_id, cropped)
         return cropped
 
+    def record_usage(self, session_id: str, channel: str, usage: TurnUsage) -> None:
+        """Acumula el consumo del turno en la store de uso (si hay)."""
+        if self.usage is not None:
+            self.usage.add(session_id, channel, usage)
+
+    def usage_for(self, session_id: str) -> Dict[str, Any]:
+        return self.usage.get(session_id) if self.usage is not None else {}
+
     def reset(self, session_id: str) -> None:
         for store in self.stores:
             store.clear(session_id)
+        if self.usage is not None:
+            self.usage.clear(session_id)
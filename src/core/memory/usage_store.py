@@ -0,0 +1,152 @@
+# core/memory/usage_store.py
+"""Acumulado de consumo por sesión, guardado junto al historial.
+
+Formato compacto: un contador por campo (turns, requests, tokens, coste y
+latencia acumulada) más el último canal/modelo. En Redis es un hash
+`usage:<session_id>` actualizado con HINCRBY/HINCRBYFLOAT en un pipeline, y
+dos sorted sets (`usage:top:cost`, `usage:top:latency`) para listar las
+sesiones más caras o más lentas sin recorrer claves.
+
+Acotado: cada hash caduca `usage_ttl_s` después de su último turno, los
+rankings se recortan a las `usage_top_size` primeras sesiones y en memoria
+se guardan como mucho `usage_max_sessions` sesiones (se expulsa la menos
+reciente).
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Protocol, Tuple
+
+from infrastructure.settings import settings
+
+if TYPE_CHECKING:
+    from core.usage import TurnUsage
+
+# campo compacto -> atributo de TurnUsage
+_FIELDS = {
+    "r": "requests",
+    "in": "input_tokens",
+    "out": "output_tokens",
+    "cr": "cache_read_tokens",
+}
+_RANKINGS = ("cost", "latency")
+
+
+class UsageStore(Protocol):
+    def add(self, sid: str, channel: str, usage: TurnUsage) -> None: ...
+    def get(self, sid: str) -> Dict[str, Any]: ...
+    def top(self, by: str = "cost", n: int = 10) -> List[Tuple[str, float]]: ...
+    def clear(self, sid: str) -> None: ...
+
+
+def _expand(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Formato compacto -> dict legible."""
+    if not raw:
+        return {}
+    out: Dict[str, Any] = {"turns": int(raw.get("t", 0))}
+    for short, name in _FIELDS.items():
+        out[name] = int(raw.get(short, 0))
+    out["cost_usd"] = float(raw.get("cost", 0.0))
+    out["latency_s"] = float(raw.get("lat", 0.0))
+    out["channel"] = raw.get("ch")
+    out["model"] = raw.get("m")
+    return out
+
+
+class InMemoryUsage:
+    def __init__(self, max_sessions: int = 10_000) -> None:
+        self.max_sessions = max_sessions
+        self._store: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    def add(self, sid: str, channel: str, usage: TurnUsage) -> None:
+        row = self._store.setdefault(sid, {})
+        self._store.move_to_end(sid)
+        while len(self._store) > self.max_sessions:
+            self._store.popitem(last=False)  # la sesión con el turno más antiguo
+        row["t"] = row.get("t", 0) + 1
+        for short, name in _FIELDS.items():
+            row[short] = row.get(short, 0) + getattr(usage, name)
+        row["cost"] = row.get("cost", 0.0) + (usage.cost_usd or 0.0)
+        row["lat"] = row.get("lat", 0.0) + usage.latency_s
+        row["ch"], row["m"] = channel, usage.model
+
+    def get(self, sid: str) -> Dict[str, Any]:
+        return _expand(self._store.get(sid, {}))
+
+    def top(self, by: str = "cost", n: int = 10) -> List[Tuple[str, float]]:
+        key = "lat" if by == "latency" else "cost"
+        ranked = sorted(
+            ((sid, float(row.get(key, 0.0))) for sid, row in self._store.items()),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+        return ranked[:n]
+
+    def clear(self, sid: str) -> None:
+        self._store.pop(sid, None)
+
+
+class RedisUsage:
+    def __init__(
+        self,
+        redis_client: Any,
+        prefix: str = "usage:",
+        *,
+        ttl_s: float = 30 * 86400,
+        top_size: int = 1000,
+    ):
+        self.redis_client = redis_client
+        self.prefix = prefix
+        self.ttl_s = max(1, int(ttl_s))
+        self.top_size = max(1, top_size)
+
+    def _key(self, sid: str) -> str:
+        return f"{self.prefix}{sid}"
+
+    def add(self, sid: str, channel: str, usage: TurnUsage) -> None:
+        key = self._key(sid)
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hincrby(key, "t", 1)
+        for short, name in _FIELDS.items():
+            value = getattr(usage, name)
+            if value:
+                pipe.hincrby(key, short, value)
+        if usage.cost_usd:
+            pipe.hincrbyfloat(key, "cost", usage.cost_usd)
+            pipe.zincrby(f"{self.prefix}top:cost", usage.cost_usd, sid)
+        pipe.hincrbyfloat(key, "lat", usage.latency_s)
+        pipe.zincrby(f"{self.prefix}top:latency", usage.latency_s, sid)
+        pipe.hset(key, mapping={"ch": channel, "m": usage.model})
+        pipe.expire(key, self.ttl_s)
+        for ranking in _RANKINGS:
+            # solo las `top_size` primeras: el resto no aparecería en `top()`
+            pipe.zremrangebyrank(f"{self.prefix}top:{ranking}", 0, -self.top_size - 1)
+        pipe.execute()
+
+    def get(self, sid: str) -> Dict[str, Any]:
+        raw = self.redis_client.hgetall(self._key(sid)) or {}
+        decoded = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in raw.items()
+        }
+        return _expand(decoded)
+
+    def top(self, by: str = "cost", n: int = 10) -> List[Tuple[str, float]]:
+        ranking = by if by in _RANKINGS else "cost"
+        rows = self.redis_client.zrevrange(f"{self.prefix}top:{ranking}", 0, n - 1, withscores=True)
+        return [(sid.decode() if isinstance(sid, bytes) else sid, float(score)) for sid, score in rows]
+
+    def clear(self, sid: str) -> None:
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.delete(self._key(sid))
+        for ranking in _RANKINGS:
+            pipe.zrem(f"{self.prefix}top:{ranking}", sid)
+        pipe.execute()
+
+
+# instancia global (igual que memory_store)
+usage_store = InMemoryUsage(settings.usage_max_sessions)
@@ -0,0 +1,171 @@
+# src/core/routing.py
+"""Router de modelos con cadena de fallback y estadísticas EWMA.
+
+- Un clasificador barato decide si el mensaje es trivial (saludo, "ok",
+  "gracias"...) y, si hay modelo rápido configurado, lo manda allí primero.
+- Para el resto se sigue la cadena configurada (primario -> fallbacks), pero
+  las rutas cuya latencia EWMA supera su SLO (o con demasiados errores) se
+  relegan al final. Cada `probe_every` peticiones se deja pasar una a la ruta
+  degradada para que sus estadísticas puedan recuperarse.
+- Si un intento falla (excepción o timeout) se pasa al siguiente de la cadena.
+
+Las decisiones se exportan como métricas (observability.metrics) etiquetadas
+por el nombre de ruta configurado (cardinalidad acotada).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, List, Optional, TypeVar
+
+from infrastructure.settings import settings
+from observability.metrics import (
+    MODEL_ROUTE_DECISIONS,
+    MODEL_ROUTE_EWMA_ERRORS,
+    MODEL_ROUTE_EWMA_LATENCY,
+    MODEL_ROUTE_FALLBACKS,
+)
+
+T = TypeVar("T")
+
+TRIVIAL = "trivial"
+DEFAULT = "default"
+
+_TRIVIAL_RE = re.compile(
+    r"^\s*(hola|hey|hi|hello|buenas|buenos d[ií]as|buenas (tardes|noches)|gracias|"
+    r"muchas gracias|thanks|thank you|ok|okay|vale|perfecto|genial|s[ií]|no|adi[oó]s|"
+    r"bye|chao|/start|start)[\s!.?¡¿]*$",
+    re.IGNORECASE,
+)
+
+
+def default_classifier(text: str) -> str:
+    """Clasificador barato: saludos/confirmaciones cortas -> TRIVIAL."""
+    t = (text or "").strip()
+    if not t or len(t) <= 3 or _TRIVIAL_RE.match(t):
+        return TRIVIAL
+    return DEFAULT
+
+
+@dataclass
+class ModelStats:
+    """Latencia y tasa de error como medias móviles exponenciales."""
+
+    alpha: float = 0.2
+    latency_s: Optional[float] = None
+    error_rate: float = 0.0
+    samples: int = 0
+
+    def observe(self, latency_s: float, ok: bool) -> None:
+        a = self.alpha
+        if ok:
+            # la latencia solo se alimenta de respuestas válidas
+            self.latency_s = latency_s if self.latency_s is None else a * latency_s + (1 - a) * self.latency_s
+        self.error_rate = a * (0.0 if ok else 1.0) + (1 - a) * self.error_rate
+        self.samples += 1
+
+
+@dataclass
+class RouteTarget:
+    name: str                      # etiqueta de métricas: "primary", "fast", "fallback-1"...
+    model: Any                     # pydantic-ai Model o nombre ("openai:gpt-4.1-mini", "test")
+    slo_s: float = 4.0             # latencia EWMA por encima de la cual se considera degradada
+    timeout_s: Optional[float] = None  # corte duro por intento (None = sin límite)
+    max_error_rate: float = 0.5
+    stats: ModelStats = field(default_factory=ModelStats)
+
+    def degraded(self, min_samples: int) -> bool:
+        s = self.stats
+        if s.samples < min_samples:
+            return False
+        slow = s.latency_s is not None and s.latency_s > self.slo_s
+        return slow or s.error_rate > self.max_error_rate
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        chain: List[RouteTarget],
+        *,
+        fast: Optional[RouteTarget] = None,
+        classifier: Callable[[str], str] = default_classifier,
+        min_samples: int = 3,
+        probe_every: int = 20,
+    ):
+        if not chain:
+            raise ValueError("ModelRouter necesita al menos un modelo en la cadena")
+        self.chain = chain
+        self.fast = fast
+        self.classifier = classifier
+        self.min_samples = min_samples
+        self.probe_every = max(1, probe_every)
+        self._requests = 0
+
+    def plan(self, text: str) -> tuple[List[RouteTarget], str]:
+        """Orden de intentos para `text` y motivo de la 1ª elección."""
+        self._requests += 1
+        if self.fast is not None and self.classifier(text) == TRIVIAL:
+            return [self.fast] + self.chain, "classifier"
+
+        probing = self._requests % self.probe_every == 0
+        healthy = [t for t in self.chain if probing or not t.degraded(self.min_samples)]
+        degraded = [t for t in self.chain if t not in healthy]
+        if not healthy:
+            return degraded, "all_degraded"
+        reason = "primary" if healthy[0] is self.chain[0] else "slo_breach"
+        if probing and any(t.degraded(self.min_samples) for t in self.chain):
+            reason = "probe"
+        return healthy + degraded, reason
+
+    def _record(self, target: RouteTarget, latency_s: float, ok: bool) -> None:
+        target.stats.observe(latency_s, ok)
+        if target.stats.latency_s is not None:
+            MODEL_ROUTE_EWMA_LATENCY.labels(target.name).set(target.stats.latency_s)
+        MODEL_ROUTE_EWMA_ERRORS.labels(target.name).set(target.stats.error_rate)
+
+    async def run(self, call: Callable[[Any], Awaitable[T]], text: str) -> T:
+        """Ejecuta `call(model)` siguiendo el plan; cae al siguiente si falla."""
+        attempts, reason = self.plan(text)
+        last_exc: Optional[BaseException] = None
+        for i, target in enumerate(attempts):
+            MODEL_ROUTE_DECISIONS.labels(target.name, reason if i == 0 else "fallback").inc()
+            t0 = time.perf_counter()
+            try:
+                if target.timeout_s is not None:
+                    result = await asyncio.wait_for(call(target.model), target.timeout_s)
+                else:
+                    result = await call(target.model)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._record(target, time.perf_counter() - t0, ok=False)
+                cause = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+                MODEL_ROUTE_FALLBACKS.labels(target.name, cause).inc()
+                last_exc = e
+                continue
+            self._record(target, time.perf_counter() - t0, ok=True)
+            return result
+        assert last_exc is not None
+        raise last_exc
+
+
+def _split(names: str) -> List[str]:
+    return [n.strip() for n in (names or "").split(",") if n.strip()]
+
+
+def build_model_router() -> ModelRouter:
+    """Router a partir de settings (llm_model, llm_fallback_models, llm_fast_model)."""
+    from core.agents import _build_llm
+
+    slo_s = settings.llm_slo_ms / 1000
+    timeout_s = settings.llm_attempt_timeout_ms / 1000 if settings.llm_attempt_timeout_ms else None
+    chain = [RouteTarget("primary", _build_llm(settings.llm_model), slo_s=slo_s, timeout_s=timeout_s)]
+    for i, name in enumerate(_split(settings.llm_fallback_models), start=1):
+        chain.append(RouteTarget(f"fallback-{i}", _build_llm(name), slo_s=slo_s, timeout_s=timeout_s))
+    fast = None
+    if settings.llm_fast_model:
+        fast = RouteTarget("fast", _build_llm(settings.llm_fast_model), slo_s=slo_s, timeout_s=timeout_s)
+    return ModelRouter(chain, fast=fast)
@@ -0,0 +1,44 @@
+# src/core/runtime.py
+"""Acceso perezoso al grafo compartido por los adapters.
+
+Los handlers ya no llaman a create_graph() al importarse: el grafo (y con él
+langgraph, pydantic-ai y el SDK del proveedor) se construye en la primera
+petición o en el warm-up del lifespan (ver infrastructure.startup).
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Tuple
+
+if TYPE_CHECKING:
+    from core.deps import Deps
+    from pydantic_ai.messages import ModelMessage
+
+
+@lru_cache(maxsize=1)
+def get_graph_and_deps() -> Tuple[Any, Deps]:
+    """Singleton perezoso de (grafo compilado, deps)."""
+    from core.graph import create_graph
+
+    return create_graph()
+
+
+def is_graph_ready() -> bool:
+    """True si el grafo ya está construido (útil para readiness)."""
+    return get_graph_and_deps.cache_info().currsize > 0
+
+
+def reset_graph() -> None:
+    """Descarta el grafo cacheado (tests / recarga de configuración)."""
+    get_graph_and_deps.cache_clear()
+
+
+async def run_turn(
+    mm: Any, session_id: str, user_text: str, **kwargs: Any
+) -> tuple[str, list[ModelMessage]]:
+    """Ejecuta run_with_memory sobre el grafo compartido."""
+    from core.graph import run_with_memory
+
+    graph, deps = get_graph_and_deps()
+    return await run_with_memory(graph, deps, mm, session_id, user_text, **kwargs)
@@ -0,0 +1,77 @@
+# src/core/usage.py
+"""Consumo de tokens y coste estimado por turno.
+
+`agent.run()` devuelve el `RunUsage` del turno y, en cada `ModelResponse`, el
+modelo que respondió; con eso se calcula el coste estimado vía `genai-prices`
+(el mismo cálculo que `ModelResponse.price()`). Si el modelo no tiene precio
+conocido (p. ej. `TestModel` en CI) el coste queda en `None`.
+
+Cada turno se exporta como métricas por canal y modelo (cardinalidad acotada)
+y se acumula por sesión en la store de uso (core.memory.usage_store), junto
+al historial, para localizar las conversaciones caras y lentas.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from observability.metrics import AGENT_COST_USD, AGENT_TOKENS, AGENT_TURN_SECONDS, bound
+
+
+class TurnUsage(BaseModel):
+    model: str = "unknown"
+    requests: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cost_usd: Optional[float] = None  # None = sin precio conocido para el modelo
+    latency_s: float = 0.0
+
+    @classmethod
+    def from_result(cls, result: Any, model: str, latency_s: float) -> "TurnUsage":
+        """Construye el uso del turno a partir del resultado de `agent.run()`."""
+        from pydantic_ai.messages import ModelResponse
+
+        u = result.usage()
+        cost: Optional[float] = 0.0
+        for msg in result.new_messages():
+            if not isinstance(msg, ModelResponse):
+                continue
+            try:
+                cost = None if cost is None else cost + float(msg.price().total_price)
+            except (LookupError, AssertionError):
+                # modelo sin precio en genai-prices (o sin nombre): coste desconocido
+                cost = None
+        return cls(
+            model=model,
+            requests=u.requests,
+            input_tokens=u.input_tokens,
+            output_tokens=u.output_tokens,
+            cache_read_tokens=u.cache_read_tokens,
+            cost_usd=cost,
+            latency_s=latency_s,
+        )
+
+    def to_run_usage(self) -> Any:
+        """`RunUsage` equivalente (para el RunContext de las tools)."""
+        from pydantic_ai.usage import RunUsage
+
+        return RunUsage(
+            requests=self.requests,
+            input_tokens=self.input_tokens,
+            output_tokens=self.output_tokens,
+            cache_read_tokens=self.cache_read_tokens,
+        )
+
+
+def record_usage_metrics(usage: TurnUsage, channel: str) -> None:
+    """Exporta el turno: tokens por tipo, coste y latencia por canal y modelo."""
+    model = usage.model
+    bound(AGENT_TOKENS, channel, model, "input").inc(usage.input_tokens)
+    bound(AGENT_TOKENS, channel, model, "output").inc(usage.output_tokens)
+    bound(AGENT_TOKENS, channel, model, "cache_read").inc(usage.cache_read_tokens)
+    if usage.cost_usd:
+        bound(AGENT_COST_USD, channel, model).inc(usage.cost_usd)
+    bound(AGENT_TURN_SECONDS, channel, model).observe(usage.latency_s)
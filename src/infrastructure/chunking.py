@@ -0,0 +1,130 @@
+# src/infrastructure/chunking.py
+"""Troceo de respuestas largas y envío ordenado de los trozos.
+
+Antes WhatsApp truncaba a 4000 caracteres y Telegram rechazaba (400) todo lo
+que pasara de 4096. Ahora la respuesta se trocea dentro del límite del canal
+cortando, por este orden de preferencia, en párrafo, línea, fin de frase o
+espacio (solo se corta una palabra si no queda otra).
+
+`send_ordered` envía los trozos en orden: preparar el siguiente (construir el
+payload) se solapa con el POST en vuelo del anterior, pero los POST van de uno
+en uno, porque ni WhatsApp ni Telegram garantizan el orden de peticiones
+concurrentes. Si un trozo falla se lanza `ChunkSendError` con cuántos se
+entregaron; `start` permite reanudar sin reenviar los ya entregados.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+from typing import Any, Awaitable, Callable, List, Optional, Sequence
+
+WHATSAPP_TEXT_LIMIT = 4096
+TELEGRAM_TEXT_LIMIT = 4096  # medido en unidades UTF-16 (ver `utf16_len`)
+
+# Un trozo no debe quedarse por debajo de esta fracción del límite por cortar
+# en un separador "bonito" muy temprano
+_MIN_FILL = 0.5
+_BOUNDARIES = (
+    re.compile(r"\n\s*\n"),  # párrafo
+    re.compile(r"\n"),  # línea
+    re.compile(r"(?<=[.!?…:;])\s"),  # fin de frase
+    re.compile(r"\s"),  # palabra
+)
+
+
+def utf16_len(text: str) -> int:
+    """Longitud en unidades UTF-16 (como cuenta Telegram: un emoji suele valer 2)."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _window(text: str, limit: int, measure: Callable[[str], int]) -> int:
+    """Mayor k con measure(text[:k]) <= limit."""
+    if measure is len:
+        return min(len(text), limit)
+    lo, hi = 0, min(len(text), limit)
+    while lo < hi:  # measure es monótona: búsqueda binaria
+        mid = (lo + hi + 1) // 2
+        if measure(text[:mid]) <= limit:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _cut(text: str, limit: int, measure: Callable[[str], int]) -> int:
+    end = _window(text, limit, measure)
+    head = text[:end]
+    for boundary in _BOUNDARIES:
+        last: Optional[re.Match[str]] = None
+        for last in boundary.finditer(head):
+            pass
+        if last is not None and last.start() >= end * _MIN_FILL:
+            return last.end()
+    return max(1, end)
+
+
+def split_text(text: str, limit: int, *, measure: Callable[[str], int] = len) -> List[str]:
+    """Trocea `text` en partes de como mucho `limit` (según `measure`), sin partes vacías."""
+    if limit <= 0:
+        raise ValueError("limit debe ser > 0")
+    text = text.strip()
+    chunks: List[str] = []
+    while text and measure(text) > limit:
+        cut = _cut(text, limit, measure)
+        head = text[:cut].rstrip()
+        if head:
+            chunks.append(head)
+        text = text[cut:].lstrip()
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+class ChunkSendError(Exception):
+    """Falló el envío del trozo `sent` (0-based): los `sent` anteriores sí se entregaron."""
+
+    def __init__(self, sent: int, total: int):
+        super().__init__(f"enviados {sent}/{total} trozos")
+        self.sent = sent
+        self.total = total
+
+
+async def send_ordered(
+    chunks: Sequence[str],
+    send: Callable[[Any], Awaitable[Any]],
+    *,
+    prepare: Optional[Callable[[str], Any]] = None,
+    start: int = 0,
+    on_sent: Optional[Callable[[int], Any]] = None,
+) -> int:
+    """Envía `chunks[start:]` en orden; devuelve cuántos trozos hay entregados en total.
+
+    `prepare(chunk)` (síncrono o async) construye el payload del siguiente trozo
+    mientras el anterior está en vuelo; `on_sent(n)` se llama tras cada entrega
+    con el número de trozos entregados hasta ahora (solo si hay más de uno).
+    """
+
+    async def _prepare(chunk: str) -> Any:
+        if prepare is None:
+            return chunk
+        out = prepare(chunk)
+        return await out if asyncio.iscoroutine(out) else out
+
+    total = len(chunks)
+    if start >= total:
+        return total
+    upcoming: Optional[asyncio.Future[Any]] = asyncio.ensure_future(_prepare(chunks[start]))
+    for i in range(start, total):
+        assert upcoming is not None
+        payload = await upcoming
+        upcoming = asyncio.ensure_future(_prepare(chunks[i + 1])) if i + 1 < total else None
+        try:
+            await send(payload)
+        except Exception as e:
+            if upcoming is not None:
+                upcoming.cancel()
+            raise ChunkSendError(i, total) from e
+        if on_sent is not None and total > 1:
+            on_sent(i + 1)
+    return total
@@ -0,0 +1,236 @@
+# src/infrastructure/dedup.py
+"""Deduplicación de mensajes entrantes por id de plataforma.
+
+Meta reintenta el mismo `wamid` y Telegram el mismo `update_id` si tardamos en
+responder; sin esto cada reintento ejecutaba el turno completo y enviaba otra
+respuesta. `Deduplicator.claim(key)` decide en la ingesta:
+
+- primera vez            -> se procesa normalmente;
+- repetido, ya enviado   -> se ignora;
+- repetido, en curso     -> se ignora (lo termina el primer intento);
+- repetido con respuesta calculada pero no enviada (falló el envío)
+                         -> se reenvía esa respuesta sin volver a llamar al LLM
+                            (solo los trozos que faltaban, ver `mark_progress`);
+                            quien envía la respuesta tiene un lease (SET NX con
+                            `inflight_ttl_s`) y un reintento que llega mientras
+                            tanto se ignora en vez de duplicar los mensajes.
+
+Backends: `InMemoryTTLCache` (acotado, por proceso) y `RedisTTLCache`
+(SET NX EX, compartido entre réplicas).
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Protocol, Tuple
+
+from infrastructure.settings import settings
+from observability.metrics import DEDUP_HITS, bound
+
+IN_FLIGHT = ""
+SENT = "s"
+_REPLY = "r:"
+_PROGRESS = "#sent"
+_LEASE = "#lease"  # quién está enviando la respuesta cacheada
+
+
+class TTLCache(Protocol):
+    def add(self, key: str, value: str, ttl_s: Optional[float] = None) -> bool: ...  # False si ya existía
+    def get(self, key: str) -> Optional[str]: ...
+    # escribe aunque la clave ya no exista (p. ej. caducó el lease en curso),
+    # conservando el TTL que tenga (o fijándolo a `ttl_s`)
+    def put(self, key: str, value: str, ttl_s: Optional[float] = None) -> None: ...
+    def delete(self, key: str) -> None: ...
+
+
+class InMemoryTTLCache:
+    """TTL por defecto `ttl_s` y como mucho `max_entries` claves (se expulsan las más antiguas)."""
+
+    def __init__(self, ttl_s: float = 86400.0, max_entries: int = 100_000):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+
+    def _purge(self, now: float) -> None:
+        # Casi siempre el orden de inserción es el de expiración; una clave con
+        # TTL corto en medio caduca igual (get/add comprueban la expiración)
+        while self._data:
+            key, (expires, _v) = next(iter(self._data.items()))
+            if expires > now and len(self._data) <= self.max_entries:
+                break
+            self._data.popitem(last=False)
+
+    def add(self, key: str, value: str, ttl_s: Optional[float] = None) -> bool:
+        now = time.monotonic()
+        self._purge(now)
+        item = self._data.get(key)
+        if item is not None and item[0] > now:
+            return False
+        self._data.pop(key, None)
+        self._data[key] = (now + (self.ttl_s if ttl_s is None else ttl_s), value)
+        self._purge(now)
+        return True
+
+    def get(self, key: str) -> Optional[str]:
+        item = self._data.get(key)
+        if item is None or item[0] <= time.monotonic():
+            return None
+        return item[1]
+
+    def put(self, key: str, value: str, ttl_s: Optional[float] = None) -> None:
+        now = time.monotonic()
+        item = self._data.get(key)
+        if ttl_s is None and item is not None and item[0] > now:
+            self._data[key] = (item[0], value)
+            return
+        self._data.pop(key, None)
+        self._data[key] = (now + (self.ttl_s if ttl_s is None else ttl_s), value)
+        self._purge(now)
+
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class RedisTTLCache:
+    def __init__(self, client: Any, *, prefix: str = "dedup:", ttl_s: float = 86400.0):
+        self.client = client
+        self.prefix = prefix
+        self.ttl_s = int(ttl_s)
+
+    def add(self, key: str, value: str, ttl_s: Optional[float] = None) -> bool:
+        ex = self.ttl_s if ttl_s is None else max(1, int(ttl_s))
+        return bool(self.client.set(self.prefix + key, value, nx=True, ex=ex))
+
+    def get(self, key: str) -> Optional[str]:
+        v = self.client.get(self.prefix + key)
+        return v.decode() if isinstance(v, bytes) else v
+
+    def put(self, key: str, value: str, ttl_s: Optional[float] = None) -> None:
+        if ttl_s is not None:
+            self.client.set(self.prefix + key, value, ex=max(1, int(ttl_s)))
+        elif not self.client.set(self.prefix + key, value, xx=True, keepttl=True):
+            self.client.set(self.prefix + key, value, nx=True, ex=self.ttl_s)  # ya no existía
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+
+class Deduplicator:
+    """`claim` deja un marcador en curso con TTL corto (`inflight_ttl_s`, tipo lease):
+    si el proceso muere antes de responder, el reintento de la plataforma vuelve a
+    procesarse en minutos en vez de ignorarse hasta que caduque `ttl_s`. La
+    respuesta calculada y el "enviado" pasan al TTL completo."""
+
+    def __init__(
+        self,
+        cache: TTLCache,
+        *,
+        cache_replies: bool = True,
+        ttl_s: float = 86400.0,
+        inflight_ttl_s: float = 300.0,
+    ):
+        self.cache = cache
+        self.cache_replies = cache_replies
+        self.ttl_s = ttl_s
+        self.inflight_ttl_s = inflight_ttl_s
+
+    def claim(self, key: Optional[str], channel: str = "unknown") -> Tuple[bool, Optional[str]]:
+        """(procesar, respuesta_a_reenviar). Sin `key` siempre se procesa."""
+        if not key or self.cache.add(key, IN_FLIGHT, self.inflight_ttl_s):
+            return True, None
+        state = self.cache.get(key)
+        if state and state.startswith(_REPLY) and self.lease(key):
+            bound(DEDUP_HITS, channel, "resent").inc()
+            return True, state[len(_REPLY):]
+        bound(DEDUP_HITS, channel, "skipped").inc()
+        return False, None
+
+    def lease(self, key: Optional[str]) -> bool:
+        """Toma (SET NX) el envío de la respuesta cacheada; False si otro la está enviando."""
+        return not key or self.cache.add(key + _LEASE, IN_FLIGHT, self.inflight_ttl_s)
+
+    def unlease(self, key: Optional[str]) -> None:
+        """Suelta el envío tras un fallo: el siguiente reintento puede reenviar."""
+        if key:
+            self.cache.delete(key + _LEASE)
+
+    def reply(self, key: Optional[str]) -> Optional[str]:
+        """Respuesta calculada y aún no enviada del todo (None si no hay)."""
+        state = self.cache.get(key) if key else None
+        return state[len(_REPLY):] if state and state.startswith(_REPLY) else None
+
+    def remember_reply(self, key: Optional[str], reply: str) -> None:
+        if key and self.cache_replies:
+            self.cache.put(key, _REPLY + reply, self.ttl_s)
+            self.lease(key)  # el mismo intento envía: los reintentos esperan
+
+    def mark_progress(self, key: Optional[str], chunks_sent: int) -> None:
+        """Trozos de la respuesta ya entregados: un reenvío continúa desde ahí."""
+        if key and self.cache_replies:
+            self.cache.put(key + _PROGRESS, str(chunks_sent))
+
+    def progress(self, key: Optional[str]) -> int:
+        value = self.cache.get(key + _PROGRESS) if key else None
+        return int(value) if value else 0
+
+    def mark_sent(self, key: Optional[str]) -> None:
+        if key:
+            self.cache.put(key, SENT, self.ttl_s)
+            self.cache.delete(key + _LEASE)
+
+    def release(self, key: Optional[str]) -> None:
+        """Olvida `key` (p. ej. si no se pudo encolar y la plataforma va a reintentar)."""
+        if key:
+            self.cache.delete(key)
+            self.cache.delete(key + _PROGRESS)
+            self.cache.delete(key + _LEASE)
+
+
+def safe_remember_reply(dedup: Optional[Deduplicator], key: Optional[str], reply: str) -> None:
+    """`remember_reply` fuera del camino del turno: si el backend falla se
+    registra y la respuesta se envía igual (solo se pierde el reenvío sin LLM)."""
+    if dedup is None:
+        return
+    try:
+        dedup.remember_reply(key, reply)
+    except Exception as e:
+        logging.warning("dedup: no se pudo guardar la respuesta de %s: %s", key, e)
+
+
+_dedup: Optional[Deduplicator] = None
+
+
+def build_deduplicator() -> Deduplicator:
+    cache: TTLCache = InMemoryTTLCache(settings.dedup_ttl_s, settings.dedup_max_entries)
+    if settings.dedup_backend == "redis":
+        from core.memory import get_redis_client
+
+        client = get_redis_client()
+        if client is not None:
+            cache = RedisTTLCache(client, ttl_s=settings.dedup_ttl_s)
+    return Deduplicator(
+        cache,
+        cache_replies=settings.dedup_cache_replies,
+        ttl_s=settings.dedup_ttl_s,
+        inflight_ttl_s=settings.dedup_inflight_ttl_s,
+    )
+
+
+def get_deduplicator() -> Optional[Deduplicator]:
+    """Deduplicador global (None si `dedup_enabled` es False)."""
+    global _dedup
+    if not settings.dedup_enabled:
+        return None
+    if _dedup is None:
+        _dedup = build_deduplicator()
+    return _dedup
+
+
+def set_deduplicator(dedup: Optional[Deduplicator]) -> None:
+    global _dedup
+    _dedup = dedup
@@ -0,0 +1,140 @@
+# src/infrastructure/http.py
+"""Clientes HTTP compartidos (un pool keep-alive por upstream).
+
+Antes cada envío abría su propio `httpx.AsyncClient` y pagaba DNS + TCP + TLS.
+Ahora los adapters piden `http_clients.get("whatsapp")` / `"telegram"` /
+`"openai"` y reutilizan conexiones; el lifespan los cierra al apagar.
+
+Cada pool puede tener un perfil propio (`pool_profile`): el de WhatsApp usa
+HTTP/2 si `h2` está instalado y límites propios. Todos los clientes van sobre
+`InstrumentedTransport`, que exporta peticiones por versión de protocolo,
+peticiones en curso y conexiones activas/ociosas por pool.
+"""
+
+from __future__ import annotations
+
+import ssl
+from typing import Any, Dict, Optional, Union
+
+import httpx
+
+from infrastructure.settings import settings
+from observability.metrics import HTTP_POOL_CONNECTIONS, HTTP_POOL_IN_FLIGHT, HTTP_POOL_REQUESTS, bound
+
+VerifyTypes = Union[bool, str, ssl.SSLContext]
+
+try:  # HTTP/2 es opcional: httpx lo necesita vía el paquete `h2`
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover - depende del entorno
+    HTTP2_AVAILABLE = False
+
+
+def default_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry_s,
+    )
+
+
+def pool_profile(name: str) -> Dict[str, Any]:
+    """kwargs de cliente específicos del pool `name` (vacío = valores por defecto)."""
+    if name == "whatsapp":
+        return {
+            "http2": settings.whatsapp_http2 and HTTP2_AVAILABLE,
+            "limits": httpx.Limits(
+                max_connections=settings.whatsapp_max_connections,
+                max_keepalive_connections=settings.whatsapp_max_keepalive_connections,
+                keepalive_expiry=settings.http_keepalive_expiry_s,
+            ),
+        }
+    return {}
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Transport que delega en `inner` y exporta métricas del pool `name`."""
+
+    def __init__(self, name: str, inner: httpx.AsyncBaseTransport):
+        self.name = name
+        self.inner = inner
+        self._in_flight = bound(HTTP_POOL_IN_FLIGHT, name)
+        self._active = bound(HTTP_POOL_CONNECTIONS, name, "active")
+        self._idle = bound(HTTP_POOL_CONNECTIONS, name, "idle")
+
+    def connection_states(self) -> Dict[str, int]:
+        """Conexiones del pool httpcore subyacente (vacío si el transport no tiene pool)."""
+        pool = getattr(self.inner, "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is None:
+            return {}
+        idle = sum(1 for c in connections if c.is_idle())
+        return {"active": len(connections) - idle, "idle": idle}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self._in_flight.inc()
+        try:
+            response = await self.inner.handle_async_request(request)
+        finally:
+            self._in_flight.dec()
+        version = response.extensions.get("http_version", b"HTTP/1.1")
+        if isinstance(version, bytes):
+            version = version.decode("ascii", "replace")
+        bound(HTTP_POOL_REQUESTS, self.name, version).inc()
+        states = self.connection_states()
+        if states:
+            self._active.set(states["active"])
+            self._idle.set(states["idle"])
+        return response
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class HttpClientPool:
+    """Registro de `httpx.AsyncClient` por nombre, creados bajo demanda."""
+
+    def __init__(self, *, verify: VerifyTypes = True):
+        self.verify = verify
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._transports: Dict[str, InstrumentedTransport] = {}
+
+    def get(self, name: str, **client_kwargs: Any) -> httpx.AsyncClient:
+        """Devuelve el cliente `name`; lo crea (o recrea si se cerró) con su perfil y límites."""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            kwargs: Dict[str, Any] = {"limits": default_limits(), "http2": False}
+            kwargs.update(pool_profile(name))
+            kwargs.update(client_kwargs)
+            # limits/http2 configuran el transport; el resto va al cliente
+            limits, http2 = kwargs.pop("limits"), kwargs.pop("http2")
+            inner = kwargs.pop("transport", None) or httpx.AsyncHTTPTransport(
+                verify=self.verify, limits=limits, http2=http2
+            )
+            kwargs.setdefault("timeout", settings.http_timeout_s)
+            transport = InstrumentedTransport(name, inner)
+            client = httpx.AsyncClient(transport=transport, **kwargs)
+            self._clients[name] = client
+            self._transports[name] = transport
+        return client
+
+    def peek(self, name: str) -> Optional[httpx.AsyncClient]:
+        """Cliente `name` si ya existe (sin crearlo)."""
+        return self._clients.get(name)
+
+    def names(self) -> list[str]:
+        return list(self._clients)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Conexiones activas/ociosas por pool (para /ready y depuración)."""
+        return {name: t.connection_states() for name, t in self._transports.items()}
+
+    async def aclose(self) -> None:
+        clients, self._clients, self._transports = list(self._clients.values()), {}, {}
+        for client in clients:
+            await client.aclose()
+
+
+# instancia global (la cierra infrastructure.startup.lifespan)
+http_clients = HttpClientPool()
@@ -0,0 +1,216 @@
+# src/infrastructure/inbound.py
+"""Procesamiento de mensajes entrantes en modo ack-first.
+
+Con `settings.inbound_mode = "ack"` los webhooks validan, encolan un
+`InboundJob` y responden 200 de inmediato; el `InboundWorkerPool` (arrancado
+en el lifespan) ejecuta el grafo y el envío en segundo plano. Así una llamada
+lenta al modelo no provoca timeouts ni reintentos de WhatsApp/Telegram.
+
+- Orden por sesión: cada sesión cae siempre en el mismo shard (crc32 del
+  session_id) y cada shard tiene un único worker, así que los mensajes de una
+  conversación se procesan en orden y los de sesiones distintas en paralelo.
+- Backpressure: las colas están acotadas; si el shard está lleno, `submit`
+  espera hasta `inbound_enqueue_timeout_s` y después rechaza (el webhook
+  responde 503 y la plataforma reintenta más tarde).
+- Drenado: al apagar se dejan de aceptar trabajos y se espera a que se vacíen
+  las colas (como mucho `inbound_drain_timeout_s`).
+- Reintentos: la plataforma ya recibió su 200 y no va a reintentar, así que un
+  trabajo fallido (p. ej. el envío) se repite aquí mismo hasta
+  `inbound_max_attempts` veces con backoff (tope `inbound_retry_max_delay_s`);
+  el reintento reenvía la respuesta cacheada en el dedup sin repetir el turno.
+  Agotados los intentos, o si el proceso cae, el mensaje se pierde: para
+  entrega garantizada, `inbound_mode = "durable"`.
+
+Cada canal registra su procesador con `register_job_handler(canal, fn)`.
+Con `inbound_mode = "durable"` el destino es la cola de
+infrastructure.job_queue y los workers corren en otros procesos.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+import zlib
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Protocol
+
+from infrastructure.ratelimit import backoff_delay
+from infrastructure.settings import settings
+from observability.metrics import INBOUND_JOBS, INBOUND_WAIT_SECONDS, QUEUE_DEPTH, bound
+
+
+@dataclass
+class InboundJob:
+    channel: str
+    session_id: str
+    text: str
+    meta: Dict[str, Any] = field(default_factory=dict)  # datos de canal (wa_id, chat_id...)
+    enqueued_at: float = field(default_factory=time.time)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "InboundJob":
+        return cls(**json.loads(raw))
+
+
+JobHandler = Callable[[InboundJob], Awaitable[None]]
+
+_handlers: Dict[str, JobHandler] = {}
+
+
+def register_job_handler(channel: str, handler: JobHandler) -> None:
+    _handlers[channel] = handler
+
+
+async def dispatch(job: InboundJob) -> None:
+    """Ejecuta el procesador registrado para `job.channel`."""
+    handler = _handlers.get(job.channel)
+    if handler is None:
+        raise LookupError(f"No hay procesador registrado para el canal {job.channel!r}")
+    await handler(job)
+
+
+def shard_for(session_id: str, shards: int) -> int:
+    """Shard estable (entre procesos) para una sesión."""
+    return zlib.crc32(session_id.encode()) % shards
+
+
+class InboundWorkerPool:
+    def __init__(
+        self,
+        workers: int = 8,
+        queue_size: int = 1000,
+        *,
+        enqueue_timeout_s: float = 1.0,
+        max_attempts: int = 1,
+        retry_max_delay_s: float = 30.0,
+        handler: Callable[[InboundJob], Awaitable[None]] = dispatch,
+    ):
+        self.workers = max(1, workers)
+        self.shard_size = max(1, -(-queue_size // self.workers))  # ceil
+        self.enqueue_timeout_s = enqueue_timeout_s
+        self.max_attempts = max(1, max_attempts)
+        self.retry_max_delay_s = retry_max_delay_s
+        self.handler = handler
+        self._queues: List[asyncio.Queue[InboundJob]] = []
+        self._tasks: List[asyncio.Task] = []
+        self._accepting = False
+        self._depth = bound(QUEUE_DEPTH, "inbound")
+
+    @property
+    def running(self) -> bool:
+        return self._accepting
+
+    def depth(self) -> int:
+        return sum(q.qsize() for q in self._queues)
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._queues = [asyncio.Queue(maxsize=self.shard_size) for _ in range(self.workers)]
+        self._tasks = [
+            asyncio.create_task(self._work(q), name=f"inbound-worker-{i}")
+            for i, q in enumerate(self._queues)
+        ]
+        self._accepting = True
+
+    async def submit(self, job: InboundJob) -> bool:
+        """Encola `job`; False si el pool no acepta o el shard sigue lleno tras el timeout."""
+        if not self._accepting:
+            bound(INBOUND_JOBS, job.channel, "rejected").inc()
+            return False
+        q = self._queues[shard_for(job.session_id, self.workers)]
+        try:
+            q.put_nowait(job)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(q.put(job), timeout=self.enqueue_timeout_s)
+            except asyncio.TimeoutError:
+                logging.warning("inbound: cola llena, rechazando sesión %s", job.session_id)
+                bound(INBOUND_JOBS, job.channel, "rejected").inc()
+                return False
+        bound(INBOUND_JOBS, job.channel, "enqueued").inc()
+        self._depth.set(self.depth())
+        return True
+
+    async def _work(self, q: asyncio.Queue[InboundJob]) -> None:
+        while True:
+            job = await q.get()
+            self._depth.set(self.depth())
+            bound(INBOUND_WAIT_SECONDS, job.channel).observe(max(0.0, time.time() - job.enqueued_at))
+            try:
+                await self._attempt(job)
+            finally:
+                q.task_done()
+
+    async def _attempt(self, job: InboundJob) -> None:
+        """Ejecuta `job` con reintentos acotados (la sesión espera: se conserva el orden)."""
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await self.handler(job)
+            except Exception as e:  # un mensaje fallido no debe parar el worker
+                if attempt < self.max_attempts:
+                    logging.warning("inbound: intento %d de %s/%s falló: %s", attempt, job.channel, job.session_id, e)
+                    bound(INBOUND_JOBS, job.channel, "retry").inc()
+                    await asyncio.sleep(backoff_delay(attempt, 2.0, self.retry_max_delay_s))
+                    continue
+                logging.exception("inbound: fallo procesando %s/%s: %s", job.channel, job.session_id, e)
+                bound(INBOUND_JOBS, job.channel, "error").inc()
+            else:
+                bound(INBOUND_JOBS, job.channel, "ok").inc()
+            return
+
+    async def stop(self, drain_timeout_s: float = 20.0) -> int:
+        """Deja de aceptar, drena hasta `drain_timeout_s` y para los workers.
+
+        Devuelve cuántos trabajos quedaron sin procesar.
+        """
+        self._accepting = False
+        if not self._tasks:
+            return 0
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(q.join() for q in self._queues)), timeout=drain_timeout_s
+            )
+        except asyncio.TimeoutError:
+            logging.warning("inbound: drenado incompleto, %d trabajos pendientes", self.depth())
+        left = self.depth()
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._depth.set(left)
+        return left
+
+
+class JobSink(Protocol):
+    """Destino de los webhooks: el pool en proceso o el publicador de la cola duradera."""
+
+    async def submit(self, job: InboundJob) -> bool: ...
+
+
+_pool: Optional[JobSink] = None
+
+
+def get_inbound_pool() -> Optional[JobSink]:
+    """Destino activo (None en modo sync o fuera del lifespan)."""
+    return _pool
+
+
+def set_inbound_pool(pool: Optional[JobSink]) -> None:
+    global _pool
+    _pool = pool
+
+
+def build_inbound_pool() -> InboundWorkerPool:
+    return InboundWorkerPool(
+        workers=settings.inbound_workers,
+        queue_size=settings.inbound_queue_size,
+        enqueue_timeout_s=settings.inbound_enqueue_timeout_s,
+        max_attempts=settings.inbound_max_attempts,
+        retry_max_delay_s=settings.inbound_retry_max_delay_s,
+    )
@@ -0,0 +1,419 @@
+# src/infrastructure/job_queue.py
+"""Cola duradera de mensajes entrantes (`inbound_mode = "durable"`).
+
+Los webhooks publican cada `InboundJob` en una cola persistente y responden;
+los workers (`python -m infrastructure.worker`, en uno o varios hosts)
+consumen, ejecutan el turno y el envío, y confirman. Si un worker muere a
+mitad, el mensaje sigue pendiente y otro lo reprocesa.
+
+- Particiones: `inbound_partitions` streams; cada sesión va siempre a la
+  misma (crc32 del session_id, igual que infrastructure.inbound).
+- Orden por sesión: una partición solo la consume quien tiene su lease
+  (SET NX PX con expiración `inbound_lease_ms`; renovar y soltar comprueban
+  el dueño en la misma transacción). Al tomar una partición, el
+  worker reclama primero lo pendiente (XAUTOCLAIM) y después lee lo nuevo.
+- Reintentos: un fallo deja el mensaje (y los siguientes de la partición)
+  pendiente y la partición no se vuelve a leer hasta pasado un backoff
+  exponencial con jitter (tope `inbound_retry_max_delay_s`): una caída
+  pasajera no agota los intentos en un segundo. Tras `inbound_max_attempts`
+  entregas va a `<prefix>:dead`.
+
+Entrega al-menos-una-vez: si un turno supera el lease, otro worker puede
+repetirlo (ajusta `inbound_lease_ms` por encima del peor turno esperado).
+
+Backends:
+- `RedisStreamQueue`: Redis Streams + consumer group (producción).
+- `SqliteJobQueue`: mismo contrato sobre un fichero SQLite (un solo host, dev/tests).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Protocol, Set
+
+from redis.exceptions import ResponseError
+
+from infrastructure.inbound import InboundJob, dispatch, shard_for
+from infrastructure.ratelimit import backoff_delay
+from infrastructure.settings import settings
+from observability.metrics import INBOUND_JOBS, INBOUND_WAIT_SECONDS, bound
+
+
+@dataclass
+class Delivery:
+    id: str
+    partition: int
+    job: InboundJob
+    attempts: int = 1
+
+
+class JobQueue(Protocol):
+    partitions: int
+
+    def publish(self, job: InboundJob) -> str: ...
+    def acquire(self, partition: int, consumer: str, lease_ms: int) -> bool: ...
+    def release(self, partition: int, consumer: str) -> None: ...
+    def read(self, partition: int, consumer: str, count: int) -> List[Delivery]: ...
+    def ack(self, delivery: Delivery) -> None: ...
+    def dead_letter(self, delivery: Delivery, error: str) -> None: ...
+
+
+def _s(v: Any) -> Any:
+    return v.decode() if isinstance(v, bytes) else v
+
+
+# ======================================================
+# Redis Streams
+# ======================================================
+class RedisStreamQueue:
+    def __init__(
+        self,
+        client: Any,
+        *,
+        prefix: str = "inbound",
+        partitions: int = 16,
+        group: str = "agents",
+        maxlen: int = 100_000,
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.partitions = partitions
+        self.group = group
+        self.maxlen = maxlen
+        self._groups: Set[int] = set()
+
+    def _stream(self, partition: int) -> str:
+        return f"{self.prefix}:{partition}"
+
+    def _lease(self, partition: int) -> str:
+        return f"{self.prefix}:lease:{partition}"
+
+    def _attempts(self, partition: int) -> str:
+        return f"{self.prefix}:attempts:{partition}"
+
+    def _ensure_group(self, partition: int) -> None:
+        if partition in self._groups:
+            return
+        try:
+            self.client.xgroup_create(self._stream(partition), self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._groups.add(partition)
+
+    def publish(self, job: InboundJob) -> str:
+        partition = shard_for(job.session_id, self.partitions)
+        self._ensure_group(partition)
+        # MAXLEN ~: acota memoria; dimensiónalo muy por encima del backlog esperado
+        msg_id = self.client.xadd(
+            self._stream(partition), {"job": job.to_json()}, maxlen=self.maxlen, approximate=True
+        )
+        return _s(msg_id)
+
+    def _if_owner(self, key: str, consumer: str, op: Callable[[Any], Any]) -> bool:
+        """Aplica `op` al lease solo si sigue siendo de `consumer` (GET + escritura atómicos).
+
+        WATCH/MULTI: si el lease caduca y otro lo toma entre el GET y la
+        escritura, la transacción se repite y ve al nuevo dueño; nunca
+        renovamos ni borramos un lease ajeno.
+        """
+
+        def txn(pipe: Any) -> bool:
+            if _s(pipe.get(key)) != consumer:
+                return False
+            pipe.multi()
+            op(pipe)
+            return True
+
+        return bool(self.client.transaction(txn, key, value_from_callable=True))
+
+    def acquire(self, partition: int, consumer: str, lease_ms: int) -> bool:
+        key = self._lease(partition)
+        if self.client.set(key, consumer, nx=True, px=lease_ms):
+            return True
+        return self._if_owner(key, consumer, lambda pipe: pipe.pexpire(key, lease_ms))  # renovación
+
+    def release(self, partition: int, consumer: str) -> None:
+        key = self._lease(partition)
+        self._if_owner(key, consumer, lambda pipe: pipe.delete(key))
+
+    def _deliveries(self, partition: int, entries: Any) -> List[Delivery]:
+        out = []
+        for msg_id, fields in entries or []:
+            raw = fields.get("job") or fields.get(b"job")
+            if raw is not None:
+                out.append(Delivery(_s(msg_id), partition, InboundJob.from_json(raw)))
+        return out
+
+    def read(self, partition: int, consumer: str, count: int) -> List[Delivery]:
+        """Pendientes de la partición (de cualquier consumidor) y, si no hay, mensajes nuevos."""
+        self._ensure_group(partition)
+        stream = self._stream(partition)
+        # Con el lease somos dueños exclusivos: todo lo pendiente está atascado
+        claimed = self.client.xautoclaim(stream, self.group, consumer, 0, start_id="0-0", count=count)
+        deliveries = self._deliveries(partition, claimed[1])
+        if not deliveries:
+            fresh = self.client.xreadgroup(self.group, consumer, {stream: ">"}, count=count)
+            deliveries = self._deliveries(partition, fresh[0][1] if fresh else [])
+        if deliveries:
+            # contador propio de entregas (no dependemos de times_delivered de XPENDING)
+            pipe = self.client.pipeline()
+            for d in deliveries:
+                pipe.hincrby(self._attempts(partition), d.id, 1)
+            for d, n in zip(deliveries, pipe.execute()):
+                d.attempts = int(n)
+        return deliveries
+
+    def ack(self, delivery: Delivery) -> None:
+        pipe = self.client.pipeline()
+        pipe.xack(self._stream(delivery.partition), self.group, delivery.id)
+        pipe.hdel(self._attempts(delivery.partition), delivery.id)
+        pipe.execute()
+
+    def dead_letter(self, delivery: Delivery, error: str) -> None:
+        self.client.xadd(
+            f"{self.prefix}:dead",
+            {"job": delivery.job.to_json(), "error": error[:500], "attempts": delivery.attempts},
+            maxlen=self.maxlen,
+            approximate=True,
+        )
+        self.ack(delivery)
+
+
+# ======================================================
+# SQLite (stand-in de un solo host)
+# ======================================================
+class SqliteJobQueue:
+    def __init__(self, path: str = "inbound.db", *, partitions: int = 16):
+        self.partitions = partitions
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS inbound_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                partition INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                dead TEXT
+            );
+            CREATE INDEX IF NOT EXISTS inbound_jobs_partition ON inbound_jobs(partition, id);
+            CREATE TABLE IF NOT EXISTS inbound_leases (
+                partition INTEGER PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            """
+        )
+
+    def publish(self, job: InboundJob) -> str:
+        partition = shard_for(job.session_id, self.partitions)
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT INTO inbound_jobs (partition, payload) VALUES (?, ?)", (partition, job.to_json())
+            )
+        return str(cur.lastrowid)
+
+    def acquire(self, partition: int, consumer: str, lease_ms: int) -> bool:
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT owner, expires_at FROM inbound_leases WHERE partition = ?", (partition,)
+                ).fetchone()
+                ok = row is None or row[0] == consumer or row[1] <= now
+                if ok:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO inbound_leases VALUES (?, ?, ?)",
+                        (partition, consumer, now + lease_ms / 1000),
+                    )
+            finally:
+                self._db.execute("COMMIT")
+        return ok
+
+    def release(self, partition: int, consumer: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM inbound_leases WHERE partition = ? AND owner = ?", (partition, consumer)
+            )
+
+    def read(self, partition: int, consumer: str, count: int) -> List[Delivery]:
+        """Los `count` más antiguos sin confirmar (reentregas incluidas), en orden."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, payload, attempts FROM inbound_jobs"
+                " WHERE partition = ? AND dead IS NULL ORDER BY id LIMIT ?",
+                (partition, count),
+            ).fetchall()
+            if rows:
+                self._db.executemany(
+                    "UPDATE inbound_jobs SET attempts = attempts + 1 WHERE id = ?", [(r[0],) for r in rows]
+                )
+        return [Delivery(str(r[0]), partition, InboundJob.from_json(r[1]), r[2] + 1) for r in rows]
+
+    def ack(self, delivery: Delivery) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM inbound_jobs WHERE id = ?", (int(delivery.id),))
+
+    def dead_letter(self, delivery: Delivery, error: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE inbound_jobs SET dead = ? WHERE id = ?", (error[:500] or "error", int(delivery.id))
+            )
+
+    def close(self) -> None:
+        self._db.close()
+
+
+# ======================================================
+# Publicador (lado webhook) y worker (lado consumidor)
+# ======================================================
+class DurablePublisher:
+    """`JobSink` para los webhooks: publica en la cola duradera."""
+
+    def __init__(self, queue: JobQueue):
+        self.queue = queue
+
+    async def submit(self, job: InboundJob) -> bool:
+        try:
+            await asyncio.to_thread(self.queue.publish, job)
+        except Exception as e:  # cola caída: 503 y la plataforma reintenta
+            logging.exception("inbound: no se pudo publicar %s/%s: %s", job.channel, job.session_id, e)
+            bound(INBOUND_JOBS, job.channel, "rejected").inc()
+            return False
+        bound(INBOUND_JOBS, job.channel, "enqueued").inc()
+        return True
+
+
+class DurableWorker:
+    """Consume particiones con lease; `slots` particiones en paralelo como mucho."""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        *,
+        consumer: Optional[str] = None,
+        slots: int = 8,
+        batch: int = 10,
+        lease_ms: int = 30000,
+        max_attempts: int = 5,
+        idle_sleep_s: float = 0.2,
+        retry_max_delay_s: float = 30.0,
+        handler: Callable[[InboundJob], Awaitable[None]] = dispatch,
+    ):
+        self.queue = queue
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.slots = max(1, slots)
+        self.batch = batch
+        self.lease_ms = lease_ms
+        self.max_attempts = max_attempts
+        self.idle_sleep_s = idle_sleep_s
+        self.retry_max_delay_s = retry_max_delay_s
+        self.handler = handler
+        self._held: Set[int] = set()
+        self._retrying: Set[int] = set()  # tras un fallo se lee de uno en uno
+        self._not_before: Dict[int, float] = {}  # backoff por partición tras un fallo
+        self._stopping = asyncio.Event()
+
+    @classmethod
+    def from_settings(cls, queue: JobQueue) -> "DurableWorker":
+        return cls(
+            queue,
+            slots=settings.inbound_workers,
+            lease_ms=settings.inbound_lease_ms,
+            max_attempts=settings.inbound_max_attempts,
+            retry_max_delay_s=settings.inbound_retry_max_delay_s,
+        )
+
+    def stop(self) -> None:
+        """Termina tras el mensaje en curso de cada slot (lo no confirmado queda pendiente)."""
+        self._stopping.set()
+
+    async def run(self) -> None:
+        await asyncio.gather(*(self._slot(i) for i in range(self.slots)))
+
+    async def _slot(self, i: int) -> None:
+        n = self.queue.partitions
+        offset = i * n // self.slots  # cada slot empieza en una zona distinta
+        while not self._stopping.is_set():
+            worked = False
+            for k in range(n):
+                if self._stopping.is_set():
+                    break
+                partition = (offset + k) % n
+                if partition in self._held or self._not_before.get(partition, 0.0) > time.monotonic():
+                    continue
+                self._held.add(partition)
+                try:
+                    if await asyncio.to_thread(self.queue.acquire, partition, self.consumer, self.lease_ms):
+                        try:
+                            worked = await self._drain(partition) or worked
+                        finally:
+                            await asyncio.to_thread(self.queue.release, partition, self.consumer)
+                finally:
+                    self._held.discard(partition)
+            if not worked:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.idle_sleep_s)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _drain(self, partition: int) -> bool:
+        """Procesa un lote de la partición en orden; True si había trabajo."""
+        count = 1 if partition in self._retrying else self.batch
+        deliveries = await asyncio.to_thread(self.queue.read, partition, self.consumer, count)
+        for d in deliveries:
+            job = d.job
+            if d.attempts > self.max_attempts:
+                logging.error("inbound: %s/%s agotó %d intentos", job.channel, job.session_id, d.attempts - 1)
+                await asyncio.to_thread(self.queue.dead_letter, d, "max attempts exceeded")
+                bound(INBOUND_JOBS, job.channel, "dead").inc()
+                self._retrying.discard(partition)
+                continue
+            if d.attempts == 1:
+                bound(INBOUND_WAIT_SECONDS, job.channel).observe(max(0.0, time.time() - job.enqueued_at))
+            try:
+                await self.handler(job)
+            except Exception as e:
+                # sin ack: se reintenta antes que los siguientes de la partición
+                logging.exception("inbound: fallo procesando %s/%s: %s", job.channel, job.session_id, e)
+                bound(INBOUND_JOBS, job.channel, "error").inc()
+                self._retrying.add(partition)
+                delay = backoff_delay(d.attempts, 2.0, self.retry_max_delay_s)
+                self._not_before[partition] = time.monotonic() + delay
+                return True
+            self._retrying.discard(partition)
+            self._not_before.pop(partition, None)
+            await asyncio.to_thread(self.queue.ack, d)
+            bound(INBOUND_JOBS, job.channel, "ok").inc()
+            if not await asyncio.to_thread(self.queue.acquire, partition, self.consumer, self.lease_ms):
+                # lease perdido (el turno superó `lease_ms`): la partición ya es de otro
+                logging.warning("inbound: lease de la partición %d perdido, se deja de leer", partition)
+                break
+            if self._stopping.is_set():
+                break
+        return bool(deliveries)
+
+
+def build_job_queue() -> JobQueue:
+    """Cola según `inbound_queue_backend` (redis exige REDIS_URL / REDIS_HOST)."""
+    if settings.inbound_queue_backend == "sqlite":
+        return SqliteJobQueue(settings.inbound_sqlite_path, partitions=settings.inbound_partitions)
+    from core.memory import get_redis_client
+
+    client = get_redis_client()
+    if client is None:
+        raise RuntimeError("INBOUND_QUEUE_BACKEND=redis requiere REDIS_URL o REDIS_HOST")
+    return RedisStreamQueue(
+        client,
+        partitions=settings.inbound_partitions,
+        maxlen=settings.inbound_stream_maxlen,
+    )
@@ -0,0 +1,152 @@
+# src/infrastructure/presence.py
+"""Indicadores de presencia (leído / escribiendo) en paralelo al turno.
+
+El usuario esperaba en silencio mientras corría el grafo. `PresenceNotifier`
+lanza pings de presencia (read receipt + typing en WhatsApp, `sendChatAction`
+en Telegram) en una tarea de fondo mientras dura el bloque:
+
+    async with presence.during(chat_id, wamid):
+        reply = await run_turn(...)
+
+- Casi nunca en el camino crítico: entrar al bloque no espera a la red; al
+  salir se espera como mucho `exit_wait_s` al ping en vuelo de ese chat y, si
+  no ha terminado, se cancela (un "escribiendo…" que llega después de la
+  respuesta deja el indicador colgado). Los fallos y timeouts de los pings
+  solo se registran en métricas.
+- Refresco cada `interval_s` para turnos largos (los indicadores caducan).
+- Agrupación por chat: varios turnos simultáneos del mismo chat comparten un
+  único bucle, y entre dos pings del mismo chat pasan al menos `min_gap_s`
+  (el ping se aplaza, no se duplica), así los indicadores no multiplican la
+  carga sobre la API.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+
+from observability.metrics import PRESENCE_PINGS, bound
+
+Ping = Callable[[str, Any], Awaitable[Any]]
+
+_notifiers: "weakref.WeakSet[PresenceNotifier]" = weakref.WeakSet()
+
+
+@dataclass
+class _ChatLoop:
+    ctx: Any
+    stop: asyncio.Event = field(default_factory=asyncio.Event)
+    users: int = 0
+    task: Optional["asyncio.Task[None]"] = None
+
+
+class PresenceNotifier:
+    def __init__(
+        self,
+        channel: str,
+        ping: Ping,
+        *,
+        interval_s: float,
+        min_gap_s: float = 3.0,
+        timeout_s: float = 5.0,
+        exit_wait_s: float = 0.2,
+        max_chats: int = 10_000,
+    ):
+        self.channel = channel
+        self.ping = ping
+        self.interval_s = interval_s
+        self.min_gap_s = min_gap_s
+        self.timeout_s = timeout_s
+        self.exit_wait_s = exit_wait_s
+        self.max_chats = max_chats
+        self._loops: Dict[str, _ChatLoop] = {}
+        self._last: OrderedDict[str, float] = OrderedDict()
+        self._tasks: Set[asyncio.Task[None]] = set()
+        _notifiers.add(self)
+
+    @contextlib.asynccontextmanager
+    async def during(self, chat: str, ctx: Any = None) -> AsyncIterator[None]:
+        """Mantiene la presencia en `chat` mientras dura el bloque (`ctx` = p. ej. el wamid)."""
+        loop = self._loops.get(chat)
+        if loop is None:
+            loop = self._loops[chat] = _ChatLoop(ctx)
+            task = loop.task = asyncio.create_task(self._run(chat, loop))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            loop.ctx = ctx  # el mensaje más reciente del chat
+            bound(PRESENCE_PINGS, self.channel, "coalesced").inc()
+        loop.users += 1
+        try:
+            yield
+        finally:
+            loop.users -= 1
+            if loop.users == 0:
+                loop.stop.set()
+                if self._loops.get(chat) is loop:
+                    del self._loops[chat]
+                await self._settle(loop)
+
+    async def _settle(self, loop: _ChatLoop) -> None:
+        """Espera (acotado) al ping en vuelo del chat; si no llega a tiempo, se cancela."""
+        task = loop.task
+        if task is None or task.done():
+            return
+        done, _ = await asyncio.wait({task}, timeout=self.exit_wait_s)
+        if not done:
+            task.cancel()
+            bound(PRESENCE_PINGS, self.channel, "cancelled").inc()
+            await asyncio.wait({task})  # la petición se aborta antes de devolver la respuesta
+
+    async def _run(self, chat: str, loop: _ChatLoop) -> None:
+        while not loop.stop.is_set():
+            wait = self._until_allowed(chat)
+            if wait > 0:
+                # ping reciente al mismo chat: se aplaza (no se descarta) hasta cumplir el hueco
+                bound(PRESENCE_PINGS, self.channel, "throttled").inc()
+            else:
+                await self._fire(chat, loop.ctx)
+                wait = self.interval_s
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(loop.stop.wait(), wait)
+
+    def _until_allowed(self, chat: str) -> float:
+        last = self._last.get(chat)
+        return 0.0 if last is None else last + self.min_gap_s - time.monotonic()
+
+    async def _fire(self, chat: str, ctx: Any) -> None:
+        self._last[chat] = time.monotonic()
+        self._last.move_to_end(chat)
+        if len(self._last) > self.max_chats:
+            self._last.popitem(last=False)
+        try:
+            await asyncio.wait_for(self.ping(chat, ctx), self.timeout_s)
+        except Exception as e:
+            bound(PRESENCE_PINGS, self.channel, "error").inc()
+            logging.debug("presence %s: ping a %s falló: %s", self.channel, chat, e)
+        else:
+            bound(PRESENCE_PINGS, self.channel, "ok").inc()
+
+    async def aclose(self) -> None:
+        """Para todos los bucles y espera a los pings en vuelo (apagado ordenado)."""
+        for loop in self._loops.values():
+            loop.stop.set()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+async def aclose_presence() -> None:
+    """Cierra todos los notifiers (lifespan, antes de cerrar los pools HTTP)."""
+    for notifier in list(_notifiers):
+        await notifier.aclose()
+
+
+def maybe_during(notifier: Optional[PresenceNotifier], chat: str, ctx: Any = None) -> Any:
+    """`notifier.during(...)` o un contexto vacío si la presencia está desactivada."""
+    return notifier.during(chat, ctx) if notifier is not None else contextlib.nullcontext()
@@ -0,0 +1,187 @@
+# src/infrastructure/ratelimit.py
+"""Rate limiting de envíos salientes y backoff con jitter.
+
+Antes cada corrutina reintentaba por su cuenta con `backoff ** intento`: en
+una ráfaga todas golpeaban la API a la vez, todas recibían 429 y todas
+volvían a la vez. Ahora los envíos pasan por un limitador compartido:
+
+- `TokenBucket`: token bucket en proceso (GCRA: un único "theoretical arrival
+  time"). Cada llamada reserva su hueco y duerme lo justo, así N corrutinas
+  concurrentes salen escalonadas al ritmo permitido en vez de en oleadas.
+- `RedisTokenBucket`: el mismo algoritmo con el estado en Redis (WATCH/MULTI),
+  compartido entre réplicas.
+- `penalize(s)`: un 429 con Retry-After bloquea el bucket entero `s` segundos
+  (todos los envíos esperan, no solo el que recibió el 429).
+- `SendLimiter`: límite por emisor (p. ej. phone_id) + por destinatario
+  (pair rate), con buckets por destinatario acotados.
+- `backoff_delay` / `parse_retry_after`: backoff exponencial con full jitter y
+  lectura de Retry-After (segundos o fecha HTTP).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Optional, Protocol
+
+from observability.metrics import RATE_LIMIT_WAIT_SECONDS, bound
+
+
+class Bucket(Protocol):
+    async def acquire(self, n: int = 1) -> float: ...  # segundos esperados
+    async def penalize(self, seconds: float) -> None: ...
+
+
+def _gcra(tat: float, now: float, n: int, interval: float, burst: int) -> tuple[float, float]:
+    """(nuevo_tat, espera) al reservar `n` huecos."""
+    new_tat = max(tat, now) + n * interval
+    return new_tat, max(0.0, new_tat - burst * interval - now)
+
+
+class TokenBucket:
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        *,
+        name: str = "default",
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError("rate debe ser > 0")
+        self.interval = 1.0 / rate
+        self.burst = max(1, burst)
+        self.clock = clock
+        self.sleep = sleep
+        self._tat = 0.0
+        self._wait = bound(RATE_LIMIT_WAIT_SECONDS, name)
+
+    def reserve(self, n: int = 1) -> float:
+        """Reserva `n` huecos y devuelve cuánto hay que esperar (sin dormir)."""
+        self._tat, wait = _gcra(self._tat, self.clock(), n, self.interval, self.burst)
+        return wait
+
+    async def acquire(self, n: int = 1) -> float:
+        wait = self.reserve(n)
+        if wait > 0:
+            self._wait.observe(wait)
+            await self.sleep(wait)
+        return wait
+
+    async def penalize(self, seconds: float) -> None:
+        self._tat = max(self._tat, self.clock() + seconds + self.burst * self.interval)
+
+
+class RedisTokenBucket:
+    """GCRA con el TAT en Redis (`key`): el límite se cumple entre réplicas."""
+
+    def __init__(
+        self,
+        client: Any,
+        key: str,
+        rate: float,
+        burst: int = 1,
+        *,
+        name: str = "default",
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError("rate debe ser > 0")
+        self.client = client
+        self.key = key
+        self.interval = 1.0 / rate
+        self.burst = max(1, burst)
+        self.sleep = sleep
+        self._wait = bound(RATE_LIMIT_WAIT_SECONDS, name)
+
+    def _update(self, n: int, penalty: Optional[float]) -> float:
+        def txn(pipe: Any) -> float:
+            secs, usecs = pipe.time()  # reloj del servidor: igual para todas las réplicas
+            now = secs + usecs / 1e6
+            raw = pipe.get(self.key)
+            tat = float(raw) if raw else now
+            if penalty is None:
+                new_tat, wait = _gcra(tat, now, n, self.interval, self.burst)
+            else:
+                new_tat, wait = max(tat, now + penalty + self.burst * self.interval), 0.0
+            pipe.multi()
+            pipe.set(self.key, repr(new_tat), px=int((new_tat - now) * 1000) + 1000)
+            return wait
+
+        return self.client.transaction(txn, self.key, value_from_callable=True)
+
+    async def acquire(self, n: int = 1) -> float:
+        wait = await asyncio.to_thread(self._update, n, None)
+        if wait > 0:
+            self._wait.observe(wait)
+            await self.sleep(wait)
+        return wait
+
+    async def penalize(self, seconds: float) -> None:
+        await asyncio.to_thread(self._update, 0, seconds)
+
+
+class SendLimiter:
+    """Límite por emisor y (opcional) por destinatario."""
+
+    def __init__(
+        self,
+        sender: Bucket,
+        per_recipient: Optional[Callable[[str], Bucket]] = None,
+        *,
+        max_recipients: int = 10_000,
+    ):
+        self.sender = sender
+        self.per_recipient = per_recipient
+        self.max_recipients = max_recipients
+        self._recipients: OrderedDict[str, Bucket] = OrderedDict()
+
+    def recipient(self, to: str) -> Optional[Bucket]:
+        if self.per_recipient is None:
+            return None
+        bucket = self._recipients.get(to)
+        if bucket is None:
+            bucket = self._recipients[to] = self.per_recipient(to)
+            if len(self._recipients) > self.max_recipients:
+                self._recipients.popitem(last=False)
+        else:
+            self._recipients.move_to_end(to)
+        return bucket
+
+    async def acquire(self, to: Optional[str] = None) -> float:
+        waited = 0.0
+        bucket = self.recipient(to) if to else None
+        if bucket is not None:
+            # primero el destinatario: no gastamos hueco global mientras esperamos su turno
+            waited += await bucket.acquire()
+        return waited + await self.sender.acquire()
+
+    async def penalize(self, seconds: float, to: Optional[str] = None) -> None:
+        """Bloquea al destinatario `to` (pair rate) o, sin `to`, al emisor entero."""
+        bucket = self.recipient(to) if to else None
+        await (bucket or self.sender).penalize(seconds)
+
+
+def backoff_delay(attempt: int, base: float = 1.5, cap: float = 30.0) -> float:
+    """Backoff exponencial con full jitter: uniforme en [0, min(cap, base**attempt)]."""
+    return random.uniform(0.0, min(cap, base ** attempt))
+
+
+def parse_retry_after(value: Optional[str], *, now: Optional[float] = None) -> Optional[float]:
+    """Segundos indicados por Retry-After (entero/decimal o fecha HTTP); None si no hay."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - (time.time() if now is None else now))
@@ -7,6 +7,8 @@ from adapters.generic_webhook.handler import router as generic_router
 from adapters.whatsapp_business.handler import router as wab_router
 # Para telegram necesitamos revisar si hay token antes de montar
 from adapters.telegram import handler as tg_handler
+from infrastructure.startup import lifespan, readiness
+from observability.metrics import WebhookMetricsMiddleware
 
 # Prometheus: si no está instalado, exponemos texto básico para no romper
 try:
@@ -19,7 +21,9 @@ except Exception:
         return Response("# prometheus_client no instalado\n", media_type="text/plain")
 
 def build_app() -> FastAPI:
-    app = FastAPI(title="BlakIA Agent", version="0.1.0")
+    # Observabilidad y grafo se inicializan en el lifespan, no al importar
+    app = FastAPI(title="BlakIA Agent", version="0.1.0", lifespan=lifespan)
+    app.add_middleware(WebhookMetricsMiddleware)  # latencia/errores por canal de webhook
 
     # ---------- Rutas de negocio (webhooks) ----------
     # Genérico y WhatsApp siempre montados
@@ -36,13 +40,19 @@ def build_app() -> FastAPI:
     # ---------- Operacional ----------
     @app.get("/", tags=["ops"])
     def index():
-        return JSONResponse({"status": "ok", "docs": "/docs", "health": "/health", "metrics": "/metrics"})
+        return JSONResponse({"status": "ok", "docs": "/docs", "health": "/health", "ready": "/ready", "metrics": "/metrics"})
 
     @app.get("/health", tags=["ops"])
     def health():
         # Si más adelante tienes settings, puedes incluir env aquí
         return JSONResponse({"ok": True})
 
+    @app.get("/ready", tags=["ops"])
+    def ready():
+        # 503 hasta que el grafo (eager_warmup) y los pools (warmup_enabled) estén listos
+        state = readiness(app)
+        return JSONResponse(state, status_code=200 if state["ok"] else 503)
+
     @app.get("/metrics", tags=["ops"])
     def metrics():
         return metrics_response()
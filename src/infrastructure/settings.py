@@ -27,6 +27,65 @@ class Settings(BaseSettings):
         default=None,
         validation_alias=AliasChoices("BLAKIA_GENERIC_WEBHOOK_API_KEY", "GENERIC_WEBHOOK_API_KEY"),
     )
+    # Lote del webhook genérico: turnos en paralelo (sesiones distintas) y tamaño máximo
+    generic_webhook_batch_concurrency: int = Field(
+        default=8,
+        validation_alias=AliasChoices("BLAKIA_GENERIC_WEBHOOK_BATCH_CONCURRENCY", "GENERIC_WEBHOOK_BATCH_CONCURRENCY"),
+    )
+    generic_webhook_batch_max_items: int = Field(
+        default=100,
+        validation_alias=AliasChoices("BLAKIA_GENERIC_WEBHOOK_BATCH_MAX_ITEMS", "GENERIC_WEBHOOK_BATCH_MAX_ITEMS"),
+    )
+
+    # --- LLM / routing de modelos ---
+    llm_model: str = Field(
+        default="gpt-4.1-mini",
+        validation_alias=AliasChoices("BLAKIA_LLM_MODEL", "LLM_MODEL"),
+    )
+    model_routing_enabled: bool = Field(
+        default=False,
+        validation_alias=AliasChoices("BLAKIA_MODEL_ROUTING_ENABLED", "MODEL_ROUTING_ENABLED"),
+    )
+    # Cadena de fallback separada por comas (p. ej. "gpt-4.1,gpt-4o-mini")
+    llm_fallback_models: str = Field(
+        default="",
+        validation_alias=AliasChoices("BLAKIA_LLM_FALLBACK_MODELS", "LLM_FALLBACK_MODELS"),
+    )
+    # Modelo rápido/barato para mensajes triviales (saludos, "ok", "gracias"...)
+    llm_fast_model: Optional[str] = Field(
+        default=None,
+        validation_alias=AliasChoices("BLAKIA_LLM_FAST_MODEL", "LLM_FAST_MODEL"),
+    )
+    llm_slo_ms: int = Field(
+        default=4000,
+        validation_alias=AliasChoices("BLAKIA_LLM_SLO_MS", "LLM_SLO_MS"),
+    )
+    llm_attempt_timeout_ms: Optional[int] = Field(
+        default=None,
+        validation_alias=AliasChoices("BLAKIA_LLM_ATTEMPT_TIMEOUT_MS", "LLM_ATTEMPT_TIMEOUT_MS"),
+    )
+
+    # Hedging: 2ª llamada idéntica si la 1ª supera el percentil de latencia reciente
+    llm_hedging_enabled: bool = Field(
+        default=False,
+        validation_alias=AliasChoices("BLAKIA_LLM_HEDGING_ENABLED", "LLM_HEDGING_ENABLED"),
+    )
+    llm_hedge_percentile: float = Field(
+        default=95.0,
+        validation_alias=AliasChoices("BLAKIA_LLM_HEDGE_PERCENTILE", "LLM_HEDGE_PERCENTILE"),
+    )
+    llm_hedge_budget_ratio: float = Field(
+        default=0.1,
+        validation_alias=AliasChoices("BLAKIA_LLM_HEDGE_BUDGET_RATIO", "LLM_HEDGE_BUDGET_RATIO"),
+    )
+    llm_hedge_min_samples: int = Field(
+        default=20,
+        validation_alias=AliasChoices("BLAKIA_LLM_HEDGE_MIN_SAMPLES", "LLM_HEDGE_MIN_SAMPLES"),
+    )
+    llm_hedge_initial_delay_ms: Optional[int] = Field(
+        default=None,
+        validation_alias=AliasChoices("BLAKIA_LLM_HEDGE_INITIAL_DELAY_MS", "LLM_HEDGE_INITIAL_DELAY_MS"),
+    )
 
     # --- WhatsApp / Meta ---
     whatsapp_token: Optional[str] = Field(
@@ -49,6 +108,20 @@ class Settings(BaseSettings):
         default=None,
         validation_alias=AliasChoices("BLAKIA_META_APP_SECRET", "META_APP_SECRET"),
     )
+    whatsapp_graph_base_url: str = Field(
+        default="https://graph.facebook.com",
+        validation_alias=AliasChoices("BLAKIA_WHATSAPP_GRAPH_BASE_URL", "WHATSAPP_GRAPH_BASE_URL"),
+    )
+
+    # --- Upstreams (base URLs sobreescribibles para stand-ins locales) ---
+    openai_base_url: str = Field(
+        default="https://api.openai.com/v1",
+        validation_alias=AliasChoices("BLAKIA_OPENAI_BASE_URL", "OPENAI_BASE_URL"),
+    )
+    telegram_api_base_url: str = Field(
+        default="https://api.telegram.org",
+        validation_alias=AliasChoices("BLAKIA_TELEGRAM_API_BASE_URL", "TELEGRAM_API_BASE_URL"),
+    )
 
     # --- Memory / Redis ---
     memory_backend: str = Field(
@@ -76,6 +149,21 @@ class Settings(BaseSettings):
         validation_alias=AliasChoices("BLAKIA_REDIS_PASSWORD", "REDIS_PASSWORD"),
     )
 
+    # Consumo por sesión (core.memory.usage_store): caducidad y tamaño de los rankings
+    usage_ttl_s: float = Field(
+        default=30 * 86400,
+        validation_alias=AliasChoices("BLAKIA_USAGE_TTL_S", "USAGE_TTL_S"),
+    )
+    usage_top_size: int = Field(
+        default=1000,
+        validation_alias=AliasChoices("BLAKIA_USAGE_TOP_SIZE", "USAGE_TOP_SIZE"),
+    )
+    # backend en memoria: sesiones como mucho (se expulsa la menos reciente)
+    usage_max_sessions: int = Field(
+        default=10_000,
+        validation_alias=AliasChoices("BLAKIA_USAGE_MAX_SESSIONS", "USAGE_MAX_SESSIONS"),
+    )
+
     # --- Langfuse ---
     langfuse_public_key: Optional[str] = Field(
         default=None,
@@ -108,6 +196,363 @@ class Settings(BaseSettings):
         validation_alias=AliasChoices("BLAKIA_OTEL_RESOURCE_ATTRIBUTES", "OTEL_RESOURCE_ATTRIBUTES"),
     )
 
+    # Batch span processor (exportación OTLP en segundo plano, cola acotada).
+    # La cola llena descarta spans (contados en agent_otel_spans_dropped_total)
+    # en vez de bloquear o crecer en memoria.
+    otel_bsp_max_queue_size: int = Field(
+        default=2048,
+        validation_alias=AliasChoices("BLAKIA_OTEL_BSP_MAX_QUEUE_SIZE", "OTEL_BSP_MAX_QUEUE_SIZE"),
+    )
+    otel_bsp_max_export_batch_size: int = Field(
+        default=512,
+        validation_alias=AliasChoices("BLAKIA_OTEL_BSP_MAX_EXPORT_BATCH_SIZE", "OTEL_BSP_MAX_EXPORT_BATCH_SIZE"),
+    )
+    otel_bsp_schedule_delay_ms: int = Field(
+        default=5000,
+        validation_alias=AliasChoices("BLAKIA_OTEL_BSP_SCHEDULE_DELAY", "OTEL_BSP_SCHEDULE_DELAY"),
+    )
+    # Tiempo máximo por exportación (incluye reintentos del exporter OTLP)
+    otel_bsp_export_timeout_ms: int = Field(
+        default=10000,
+        validation_alias=AliasChoices("BLAKIA_OTEL_BSP_EXPORT_TIMEOUT", "OTEL_BSP_EXPORT_TIMEOUT"),
+    )
+
+    # Scrubbing de atributos: "logfire" (regex sobre claves y valores, en cada
+    # span), "denylist"/"allowlist" (solo por clave, cacheado, en el hilo del
+    # exportador) u "off".
+    otel_scrubbing_mode: Literal["logfire", "denylist", "allowlist", "off"] = Field(
+        default="logfire",
+        validation_alias=AliasChoices("BLAKIA_OTEL_SCRUBBING_MODE", "OTEL_SCRUBBING_MODE"),
+    )
+    # Globs separados por comas; sin valor se usan los de observability.scrubbing
+    otel_scrub_patterns: Optional[str] = Field(
+        default=None,
+        validation_alias=AliasChoices("BLAKIA_OTEL_SCRUB_PATTERNS", "OTEL_SCRUB_PATTERNS"),
+    )
+
+    # --- Trazas de tools (observability.langfuse.tracing.traced_tool) ---
+    tool_trace_enabled: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("BLAKIA_TOOL_TRACE_ENABLED", "TOOL_TRACE_ENABLED"),
+    )
+    # Head sampling: fracción de llamadas que abren span desde el principio
+    tool_trace_sample_rate: float = Field(
+        default=1.0,
+        validation_alias=AliasChoices("BLAKIA_TOOL_TRACE_SAMPLE_RATE", "TOOL_TRACE_SAMPLE_RATE"),
+    )
+    # Tail sampling: las no muestreadas se trazan igualmente si fallan o tardan más de esto
+    tool_trace_tail_slow_ms: int = Field(
+        default=1000,
+        validation_alias=AliasChoices("BLAKIA_TOOL_TRACE_TAIL_SLOW_MS", "TOOL_TRACE_TAIL_SLOW_MS"),
+    )
+    tool_trace_tail_errors: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("BLAKIA_TOOL_TRACE_TAIL_ERRORS", "TOOL_TRACE_TAIL_ERRORS"),
+    )
+    tool_trace_max_attr_chars: int = Field(
+        default=512,
+        validation_alias=AliasChoices("BLAKIA_TOOL_TRACE_MAX_ATTR_CHARS", "TOOL_TRACE_MAX_ATTR_CHARS"),
+    )
+    # RunContext en los atributos: summary (modelo/paso/uso), redacted o full (str truncado)
+    tool_trace_context_mode: Literal["summary", "redacted", "full"] = Field(
+        default="summary",
+        validation_alias=AliasChoices("BLAKIA_TOOL_TRACE_CONTEXT_MODE", "TOOL_TRACE_CONTEXT_MODE"),
+    )
+
+    # --- Métricas Prometheus ---
+    metrics_enabled: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("BLAKIA_METRICS_ENABLED", "METRICS_ENABLED"),
+    )
+
+    # --- Arranque (lifespan) ---
+    observability_enabled: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("BLAKIA_OBSERVABILITY_ENABLED", "OBSERVABILITY_ENABLED"),
+    )
+    eager_warmup: bool = Field(
+        default=False,
+        validation_alias=AliasChoices("BLAKIA_EAGER_WARMUP", "EAGER_WARMUP"),
+    )
+    startup_import_budget_ms: int = Field(
+        default=3000,
+        validation_alias=AliasChoices("BLAKIA_STARTUP_IMPORT_BUDGET_MS", "STARTUP_IMPORT_BUDGET_MS"),
+    )
+
+    # --- HTTP compartido (pools por upstream) ---
+    http_timeout_s: float = Field(
+        default=30.0,
+        validation_alias=AliasChoices("BLAKIA_HTTP_TIMEOUT_S", "HTTP_TIMEOUT_S"),
+    )
+    http_max_connections: int = Field(
+        default=100,
+        validation_alias=AliasChoices("BLAKIA_HTTP_MAX_CONNECTIONS", "HTTP_MAX_CONNECTIONS"),
+    )
+    http_max_keepalive_connections: int = Field(
+        default=20,
+        validation_alias=AliasChoices("BLAKIA_HTTP_MAX_KEEPALIVE_CONNECTIONS", "HTTP_MAX_KEEPALIVE_CONNECTIONS"),
+    )
+    # Debe superar warmup_interval_s para que el warm-up periódico mantenga el pool caliente
+    http_keepalive_expiry_s: float = Field(
+        default=90.0,
+        validation_alias=AliasChoices("BLAKIA_HTTP_KEEPALIVE_EXPIRY_S", "HTTP_KEEPALIVE_EXPIRY_S"),
+    )
+
+    # Pool de la Graph API de WhatsApp: HTTP/2 (si `h2` está instalado) multiplexa
+    # los envíos sobre pocas conexiones; sin h2 se usa HTTP/1.1 keep-alive.
+    whatsapp_http2: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("BLAKIA_WHATSAPP_HTTP2", "WHATSAPP_HTTP2"),
+    )
+    whatsapp_max_connections: int = Field(
+        default=20,
+        validation_alias=AliasChoices("BLAKIA_WHATSAPP_MAX_CONNECTIONS", "WHATSAPP_MAX_CONNECTIONS"),
+    )
+    whatsapp_max_keepalive_connections: int = Field(
+        default=10,
+        validation_alias=AliasChoices(
+            "BLAKIA_WHATSAPP_MAX_KEEPALIVE_CONNECTIONS", "WHATSAPP_MAX_KEEPALIVE_CONNECTIONS"
+        ),
+    )
+
+    # Rate limiting de la Graph API: por phone_id (throughput) y por destinatario (pair rate)
+    whatsapp_rate_limit_enabled: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("BLAKIA_WHATSAPP_RATE_LIMIT_ENABLED", "WHATSAPP_RATE_LIMIT_ENABLED"),
+    )
+    whatsapp_rate_per_s: float = Field(
+        default=80.0,
+        validation_alias=AliasChoices("BLAKIA_WHATSAPP_RATE_PER_S", "WHATSAPP_RATE_PER_S"),
+    )
+    whatsapp_rate_burst: int = Field(
+        default=80,
+        validation_alias=AliasChoices("BLAKIA_WHATSAPP_RATE_BURST", "WHATSAPP_RATE_BURST"),
+    )
+    whatsapp_recipient_rate_per_s: float = Field(
+        default=1 / 6,
+        validation_alias=AliasChoices("BLAKIA_WHATSAPP_RECIPIENT_RATE_PER_S", "WHATSAPP_RECIPIENT_RATE_PER_S"),
+    )
+    whatsapp_recipient_burst: int = Field(
+        default=45,
+        validation_alias=AliasChoices("BLAKIA_WHATSAPP_RECIPIENT_BURST", "WHATSAPP_RECIPIENT_BURST"),
+    )
+    whatsapp_retry_max_delay_s: float = Field(
+        default=30.0,
+        validation_alias=AliasChoices("BLAKIA_WHATSAPP_RETRY_MAX_DELAY_S", "WHATSAPP_RETRY_MAX_DELAY_S"),
+    )
+    # Telegram: ~30 msg/s por bot y ~1 msg/s por chat (ráfagas cortas toleradas)
+    telegram_rate_limit_enabled: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("BLAKIA_TELEGRAM_RATE_LIMIT_ENABLED", "TELEGRAM_RATE_LIMIT_ENABLED"),
+    )
+    telegram_rate_per_s: float = Field(
+        default=30.0,
+        validation_alias=AliasChoices("BLAKIA_TELEGRAM_RATE_PER_S", "TELEGRAM_RATE_PER_S"),
+    )
+    telegram_rate_burst: int = Field(
+        default=30,
+        validation_alias=AliasChoices("BLAKIA_TELEGRAM_RATE_BURST", "TELEGRAM_RATE_BURST"),
+    )
+    telegram_chat_rate_per_s: float = Field(
+        default=1.0,
+        validation_alias=AliasChoices("BLAKIA_TELEGRAM_CHAT_RATE_PER_S", "TELEGRAM_CHAT_RATE_PER_S"),
+    )
+    telegram_chat_burst: int = Field(
+        default=3,
+        validation_alias=AliasChoices("BLAKIA_TELEGRAM_CHAT_BURST", "TELEGRAM_CHAT_BURST"),
+    )
+    # Ingesta de Telegram: "webhook" (por defecto) o "polling" (getUpdates, sin URL pública)
+    telegram_ingest_mode: Literal["webhook", "polling"] = Field(
+        default="webhook",
+        validation_alias=AliasChoices("BLAKIA_TELEGRAM_INGEST_MODE", "TELEGRAM_INGEST_MODE"),
+    )
+    telegram_poll_timeout_s: int = Field(
+        default=25,
+        validation_alias=AliasChoices("BLAKIA_TELEGRAM_POLL_TIMEOUT_S", "TELEGRAM_POLL_TIMEOUT_S"),
+    )
+    telegram_poll_limit: int = Field(
+        default=100,
+        validation_alias=AliasChoices("BLAKIA_TELEGRAM_POLL_LIMIT", "TELEGRAM_POLL_LIMIT"),
+    )
+    # Turnos en paralelo (chats distintos) y updates aceptados sin terminar antes de dejar de pedir más
+    telegram_poll_concurrency: int = Field(
+        default=16,
+        validation_alias=AliasChoices("BLAKIA_TELEGRAM_POLL_CONCURRENCY", "TELEGRAM_POLL_CONCURRENCY"),
+    )
+    telegram_poll_max_pending: int = Field(
+        default=1000,
+        validation_alias=AliasChoices("BLAKIA_TELEGRAM_POLL_MAX_PENDING", "TELEGRAM_POLL_MAX_PENDING"),
+    )
+    # Tope de espera por reintento (retry_after de Telegram o backoff)
+    telegram_retry_max_delay_s: float = Field(
+        default=60.0,
+        validation_alias=AliasChoices("BLAKIA_TELEGRAM_RETRY_MAX_DELAY_S", "TELEGRAM_RETRY_MAX_DELAY_S"),
+    )
+    # Media entrante: directorio de descarga (None = no se descarga) y tamaño máximo
+    whatsapp_media_dir: Optional[str] = Field(
+        default=None,
+        validation_alias=AliasChoices("BLAKIA_WHATSAPP_MEDIA_DIR", "WHATSAPP_MEDIA_DIR"),
+    )
+    whatsapp_media_max_bytes: int = Field(
+        default=100 * 1024 * 1024,
+        validation_alias=AliasChoices("BLAKIA_WHATSAPP_MEDIA_MAX_BYTES", "WHATSAPP_MEDIA_MAX_BYTES"),
+    )
+    # los ficheros descargados se borran pasado este tiempo
+    whatsapp_media_retention_s: float = Field(
+        default=7 * 86400,
+        validation_alias=AliasChoices("BLAKIA_WHATSAPP_MEDIA_RETENTION_S", "WHATSAPP_MEDIA_RETENTION_S"),
+    )
+    # Media saliente: subir una vez y reutilizar el media id (clave = hash del contenido)
+    whatsapp_media_cache_enabled: bool = Field(
+        default=False,
+        validation_alias=AliasChoices("BLAKIA_WHATSAPP_MEDIA_CACHE_ENABLED", "WHATSAPP_MEDIA_CACHE_ENABLED"),
+    )
+    whatsapp_media_cache_backend: Literal["memory", "redis"] = Field(
+        default="memory",
+        validation_alias=AliasChoices("BLAKIA_WHATSAPP_MEDIA_CACHE_BACKEND", "WHATSAPP_MEDIA_CACHE_BACKEND"),
+    )
+    # Meta conserva los media subidos 30 días: caducamos antes
+    whatsapp_media_cache_ttl_s: float = Field(
+        default=25 * 86400,
+        validation_alias=AliasChoices("BLAKIA_WHATSAPP_MEDIA_CACHE_TTL_S", "WHATSAPP_MEDIA_CACHE_TTL_S"),
+    )
+    # Presencia mientras corre el turno: read receipt + "escribiendo…"
+    presence_enabled: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("BLAKIA_PRESENCE_ENABLED", "PRESENCE_ENABLED"),
+    )
+    # mínimo entre dos pings al mismo chat (agrupa ráfagas)
+    presence_min_gap_s: float = Field(
+        default=3.0,
+        validation_alias=AliasChoices("BLAKIA_PRESENCE_MIN_GAP_S", "PRESENCE_MIN_GAP_S"),
+    )
+    # al acabar el turno, espera máxima al ping en vuelo antes de cancelarlo
+    presence_exit_wait_s: float = Field(
+        default=0.2,
+        validation_alias=AliasChoices("BLAKIA_PRESENCE_EXIT_WAIT_S", "PRESENCE_EXIT_WAIT_S"),
+    )
+    # WhatsApp quita el indicador a los 25 s; Telegram a los 5 s
+    whatsapp_typing_refresh_s: float = Field(
+        default=20.0,
+        validation_alias=AliasChoices("BLAKIA_WHATSAPP_TYPING_REFRESH_S", "WHATSAPP_TYPING_REFRESH_S"),
+    )
+    telegram_typing_refresh_s: float = Field(
+        default=4.5,
+        validation_alias=AliasChoices("BLAKIA_TELEGRAM_TYPING_REFRESH_S", "TELEGRAM_TYPING_REFRESH_S"),
+    )
+    # wamids recordados por el índice de statuses (sent/delivered/read/failed)
+    whatsapp_status_index_size: int = Field(
+        default=100_000,
+        validation_alias=AliasChoices("BLAKIA_WHATSAPP_STATUS_INDEX_SIZE", "WHATSAPP_STATUS_INDEX_SIZE"),
+    )
+    # memory: por proceso | redis: compartido entre réplicas
+    rate_limit_backend: Literal["memory", "redis"] = Field(
+        default="memory",
+        validation_alias=AliasChoices("BLAKIA_RATE_LIMIT_BACKEND", "RATE_LIMIT_BACKEND"),
+    )
+
+    # --- Procesamiento de mensajes entrantes ---
+    # sync: el webhook ejecuta grafo + envío antes de responder (comportamiento previo)
+    # ack: el webhook encola y responde 200; un pool de workers procesa en orden por sesión.
+    #      La plataforma ya no reintenta: un envío fallido se reintenta en proceso
+    #      (`inbound_max_attempts`) y, si se agotan o el proceso cae, se pierde
+    # durable: el webhook publica en Redis Streams/SQLite; consumen `python -m infrastructure.worker`
+    inbound_mode: Literal["sync", "ack", "durable"] = Field(
+        default="sync",
+        validation_alias=AliasChoices("BLAKIA_INBOUND_MODE", "INBOUND_MODE"),
+    )
+    inbound_workers: int = Field(
+        default=8,
+        validation_alias=AliasChoices("BLAKIA_INBOUND_WORKERS", "INBOUND_WORKERS"),
+    )
+    inbound_queue_size: int = Field(
+        default=1000,
+        validation_alias=AliasChoices("BLAKIA_INBOUND_QUEUE_SIZE", "INBOUND_QUEUE_SIZE"),
+    )
+    inbound_enqueue_timeout_s: float = Field(
+        default=1.0,
+        validation_alias=AliasChoices("BLAKIA_INBOUND_ENQUEUE_TIMEOUT_S", "INBOUND_ENQUEUE_TIMEOUT_S"),
+    )
+    inbound_drain_timeout_s: float = Field(
+        default=20.0,
+        validation_alias=AliasChoices("BLAKIA_INBOUND_DRAIN_TIMEOUT_S", "INBOUND_DRAIN_TIMEOUT_S"),
+    )
+    inbound_queue_backend: Literal["redis", "sqlite"] = Field(
+        default="redis",
+        validation_alias=AliasChoices("BLAKIA_INBOUND_QUEUE_BACKEND", "INBOUND_QUEUE_BACKEND"),
+    )
+    inbound_sqlite_path: str = Field(
+        default="inbound.db",
+        validation_alias=AliasChoices("BLAKIA_INBOUND_SQLITE_PATH", "INBOUND_SQLITE_PATH"),
+    )
+    inbound_partitions: int = Field(
+        default=16,
+        validation_alias=AliasChoices("BLAKIA_INBOUND_PARTITIONS", "INBOUND_PARTITIONS"),
+    )
+    inbound_lease_ms: int = Field(
+        default=60000,
+        validation_alias=AliasChoices("BLAKIA_INBOUND_LEASE_MS", "INBOUND_LEASE_MS"),
+    )
+    inbound_max_attempts: int = Field(
+        default=5,
+        validation_alias=AliasChoices("BLAKIA_INBOUND_MAX_ATTEMPTS", "INBOUND_MAX_ATTEMPTS"),
+    )
+    # tope del backoff (exponencial con jitter) antes de reintentar un mensaje fallido (ack y durable)
+    inbound_retry_max_delay_s: float = Field(
+        default=30.0,
+        validation_alias=AliasChoices("BLAKIA_INBOUND_RETRY_MAX_DELAY_S", "INBOUND_RETRY_MAX_DELAY_S"),
+    )
+    inbound_stream_maxlen: int = Field(
+        default=100_000,
+        validation_alias=AliasChoices("BLAKIA_INBOUND_STREAM_MAXLEN", "INBOUND_STREAM_MAXLEN"),
+    )
+
+    # --- Deduplicación de entrantes (wamid / update_id) ---
+    dedup_enabled: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("BLAKIA_DEDUP_ENABLED", "DEDUP_ENABLED"),
+    )
+    dedup_backend: Literal["memory", "redis"] = Field(
+        default="memory",
+        validation_alias=AliasChoices("BLAKIA_DEDUP_BACKEND", "DEDUP_BACKEND"),
+    )
+    dedup_ttl_s: float = Field(
+        default=86400.0,
+        validation_alias=AliasChoices("BLAKIA_DEDUP_TTL_S", "DEDUP_TTL_S"),
+    )
+    # Lease del marcador "en curso": si el proceso muere antes de responder, el
+    # reintento se procesa pasado este tiempo (debe superar el turno más lento)
+    dedup_inflight_ttl_s: float = Field(
+        default=300.0,
+        validation_alias=AliasChoices("BLAKIA_DEDUP_INFLIGHT_TTL_S", "DEDUP_INFLIGHT_TTL_S"),
+    )
+    dedup_max_entries: int = Field(
+        default=100_000,
+        validation_alias=AliasChoices("BLAKIA_DEDUP_MAX_ENTRIES", "DEDUP_MAX_ENTRIES"),
+    )
+    dedup_cache_replies: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("BLAKIA_DEDUP_CACHE_REPLIES", "DEDUP_CACHE_REPLIES"),
+    )
+
+    # --- Warm-up de conexiones ---
+    warmup_enabled: bool = Field(
+        default=False,
+        validation_alias=AliasChoices("BLAKIA_WARMUP_ENABLED", "WARMUP_ENABLED"),
+    )
+    warmup_interval_s: float = Field(
+        default=45.0,
+        validation_alias=AliasChoices("BLAKIA_WARMUP_INTERVAL_S", "WARMUP_INTERVAL_S"),
+    )
+    warmup_timeout_s: float = Field(
+        default=5.0,
+        validation_alias=AliasChoices("BLAKIA_WARMUP_TIMEOUT_S", "WARMUP_TIMEOUT_S"),
+    )
+    warmup_connections: int = Field(
+        default=1,
+        validation_alias=AliasChoices("BLAKIA_WARMUP_CONNECTIONS", "WARMUP_CONNECTIONS"),
+    )
+
     # --- Meta ---
     env: str = Field(default="dev", validation_alias=AliasChoices("BLAKIA_ENV", "ENV"))
 
@@ -0,0 +1,219 @@
+# src/infrastructure/startup.py
+"""Arranque perezoso de la app y perfilado de imports.
+
+- Nada pesado ocurre al importar infrastructure.server: la observabilidad
+  (logfire/Langfuse + Agent.instrument_all) y el grafo se inicializan en el
+  lifespan de FastAPI.
+- `settings.eager_warmup` construye el grafo en el arranque (útil si prefieres
+  pagar el coste antes de recibir tráfico); si no, se construye en la 1ª petición.
+- `settings.warmup_enabled` arranca el ConnectionWarmer (infrastructure.warmup)
+  y `/ready` no responde ok hasta que los pools estén calientes.
+- `settings.inbound_mode = "ack"` arranca el pool de workers de
+  infrastructure.inbound y lo drena al apagar; `"durable"` publica en la
+  cola de infrastructure.job_queue (los workers son otro proceso).
+- `settings.telegram_ingest_mode = "polling"` arranca el long polling de
+  Telegram (adapters.telegram.polling) en vez de esperar al webhook.
+- `import_time_report()` mide `python -X importtime` en un subproceso limpio y
+  devuelve un desglose comprobable contra `settings.startup_import_budget_ms`.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import subprocess
+import sys
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI
+
+from infrastructure.http import http_clients
+from infrastructure.presence import aclose_presence
+from infrastructure.settings import settings
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_observability_configured = False
+
+
+# ======================================================
+# Inicialización diferida
+# ======================================================
+def configure_observability() -> bool:
+    """Configura logfire/Langfuse e instrumenta pydantic-ai (idempotente)."""
+    global _observability_configured
+    if _observability_configured or not settings.observability_enabled:
+        return _observability_configured
+
+    from pydantic_ai import Agent
+    from observability.langfuse.configure import configure_langfuse
+
+    configure_langfuse()
+    Agent.instrument_all()
+    _observability_configured = True
+    return True
+
+
+def warm_up() -> None:
+    """Construye el grafo compartido (y con él agente, modelo y providers)."""
+    from core.runtime import get_graph_and_deps
+
+    get_graph_and_deps()
+
+
+def readiness(app: FastAPI) -> Dict[str, Any]:
+    """Estado de readiness: grafo (si eager_warmup) y pools (si warmup_enabled)."""
+    from core.runtime import is_graph_ready
+
+    graph_ok = is_graph_ready() or not settings.eager_warmup
+    warmer = getattr(app.state, "warmer", None)
+    pools_ok = warmer is None or warmer.primed
+    out: Dict[str, Any] = {"ok": graph_ok and pools_ok, "graph": graph_ok, "pools": pools_ok}
+    if warmer is not None:
+        out["upstreams"] = warmer.snapshot()
+    return out
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    try:
+        configure_observability()
+    except Exception as e:  # la observabilidad nunca debe tumbar el arranque
+        logging.exception("configure_observability failed: %s", e)
+
+    if settings.eager_warmup:
+        warm_up()
+
+    app.state.warmer = None
+    if settings.warmup_enabled:
+        from infrastructure.warmup import build_warmer
+
+        app.state.warmer = build_warmer()
+        app.state.warmer.start()  # en segundo plano: /ready da 503 hasta que termine
+
+    inbound = None
+    if settings.inbound_mode == "ack":
+        from infrastructure.inbound import build_inbound_pool, set_inbound_pool
+
+        inbound = build_inbound_pool()
+        await inbound.start()
+        set_inbound_pool(inbound)
+    elif settings.inbound_mode == "durable":
+        from infrastructure.inbound import set_inbound_pool
+        from infrastructure.job_queue import DurablePublisher, build_job_queue
+
+        set_inbound_pool(DurablePublisher(build_job_queue()))
+    poller = None
+    if settings.telegram_ingest_mode == "polling" and settings.telegram_bot_token:
+        from adapters.telegram.polling import TelegramPoller
+
+        poller = TelegramPoller.from_settings()
+        await poller.start()
+    try:
+        yield
+    finally:
+        if poller is not None:
+            await poller.stop(settings.inbound_drain_timeout_s)
+        if inbound is not None:
+            # drenar antes de cerrar los pools HTTP: los workers aún envían respuestas
+            left = await inbound.stop(settings.inbound_drain_timeout_s)
+            set_inbound_pool(None)
+            if left:
+                logging.warning("inbound: %d mensajes sin procesar al apagar", left)
+        elif settings.inbound_mode == "durable":
+            from infrastructure.inbound import set_inbound_pool
+
+            set_inbound_pool(None)
+        if app.state.warmer is not None:
+            await app.state.warmer.stop()
+        await aclose_presence()  # pings de presencia en vuelo usan los pools HTTP
+        await http_clients.aclose()
+
+
+# ======================================================
+# Perfilado de imports
+# ======================================================
+@dataclass
+class ImportEntry:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass
+class ImportTimeReport:
+    target: str
+    entries: List[ImportEntry] = field(default_factory=list)
+
+    @property
+    def total_ms(self) -> float:
+        top = [e for e in self.entries if e.depth == 0 and e.module == self.target]
+        if top:
+            return top[-1].cumulative_us / 1000
+        return sum(e.self_us for e in self.entries) / 1000
+
+    def loaded(self, module: str) -> bool:
+        """True si `module` (o un submódulo) se importó."""
+        prefix = module + "."
+        return any(e.module == module or e.module.startswith(prefix) for e in self.entries)
+
+    def top(self, n: int = 15) -> List[ImportEntry]:
+        """Los `n` imports con más tiempo propio (self)."""
+        return sorted(self.entries, key=lambda e: e.self_us, reverse=True)[:n]
+
+    def format(self, n: int = 15) -> str:
+        lines = [f"import {self.target}: {self.total_ms:.1f} ms"]
+        for e in self.top(n):
+            lines.append(
+                f"  {e.self_us / 1000:8.1f} ms self {e.cumulative_us / 1000:8.1f} ms cum  {e.module}"
+            )
+        return "\n".join(lines)
+
+
+def parse_importtime(stderr: str, target: str) -> ImportTimeReport:
+    """Parsea la salida de `-X importtime` (self | cumulative | módulo)."""
+    report = ImportTimeReport(target=target)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        try:
+            self_us, cum_us, name = line[len("import time:"):].split("|")
+            entry = ImportEntry(
+                module=name.strip(),
+                self_us=int(self_us),
+                cumulative_us=int(cum_us),
+                depth=(len(name) - len(name.lstrip()) - 1) // 2,
+            )
+        except ValueError:
+            continue  # cabecera "self [us] | cumulative | imported package"
+        report.entries.append(entry)
+    return report
+
+
+def import_time_report(
+    target: str = "infrastructure.server", env: Optional[dict[str, str]] = None
+) -> ImportTimeReport:
+    """Importa `target` en un intérprete limpio con -X importtime."""
+    run_env = dict(os.environ)
+    run_env["PYTHONPATH"] = os.pathsep.join(
+        p for p in (SRC_DIR, run_env.get("PYTHONPATH", "")) if p
+    )
+    run_env.update(env or {})
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        env=run_env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(proc.stderr, target)
+
+
+if __name__ == "__main__":
+    rep = import_time_report(sys.argv[1] if len(sys.argv) > 1 else "infrastructure.server")
+    print(rep.format())
+    budget = settings.startup_import_budget_ms
+    print(f"budget: {budget} ms -> {'OK' if rep.total_ms <= budget else 'OVER'}")
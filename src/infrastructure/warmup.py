@@ -0,0 +1,139 @@
+# src/infrastructure/warmup.py
+"""Pre-calentado de conexiones (DNS + TCP + TLS) contra los upstreams.
+
+El primer mensaje tras un deploy o un periodo ocioso pagaba el handshake
+completo con OpenAI, graph.facebook.com y api.telegram.org. El warmer lanza
+peticiones baratas (HEAD) por los mismos pools que usan los adapters, en el
+arranque y cada `warmup_interval_s`, para que las conexiones keep-alive sigan
+vivas. Cualquier respuesta HTTP (incluido 401/404) cuenta como "primed": lo
+que importa es la conexión, no el recurso.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+
+from infrastructure.http import HttpClientPool, http_clients
+from infrastructure.settings import settings
+
+
+@dataclass
+class WarmupTarget:
+    pool: str        # nombre del cliente en HttpClientPool
+    url: str         # URL barata que abre la conexión
+    method: str = "HEAD"
+
+
+@dataclass
+class TargetStatus:
+    primed: bool = False
+    last_ok: Optional[float] = None
+    last_error: Optional[str] = None
+    attempts: int = 0
+    failures: int = 0
+
+
+@dataclass
+class ConnectionWarmer:
+    targets: List[WarmupTarget]
+    pool: HttpClientPool = field(default_factory=lambda: http_clients)
+    interval_s: float = 45.0
+    timeout_s: float = 5.0
+    connections: int = 1
+    status: Dict[str, TargetStatus] = field(default_factory=dict)
+    _task: Optional[asyncio.Task] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        for t in self.targets:
+            self.status.setdefault(t.pool, TargetStatus())
+
+    @property
+    def primed(self) -> bool:
+        """True cuando todos los pools se han calentado al menos una vez."""
+        return all(s.primed for s in self.status.values())
+
+    async def _warm_target(self, target: WarmupTarget) -> bool:
+        st = self.status[target.pool]
+        st.attempts += 1
+        client = self.pool.get(target.pool)
+        try:
+            # `connections` peticiones concurrentes -> otras tantas conexiones en el pool
+            await asyncio.gather(
+                *(
+                    client.request(target.method, target.url, timeout=self.timeout_s)
+                    for _ in range(max(1, self.connections))
+                )
+            )
+        except httpx.HTTPError as e:
+            st.failures += 1
+            st.last_error = f"{type(e).__name__}: {e}"
+            logging.warning("warmup %s failed: %s", target.pool, st.last_error)
+            return False
+        st.primed = True
+        st.last_ok = time.time()
+        st.last_error = None
+        return True
+
+    async def warm_once(self) -> Dict[str, bool]:
+        results = await asyncio.gather(*(self._warm_target(t) for t in self.targets))
+        return {t.pool: ok for t, ok in zip(self.targets, results)}
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.warm_once()
+            except Exception as e:  # nunca tumbar el loop
+                logging.exception("warmup loop error: %s", e)
+            await asyncio.sleep(self.interval_s)
+
+    def start(self) -> asyncio.Task:
+        """Arranca el warm-up inicial + periódico en segundo plano."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop(), name="connection-warmer")
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        return {
+            name: {"primed": s.primed, "last_ok": s.last_ok, "last_error": s.last_error}
+            for name, s in self.status.items()
+        }
+
+
+def default_targets() -> List[WarmupTarget]:
+    """Upstreams configurados: OpenAI siempre; WhatsApp/Telegram si hay credenciales."""
+    targets = [WarmupTarget("openai", f"{settings.openai_base_url.rstrip('/')}/models")]
+    if settings.whatsapp_token:
+        targets.append(
+            WarmupTarget(
+                "whatsapp",
+                f"{settings.whatsapp_graph_base_url.rstrip('/')}/{settings.whatsapp_api_version}/",
+            )
+        )
+    if settings.telegram_bot_token:
+        targets.append(WarmupTarget("telegram", f"{settings.telegram_api_base_url.rstrip('/')}/"))
+    return targets
+
+
+def build_warmer(pool: Optional[HttpClientPool] = None) -> ConnectionWarmer:
+    return ConnectionWarmer(
+        targets=default_targets(),
+        pool=pool or http_clients,
+        interval_s=settings.warmup_interval_s,
+        timeout_s=settings.warmup_timeout_s,
+        connections=settings.warmup_connections,
+    )
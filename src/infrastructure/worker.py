@@ -0,0 +1,56 @@
+# src/infrastructure/worker.py
+"""Worker de la cola duradera de mensajes entrantes.
+
+    PYTHONPATH=src python -m infrastructure.worker
+
+Consume la cola de `inbound_queue_backend` (infrastructure.job_queue) con
+`inbound_workers` particiones en paralelo y ejecuta el procesador de cada
+canal (turno del grafo + envío). Escala de forma independiente a los
+frontales HTTP: arranca tantos procesos/hosts como haga falta. SIGTERM/SIGINT
+terminan tras el mensaje en curso; lo no confirmado lo retoma otro worker.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import signal
+
+from infrastructure.http import http_clients
+from infrastructure.job_queue import DurableWorker, build_job_queue
+from infrastructure.presence import aclose_presence
+from infrastructure.startup import configure_observability
+
+
+def register_channel_handlers() -> None:
+    """Importa los adapters: cada uno registra su procesador al importarse."""
+    import adapters.telegram.handler  # noqa: F401
+    import adapters.whatsapp_business.handler  # noqa: F401
+
+
+async def serve() -> None:
+    try:
+        configure_observability()
+    except Exception as e:  # la observabilidad nunca debe tumbar el worker
+        logging.exception("configure_observability failed: %s", e)
+    register_channel_handlers()
+
+    worker = DurableWorker.from_settings(build_job_queue())
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+    logging.info("inbound worker %s: %d slots", worker.consumer, worker.slots)
+    try:
+        await worker.run()
+    finally:
+        await aclose_presence()
+        await http_clients.aclose()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
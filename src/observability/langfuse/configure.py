@@ -3,6 +3,11 @@ from dotenv import load_dotenv
 import logfire
 import base64
 import os
+from typing import Optional
+
+from infrastructure.settings import settings
+from observability.scrubbing import AttributeScrubber
+from observability.span_export import BoundedSpanProcessor, build_span_processor
 
 load_dotenv()
 
@@ -17,8 +22,13 @@ def scrubbing_callback(match: logfire.ScrubMatch):
         return match.value
 
 
+# Processor OTLP activo (para inspeccionar pendientes/descartados)
+span_processor: Optional[BoundedSpanProcessor] = None
+
+
 # Configure Langfuse for agent observability
 def configure_langfuse():
+    global span_processor
     LANGFUSE_PUBLIC_KEY = os.getenv("LANGFUSE_PUBLIC_KEY")
     LANGFUSE_SECRET_KEY = os.getenv("LANGFUSE_SECRET_KEY")
     LANGFUSE_HOST = os.getenv("LANGFUSE_HOST", "http://localhost:3002")
@@ -26,14 +36,34 @@ def configure_langfuse():
         f"{LANGFUSE_PUBLIC_KEY}:{LANGFUSE_SECRET_KEY}".encode()
     ).decode()
 
-    os.environ["OTEL_EXPORTER_OTLP_ENDPOINT"] = f"{LANGFUSE_HOST}/api/public/otel"
-    os.environ["OTEL_EXPORTER_OTLP_HEADERS"] = f"Authorization=Basic {LANGFUSE_AUTH}"
+    # Exportación a Langfuse con nuestro processor (cola acotada + métricas de
+    # descartes) en vez de OTEL_EXPORTER_OTLP_ENDPOINT, que haría a logfire
+    # montar un BatchSpanProcessor por defecto sin límites configurables.
+    # Scrubbing: el de logfire (regex en cada span) o el nuestro por clave,
+    # aplicado por lotes en el exportador (ver observability.scrubbing).
+    mode = settings.otel_scrubbing_mode
+    scrubbing: logfire.ScrubbingOptions | bool = False
+    scrubber: Optional[AttributeScrubber] = None
+    if mode == "logfire":
+        scrubbing = logfire.ScrubbingOptions(callback=scrubbing_callback)
+    elif mode != "off":
+        scrubber = AttributeScrubber.from_settings()
+
+    processors = []
+    if settings.otel_traces_exporter != "none":
+        span_processor = build_span_processor(
+            f"{LANGFUSE_HOST}/api/public/otel/v1/traces",
+            headers={"Authorization": f"Basic {LANGFUSE_AUTH}"},
+            scrubber=scrubber,
+        )
+        processors.append(span_processor)
 
     # Configure Logfire to work with Langfuse
     logfire.configure(
         service_name="pydantic_ai_agent",
         send_to_logfire=False,
-        scrubbing=logfire.ScrubbingOptions(callback=scrubbing_callback),
+        scrubbing=scrubbing,
+        additional_span_processors=processors,
     )
 
     return trace.get_tracer("pydantic_ai_agent")
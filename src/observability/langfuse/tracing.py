@@ -1,9 +1,154 @@
 # observability/langfuse/tracing.py
+"""Trazas de tools con coste acotado.
+
+`traced_tool` sigue una `TracingPolicy` (por defecto, desde settings):
+
+- Desactivado (`tool_trace_enabled=False`): camino no-op, solo métricas.
+- Head sampling (`sample_rate`): las llamadas muestreadas abren span al
+  empezar; si el span no graba (sin TracerProvider real) no se serializa nada.
+- Tail sampling: las no muestreadas se trazan a posteriori (span con sus
+  tiempos reales) si fallan o tardan más de `tail_slow_s`.
+- Atributos truncados a `max_attr_chars` y con `reprlib` (coste acotado aunque
+  el argumento sea enorme). El `RunContext` (deps + historial) nunca se
+  convierte entero salvo en modo "full": "summary" deja modelo/paso/uso y
+  "redacted" solo el tipo.
+"""
+
+from __future__ import annotations
+
+import random
+import reprlib
+import time
+from dataclasses import dataclass
+from functools import lru_cache, wraps
+from typing import Any, Optional
+
 from opentelemetry import trace
-from functools import wraps
-from observability.langfuse.configure import configure_langfuse
+from pydantic_ai.tools import RunContext
+
+from infrastructure.settings import settings
+from observability.metrics import TOOL_ERRORS, TOOL_SECONDS, timed
+
+# ProxyTracer: no configura nada al importar. Delega en el TracerProvider global
+# en cuanto configure_langfuse() lo instala (lo llama el lifespan de la app).
+tracer = trace.get_tracer("pydantic_ai_agent")
+
+
+@dataclass(frozen=True)
+class TracingPolicy:
+    enabled: bool = True
+    sample_rate: float = 1.0
+    tail_slow_s: Optional[float] = 1.0  # None = sin tail sampling por latencia
+    tail_errors: bool = True
+    max_attr_chars: int = 512
+    context_mode: str = "summary"  # summary | redacted | full
+
+    @classmethod
+    def from_settings(cls) -> "TracingPolicy":
+        slow_ms = settings.tool_trace_tail_slow_ms
+        return cls(
+            enabled=settings.tool_trace_enabled,
+            sample_rate=settings.tool_trace_sample_rate,
+            tail_slow_s=slow_ms / 1000 if slow_ms > 0 else None,
+            tail_errors=settings.tool_trace_tail_errors,
+            max_attr_chars=settings.tool_trace_max_attr_chars,
+            context_mode=settings.tool_trace_context_mode,
+        )
+
+    def head_sampled(self) -> bool:
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+
+_policy: Optional[TracingPolicy] = None
+
+
+def get_tracing_policy() -> TracingPolicy:
+    global _policy
+    if _policy is None:
+        _policy = TracingPolicy.from_settings()
+    return _policy
+
 
-tracer = configure_langfuse()
+def set_tracing_policy(policy: Optional[TracingPolicy]) -> None:
+    """Sustituye la política (None = volver a leerla de settings)."""
+    global _policy
+    _policy = policy
+
+
+# =========================
+# Serialización de atributos
+# =========================
+@lru_cache(maxsize=8)
+def _repr(max_chars: int) -> reprlib.Repr:
+    r = reprlib.Repr()
+    r.maxstring = r.maxother = max_chars
+    r.maxlist = r.maxtuple = r.maxdict = r.maxset = 20
+    r.maxlevel = 3
+    return r
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    return text if len(text) <= max_chars else text[:max_chars] + "…"
+
+
+def _describe_context(ctx: RunContext[Any], mode: str) -> str:
+    if mode == "redacted":
+        return "RunContext(<redacted>)"
+    if mode == "full":
+        return str(ctx)
+    usage = ctx.usage
+    return (
+        f"RunContext(model={getattr(ctx.model, 'model_name', type(ctx.model).__name__)}, "
+        f"run_step={ctx.run_step}, retry={ctx.retry}, requests={usage.requests}, "
+        f"input_tokens={usage.input_tokens}, output_tokens={usage.output_tokens}, "
+        f"messages={len(ctx.messages)})"
+    )
+
+
+def describe(value: Any, policy: TracingPolicy) -> str:
+    """Representación acotada de un argumento/resultado para un atributo de span."""
+    if isinstance(value, RunContext):
+        text = _describe_context(value, policy.context_mode)
+    elif isinstance(value, str):
+        text = value
+    else:
+        text = _repr(policy.max_attr_chars).repr(value)
+    return _truncate(text, policy.max_attr_chars)
+
+
+def _set_call_attributes(span: Any, policy: TracingPolicy, args: tuple, kwargs: dict) -> None:
+    limit = policy.max_attr_chars
+    span.set_attribute("tool.args", _truncate(", ".join(describe(a, policy) for a in args), limit))
+    span.set_attribute(
+        "tool.kwargs",
+        _truncate(", ".join(f"{k}={describe(v, policy)}" for k, v in kwargs.items()), limit),
+    )
+
+
+def _emit_tail_span(
+    tool_name: str,
+    policy: TracingPolicy,
+    args: tuple,
+    kwargs: dict,
+    start_ns: int,
+    sampling: str,
+    result: Any = None,
+    error: Optional[BaseException] = None,
+) -> None:
+    """Span a posteriori (tail sampling) con los tiempos reales de la llamada."""
+    span = tracer.start_span(f"tool:{tool_name}", start_time=start_ns)
+    try:
+        if not span.is_recording():
+            return
+        span.set_attribute("tool.sampling", sampling)
+        _set_call_attributes(span, policy, args, kwargs)
+        if error is not None:
+            span.record_exception(error)
+            span.set_status(trace.Status(trace.StatusCode.ERROR, str(error)))
+        else:
+            span.set_attribute("tool.result", describe(result, policy))
+    finally:
+        span.end()
 
 
 def traced_tool(tool_name: str):
@@ -17,18 +162,45 @@ def traced_tool(tool_name: str):
     def decorator(func):
         @wraps(func)  # 🔹 Esto mantiene el nombre original y evita el conflicto
         async def wrapper(*args, **kwargs):
-            with tracer.start_as_current_span(f"tool:{tool_name}") as span:
-                span.set_attribute("tool.args", str(args))
-                span.set_attribute("tool.kwargs", str(kwargs))
-                try:
-                    result = await func(*args, **kwargs)
-                    span.set_attribute("tool.result", str(result))
-                    return result
-                except Exception as e:
-                    span.record_exception(e)
-                    span.set_status(trace.Status(trace.StatusCode.ERROR, str(e)))
-                    raise
+            policy = get_tracing_policy()
+            with timed(TOOL_SECONDS, tool_name, errors=TOOL_ERRORS):
+                if not policy.enabled:
+                    return await func(*args, **kwargs)
+                if policy.head_sampled():
+                    return await _head(func, tool_name, policy, args, kwargs)
+                return await _tail(func, tool_name, policy, args, kwargs)
 
         return wrapper
 
     return decorator
+
+
+async def _head(func: Any, tool_name: str, policy: TracingPolicy, args: tuple, kwargs: dict) -> Any:
+    with tracer.start_as_current_span(f"tool:{tool_name}") as span:
+        recording = span.is_recording()
+        if recording:
+            span.set_attribute("tool.sampling", "head")
+            _set_call_attributes(span, policy, args, kwargs)
+        try:
+            result = await func(*args, **kwargs)
+            if recording:
+                span.set_attribute("tool.result", describe(result, policy))
+            return result
+        except Exception as e:
+            span.record_exception(e)
+            span.set_status(trace.Status(trace.StatusCode.ERROR, str(e)))
+            raise
+
+
+async def _tail(func: Any, tool_name: str, policy: TracingPolicy, args: tuple, kwargs: dict) -> Any:
+    start_ns = time.time_ns()
+    t0 = time.perf_counter()
+    try:
+        result = await func(*args, **kwargs)
+    except Exception as e:
+        if policy.tail_errors:
+            _emit_tail_span(tool_name, policy, args, kwargs, start_ns, "tail_error", error=e)
+        raise
+    if policy.tail_slow_s is not None and time.perf_counter() - t0 >= policy.tail_slow_s:
+        _emit_tail_span(tool_name, policy, args, kwargs, start_ns, "tail_slow", result=result)
+    return result
@@ -0,0 +1,359 @@
+# observability/metrics.py
+"""Métricas Prometheus de la aplicación.
+
+`prometheus_client` es opcional (igual que en infrastructure.server): si no
+está instalado, las métricas son no-ops con la misma interfaz
+(`labels().inc()/observe()/set()`) y el código que las usa no cambia.
+
+Las etiquetas deben ser de cardinalidad acotada: nombres de modelo/ruta
+configurados, canales y nodos fijos; nunca session_id ni textos de usuario.
+
+Con `settings.metrics_enabled = False` todas las métricas son no-ops. En el
+camino caliente se usan `bound()` (hijos con etiquetas cacheados, sin pasar
+por el lock de `labels()`) y `timed` (un `perf_counter` a la entrada/salida).
+"""
+
+from __future__ import annotations
+
+from time import perf_counter
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from infrastructure.settings import settings
+
+
+class _NoopMetric:
+    """Sustituto sin coste cuando prometheus_client no está disponible."""
+
+    def labels(self, *args: Any, **kwargs: Any) -> "_NoopMetric":
+        return self
+
+    def inc(self, amount: float = 1) -> None:
+        return None
+
+    def dec(self, amount: float = 1) -> None:
+        return None
+
+    def set(self, value: float) -> None:
+        return None
+
+    def observe(self, value: float) -> None:
+        return None
+
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram
+
+    PROMETHEUS_AVAILABLE = True
+except ImportError:  # pragma: no cover - depende del entorno
+    PROMETHEUS_AVAILABLE = False
+
+METRICS_ENABLED = PROMETHEUS_AVAILABLE and settings.metrics_enabled
+
+# Latencias de red/LLM: de decenas de ms a un minuto
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+def counter(name: str, doc: str, labels: Sequence[str] = ()) -> Any:
+    return Counter(name, doc, list(labels)) if METRICS_ENABLED else _NoopMetric()
+
+
+def gauge(name: str, doc: str, labels: Sequence[str] = ()) -> Any:
+    return Gauge(name, doc, list(labels)) if METRICS_ENABLED else _NoopMetric()
+
+
+def histogram(
+    name: str, doc: str, labels: Sequence[str] = (), buckets: Sequence[float] | None = None
+) -> Any:
+    if not METRICS_ENABLED:
+        return _NoopMetric()
+    if buckets is None:
+        return Histogram(name, doc, list(labels))
+    return Histogram(name, doc, list(labels), buckets=list(buckets))
+
+
+# =========================
+# Helpers de camino caliente
+# =========================
+_bound: Dict[Tuple[int, Tuple[str, ...]], Any] = {}
+
+
+def bound(metric: Any, *labels: str) -> Any:
+    """Hijo `metric.labels(*labels)` cacheado (etiquetas acotadas => caché acotada)."""
+    key = (id(metric), labels)
+    child = _bound.get(key)
+    if child is None:
+        child = metric.labels(*labels) if labels else metric
+        _bound[key] = child
+    return child
+
+
+class timed:
+    """Mide la duración del bloque en `hist`; si hay excepción incrementa `errors`."""
+
+    __slots__ = ("_hist", "_errors", "_t0")
+
+    def __init__(self, hist: Any, *labels: str, errors: Optional[Any] = None):
+        self._hist = bound(hist, *labels)
+        self._errors = bound(errors, *labels) if errors is not None else None
+        self._t0 = 0.0
+
+    def __enter__(self) -> "timed":
+        self._t0 = perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self._hist.observe(perf_counter() - self._t0)
+        if exc_type is not None and self._errors is not None:
+            self._errors.inc()
+
+
+def model_label(model: Any) -> str:
+    """Etiqueta de modelo: el nombre configurado (acotado), nunca un repr arbitrario."""
+    if isinstance(model, str):
+        return model
+    return str(getattr(model, "model_name", None) or type(model).__name__)
+
+
+# =========================
+# Routing de modelos
+# =========================
+MODEL_ROUTE_DECISIONS = counter(
+    "agent_model_route_decisions_total",
+    "Modelo elegido por el router y motivo de la elección.",
+    ["route", "reason"],
+)
+MODEL_ROUTE_FALLBACKS = counter(
+    "agent_model_route_fallbacks_total",
+    "Intentos fallidos que provocaron pasar al siguiente modelo de la cadena.",
+    ["route", "cause"],
+)
+MODEL_ROUTE_EWMA_LATENCY = gauge(
+    "agent_model_route_ewma_latency_seconds",
+    "Latencia EWMA observada por ruta de modelo.",
+    ["route"],
+)
+MODEL_ROUTE_EWMA_ERRORS = gauge(
+    "agent_model_route_ewma_error_rate",
+    "Tasa de error EWMA observada por ruta de modelo.",
+    ["route"],
+)
+
+# =========================
+# Hedging
+# =========================
+MODEL_HEDGES = counter(
+    "agent_model_hedges_total",
+    "Hedging de llamadas al modelo: fired, won_hedge, won_primary, budget_exhausted.",
+    ["outcome"],
+)
+
+
+# =========================
+# Pipeline de peticiones
+# =========================
+WEBHOOK_CHANNELS = frozenset({"whatsapp", "telegram", "generic"})
+
+WEBHOOK_SECONDS = histogram(
+    "agent_webhook_seconds",
+    "Duración del manejo HTTP de webhooks por canal.",
+    ["channel"],
+    buckets=LATENCY_BUCKETS,
+)
+WEBHOOK_ERRORS = counter(
+    "agent_webhook_errors_total",
+    "Webhooks que terminaron en excepción o en respuesta 5xx.",
+    ["channel"],
+)
+MEMORY_OP_SECONDS = histogram(
+    "agent_memory_op_seconds",
+    "Duración de las operaciones de memoria (load, save).",
+    ["op"],
+    buckets=LATENCY_BUCKETS,
+)
+GRAPH_NODE_SECONDS = histogram(
+    "agent_graph_node_seconds",
+    "Duración de cada nodo del grafo.",
+    ["node"],
+    buckets=LATENCY_BUCKETS,
+)
+MODEL_CALL_SECONDS = histogram(
+    "agent_model_call_seconds",
+    "Latencia de cada llamada al modelo.",
+    ["model"],
+    buckets=LATENCY_BUCKETS,
+)
+MODEL_CALL_ERRORS = counter(
+    "agent_model_call_errors_total",
+    "Llamadas al modelo que lanzaron excepción.",
+    ["model"],
+)
+TOOL_SECONDS = histogram(
+    "agent_tool_seconds",
+    "Latencia de ejecución de tools.",
+    ["tool"],
+    buckets=LATENCY_BUCKETS,
+)
+TOOL_ERRORS = counter(
+    "agent_tool_errors_total",
+    "Tools que lanzaron excepción.",
+    ["tool"],
+)
+OUTBOUND_SEND_SECONDS = histogram(
+    "agent_outbound_send_seconds",
+    "Latencia total de envío saliente por canal (incluye reintentos).",
+    ["channel"],
+    buckets=LATENCY_BUCKETS,
+)
+OUTBOUND_SEND_ERRORS = counter(
+    "agent_outbound_send_errors_total",
+    "Envíos salientes que fallaron definitivamente.",
+    ["channel"],
+)
+OUTBOUND_RETRIES = counter(
+    "agent_outbound_retries_total",
+    "Reintentos de envío saliente por canal y motivo (status HTTP, timeout, network).",
+    ["channel", "reason"],
+)
+RATE_LIMIT_WAIT_SECONDS = histogram(
+    "agent_rate_limit_wait_seconds",
+    "Espera impuesta por los rate limiters salientes (solo cuando hay que esperar).",
+    ["limiter"],
+    buckets=LATENCY_BUCKETS,
+)
+CAMPAIGN_MESSAGES = counter(
+    "agent_campaign_messages_total",
+    "Mensajes de campaña por resultado (sent, failed, unknown, skipped).",
+    ["outcome"],
+)
+WHATSAPP_STATUSES = counter(
+    "agent_whatsapp_statuses_total",
+    "Callbacks de estado de WhatsApp por estado (sent, delivered, read, failed, other).",
+    ["status"],
+)
+WHATSAPP_INVALID = counter(
+    "agent_whatsapp_invalid_elements_total",
+    "Elementos del webhook de WhatsApp descartados por no validar (entry, change, message, status...).",
+    ["kind"],
+)
+WHATSAPP_MEDIA = counter(
+    "agent_whatsapp_media_total",
+    "Operaciones de media de WhatsApp (download, upload, cache, prune) por resultado.",
+    ["op", "outcome"],
+)
+PRESENCE_PINGS = counter(
+    "agent_presence_pings_total",
+    "Pings de presencia (leído/escribiendo) por canal y resultado (ok, error, throttled, coalesced, cancelled).",
+    ["channel", "outcome"],
+)
+TELEGRAM_UPDATES = counter(
+    "agent_telegram_updates_total",
+    "Updates de Telegram por long polling según resultado (ok, error, duplicate).",
+    ["outcome"],
+)
+TELEGRAM_POLLS = counter(
+    "agent_telegram_polls_total",
+    "Llamadas a getUpdates según resultado (ok, empty, error).",
+    ["outcome"],
+)
+QUEUE_DEPTH = gauge(
+    "agent_queue_depth",
+    "Trabajos pendientes por cola interna.",
+    ["queue"],
+)
+INBOUND_JOBS = counter(
+    "agent_inbound_jobs_total",
+    "Mensajes entrantes por canal y resultado (enqueued, rejected, ok, retry, error, dead).",
+    ["channel", "outcome"],
+)
+DEDUP_HITS = counter(
+    "agent_dedup_hits_total",
+    "Mensajes repetidos (mismo wamid/update_id) por canal y acción (skipped, resent).",
+    ["channel", "action"],
+)
+INBOUND_WAIT_SECONDS = histogram(
+    "agent_inbound_wait_seconds",
+    "Tiempo en cola desde el webhook hasta que un worker toma el mensaje.",
+    ["channel"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# =========================
+# Consumo de tokens / coste
+# =========================
+AGENT_TOKENS = counter(
+    "agent_tokens_total",
+    "Tokens consumidos por canal, modelo y tipo (input, output, cache_read).",
+    ["channel", "model", "kind"],
+)
+AGENT_COST_USD = counter(
+    "agent_cost_usd_total",
+    "Coste estimado (USD, genai-prices) por canal y modelo.",
+    ["channel", "model"],
+)
+AGENT_TURN_SECONDS = histogram(
+    "agent_turn_model_seconds",
+    "Tiempo de modelo por turno (incluye fallbacks y hedging) por canal y modelo.",
+    ["channel", "model"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# =========================
+# Pools HTTP salientes
+# =========================
+HTTP_POOL_REQUESTS = counter(
+    "agent_http_pool_requests_total",
+    "Peticiones por pool HTTP y versión de protocolo negociada.",
+    ["pool", "http_version"],
+)
+HTTP_POOL_IN_FLIGHT = gauge(
+    "agent_http_pool_in_flight",
+    "Peticiones en curso por pool HTTP.",
+    ["pool"],
+)
+HTTP_POOL_CONNECTIONS = gauge(
+    "agent_http_pool_connections",
+    "Conexiones abiertas por pool HTTP y estado (active, idle).",
+    ["pool", "state"],
+)
+
+# =========================
+# Exportación de spans (OTLP)
+# =========================
+OTEL_SPANS_EXPORTED = counter(
+    "agent_otel_spans_exported_total",
+    "Spans entregados al exporter OTLP por resultado (success, failure).",
+    ["outcome"],
+)
+OTEL_SPANS_DROPPED = counter(
+    "agent_otel_spans_dropped_total",
+    "Spans descartados sin exportar (queue_full).",
+    ["reason"],
+)
+
+
+class WebhookMetricsMiddleware:
+    """Middleware ASGI puro: mide /webhooks/<canal>/... sin tocar los handlers."""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        path = scope.get("path", "") if scope["type"] == "http" else ""
+        if not path.startswith("/webhooks/"):
+            await self.app(scope, receive, send)
+            return
+
+        channel = path.split("/", 3)[2]
+        if channel not in WEBHOOK_CHANNELS:
+            channel = "other"
+        status = {"code": 500}
+
+        async def _send(message: Any) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        with timed(WEBHOOK_SECONDS, channel, errors=WEBHOOK_ERRORS):
+            await self.app(scope, receive, _send)
+        if status["code"] >= 500:
+            bound(WEBHOOK_ERRORS, channel).inc()
@@ -0,0 +1,162 @@
+# observability/scrubbing.py
+"""Scrubbing de atributos de spans por nombre de atributo.
+
+El scrubbing de logfire aplica una regex sobre claves *y valores* de todos los
+atributos (prompts e historiales completos incluidos) en el `on_end` de cada
+span, dentro de la petición. Aquí la decisión es solo por clave:
+
+- `denylist`: se redactan los atributos cuya clave casa con algún patrón.
+- `allowlist`: solo se conservan los atributos cuya clave casa.
+
+Los patrones son globs (`gen_ai.*`, `*password*`) compilados en una única
+regex, y la decisión se cachea por clave (el conjunto de claves es pequeño y
+estable). Los valores no se inspeccionan: un secreto pegado dentro de un
+prompt no se detecta; para eso está el modo "logfire".
+
+`ScrubbingSpanExporter` aplica el scrubber en el hilo del exportador (lotes
+en segundo plano), no en el camino de la petición.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import re
+from typing import Any, Dict, Mapping, Optional, Sequence
+
+from opentelemetry.sdk.trace import Event, ReadableSpan
+from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+from infrastructure.settings import settings
+
+REDACTED = "[Scrubbed]"
+
+# Equivalente por clave de los patrones por defecto de logfire, sin "session"
+# (langfuse.session.id debe llegar intacto a Langfuse).
+DEFAULT_DENYLIST = (
+    "*password*",
+    "*passwd*",
+    "*secret*",
+    "*authorization*",
+    "*auth_token*",
+    "*credential*",
+    "*private?key*",
+    "*api?key*",
+    "*cookie*",
+    "*social?security*",
+    "*credit?card*",
+    "*csrf*",
+    "*xsrf*",
+    "*jwt*",
+    "*ssn*",
+    "http.request.header.*",
+)
+
+# Lo que usa Langfuse para pintar trazas/generaciones y lo que emite traced_tool
+DEFAULT_ALLOWLIST = (
+    "langfuse.*",
+    "gen_ai.*",
+    "logfire.*",
+    "code.*",
+    "tool.*",
+    "exception.*",
+    "service.*",
+    "agent_name",
+    "model_name",
+    "final_result",
+    "all_messages_events",
+    "model_request_parameters",
+    "http.method",
+    "http.route",
+    "http.status_code",
+)
+
+
+class AttributeScrubber:
+    def __init__(
+        self,
+        patterns: Sequence[str],
+        *,
+        mode: str = "denylist",
+        replacement: str = REDACTED,
+        max_cache: int = 4096,
+    ):
+        if mode not in ("denylist", "allowlist"):
+            raise ValueError(f"modo de scrubbing desconocido: {mode!r}")
+        self.mode = mode
+        self.replacement = replacement
+        self.max_cache = max_cache
+        self._regex = (
+            re.compile("|".join(fnmatch.translate(p.lower()) for p in patterns)) if patterns else None
+        )
+        self._decisions: Dict[str, bool] = {}
+
+    @classmethod
+    def from_settings(cls) -> "AttributeScrubber":
+        mode = settings.otel_scrubbing_mode
+        raw = settings.otel_scrub_patterns
+        if raw is not None:
+            patterns: Sequence[str] = [p.strip() for p in raw.split(",") if p.strip()]
+        else:
+            patterns = DEFAULT_ALLOWLIST if mode == "allowlist" else DEFAULT_DENYLIST
+        return cls(patterns, mode=mode)
+
+    def keep(self, key: str) -> bool:
+        """True si el atributo `key` se exporta tal cual (decisión cacheada)."""
+        decision = self._decisions.get(key)
+        if decision is None:
+            matched = self._regex is not None and self._regex.match(key.lower()) is not None
+            decision = matched if self.mode == "allowlist" else not matched
+            if len(self._decisions) < self.max_cache:
+                self._decisions[key] = decision
+        return decision
+
+    def scrub(self, attributes: Optional[Mapping[str, Any]]) -> Optional[Mapping[str, Any]]:
+        """Atributos con los valores no permitidos redactados (el mismo objeto si no hay cambios)."""
+        if not attributes:
+            return attributes
+        keep = self.keep
+        if all(keep(k) for k in attributes):
+            return attributes
+        return {k: (v if keep(k) else self.replacement) for k, v in attributes.items()}
+
+    def scrub_span(self, span: ReadableSpan) -> ReadableSpan:
+        attributes = self.scrub(span.attributes)
+        events = span.events
+        new_events = [
+            Event(name=e.name, attributes=self.scrub(e.attributes), timestamp=e.timestamp) for e in events
+        ]
+        if attributes is span.attributes and all(
+            new.attributes is old.attributes for new, old in zip(new_events, events)
+        ):
+            return span
+        return ReadableSpan(
+            name=span.name,
+            context=span.context,
+            parent=span.parent,
+            resource=span.resource,
+            attributes=attributes,
+            events=new_events,
+            links=span.links,
+            kind=span.kind,
+            status=span.status,
+            start_time=span.start_time,
+            end_time=span.end_time,
+            instrumentation_scope=span.instrumentation_scope,
+        )
+
+
+class ScrubbingSpanExporter(SpanExporter):
+    """Aplica `scrubber` a cada lote antes de delegar en `inner`."""
+
+    def __init__(self, inner: SpanExporter, scrubber: AttributeScrubber):
+        self.inner = inner
+        self.scrubber = scrubber
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        return self.inner.export([self.scrubber.scrub_span(s) for s in spans])
+
+    def shutdown(self) -> None:
+        self.inner.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.inner.force_flush(timeout_millis)
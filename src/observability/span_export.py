@@ -0,0 +1,148 @@
+# observability/span_export.py
+"""Exportación de spans sin bloquear las peticiones.
+
+`BoundedSpanProcessor` envuelve un `BatchSpanProcessor` (hilo propio, lotes)
+con control de admisión: como mucho `max_queue_size` spans pendientes. Si el
+colector (Langfuse) va lento o está caído, los spans que no caben se
+descartan y se cuentan, en vez de acumular memoria o frenar `on_end`.
+
+El `BatchSpanProcessor` del SDK descarta en silencio al llenarse y no aplica
+`export_timeout`; aquí el descarte se contabiliza y el timeout se pasa al
+exporter OTLP (que es quien puede quedarse colgado).
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+
+from infrastructure.settings import settings
+from observability.metrics import OTEL_SPANS_DROPPED, OTEL_SPANS_EXPORTED, QUEUE_DEPTH, bound
+from observability.scrubbing import AttributeScrubber, ScrubbingSpanExporter
+
+
+class CountingSpanExporter(SpanExporter):
+    """Exporter que avisa de cada lote terminado (n spans, ok) y delega en `inner`."""
+
+    def __init__(self, inner: SpanExporter, on_done: Callable[[int, bool], None]):
+        self.inner = inner
+        self.on_done = on_done
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        ok = False
+        try:
+            result = self.inner.export(spans)
+            ok = result is SpanExportResult.SUCCESS
+            return result
+        finally:
+            # también si el exporter lanza (timeout de red, colector caído...)
+            self.on_done(len(spans), ok)
+
+    def shutdown(self) -> None:
+        self.inner.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.inner.force_flush(timeout_millis)
+
+
+class BoundedSpanProcessor(SpanProcessor):
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        *,
+        max_queue_size: int = 2048,
+        max_export_batch_size: int = 512,
+        schedule_delay_ms: float = 5000,
+        export_timeout_ms: float = 10000,
+    ):
+        self.max_queue_size = max_queue_size
+        self.pending = 0
+        self.exported = 0
+        self.failed = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._inner = BatchSpanProcessor(
+            CountingSpanExporter(exporter, self._on_exported),
+            max_queue_size=max_queue_size,
+            max_export_batch_size=min(max_export_batch_size, max_queue_size),
+            schedule_delay_millis=schedule_delay_ms,
+            export_timeout_millis=export_timeout_ms,
+        )
+        self._depth = bound(QUEUE_DEPTH, "otel_spans")
+
+    def on_start(self, span: Any, parent_context: Any = None) -> None:
+        return None
+
+    def on_end(self, span: ReadableSpan) -> None:
+        if span.context is None or not span.context.trace_flags.sampled:
+            return  # el BatchSpanProcessor tampoco los encola
+        with self._lock:
+            full = self.pending >= self.max_queue_size
+            if full:
+                self.dropped += 1
+            else:
+                self.pending += 1
+            depth = self.pending
+        if full:
+            bound(OTEL_SPANS_DROPPED, "queue_full").inc()
+            return
+        self._depth.set(depth)
+        self._inner.on_end(span)
+
+    def _on_exported(self, n: int, ok: bool) -> None:
+        with self._lock:
+            self.pending = max(0, self.pending - n)
+            if ok:
+                self.exported += n
+            else:
+                self.failed += n
+            depth = self.pending
+        bound(OTEL_SPANS_EXPORTED, "success" if ok else "failure").inc(n)
+        self._depth.set(depth)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "pending": self.pending,
+                "exported": self.exported,
+                "failed": self.failed,
+                "dropped": self.dropped,
+            }
+
+    def shutdown(self) -> None:
+        self._inner.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self._inner.force_flush(timeout_millis)
+
+
+def build_span_processor(
+    endpoint: str,
+    headers: Optional[Dict[str, str]] = None,
+    exporter: Optional[SpanExporter] = None,
+    scrubber: Optional[AttributeScrubber] = None,
+) -> BoundedSpanProcessor:
+    """Processor OTLP/HTTP hacia `endpoint` (…/v1/traces) con la config `otel_bsp_*`.
+
+    Con `scrubber`, los atributos se filtran por lote en el hilo del exportador.
+    """
+    if exporter is None:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        exporter = OTLPSpanExporter(
+            endpoint=endpoint,
+            headers=headers,
+            timeout=settings.otel_bsp_export_timeout_ms / 1000,
+        )
+    if scrubber is not None:
+        exporter = ScrubbingSpanExporter(exporter, scrubber)
+    return BoundedSpanProcessor(
+        exporter,
+        max_queue_size=settings.otel_bsp_max_queue_size,
+        max_export_batch_size=settings.otel_bsp_max_export_batch_size,
+        schedule_delay_ms=settings.otel_bsp_schedule_delay_ms,
+        export_timeout_ms=settings.otel_bsp_export_timeout_ms,
+    )
@@ -16,4 +16,11 @@ def deps():
 @pytest.fixture
 def redis_client():
     # para tests de redis_*
-    return fakeredis.FakeRedis(decode_responses=True)
\ No newline at end of file
+    return fakeredis.FakeRedis(decode_responses=True)
+
+@pytest.fixture(autouse=True)
+def _no_presence_pings(monkeypatch):
+    # los pings de presencia irían a las APIs reales: cada test los activa si los prueba
+    from infrastructure.settings import settings
+
+    monkeypatch.setattr(settings, "presence_enabled", False)
@@ -0,0 +1,151 @@
+# tests/standins.py
+"""Stand-ins locales de APIs HTTP(S) para tests (sin red externa).
+
+`StandInServer` es un servidor HTTP/1.1 keep-alive mínimo sobre asyncio que
+cuenta conexiones aceptadas y guarda las peticiones recibidas. Con `tls=True`
+sirve HTTPS con un certificado autofirmado (requiere `cryptography`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import json
+import os
+import ssl
+import tempfile
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+@dataclass
+class Recorded:
+    method: str
+    path: str
+    headers: Dict[str, str]
+    body: bytes
+
+    def json(self):
+        return json.loads(self.body or b"null")
+
+
+Reply = Tuple[int, Dict[str, str], bytes]
+Handler = Callable[[Recorded], Awaitable[Reply]]
+
+
+async def ok_handler(req: Recorded) -> Reply:
+    return 200, {"Content-Type": "application/json"}, b'{"ok":true}'
+
+
+def tls_contexts() -> Tuple[ssl.SSLContext, ssl.SSLContext]:
+    """(server_ctx, client_ctx) con un certificado autofirmado para 127.0.0.1."""
+    import ipaddress
+
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=1))
+        .not_valid_after(now + datetime.timedelta(hours=1))
+        .add_extension(
+            x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]),
+            critical=False,
+        )
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_pem = cert.public_bytes(serialization.Encoding.PEM)
+    key_pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    with tempfile.TemporaryDirectory() as d:
+        cert_path, key_path = os.path.join(d, "cert.pem"), os.path.join(d, "key.pem")
+        with open(cert_path, "wb") as f:
+            f.write(cert_pem)
+        with open(key_path, "wb") as f:
+            f.write(key_pem)
+        server_ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        server_ctx.load_cert_chain(cert_path, key_path)
+    client_ctx = ssl.create_default_context(cadata=cert_pem.decode())
+    return server_ctx, client_ctx
+
+
+@dataclass
+class StandInServer:
+    handler: Handler = ok_handler
+    tls: bool = False
+    connections: int = 0
+    requests: List[Recorded] = field(default_factory=list)
+    client_ssl: Optional[ssl.SSLContext] = None
+    _server: Optional[asyncio.AbstractServer] = None
+    _port: int = 0
+
+    @property
+    def url(self) -> str:
+        return f"{'https' if self.tls else 'http'}://127.0.0.1:{self._port}"
+
+    @property
+    def verify(self):
+        return self.client_ssl if self.tls else True
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        k, v = line.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                body = b""
+                if "content-length" in headers:
+                    body = await reader.readexactly(int(headers["content-length"]))
+                req = Recorded(method, path, headers, body)
+                self.requests.append(req)
+                status, resp_headers, resp_body = await self.handler(req)
+                out_headers = {"Content-Length": str(len(resp_body)), "Connection": "keep-alive"}
+                out_headers.update(resp_headers)
+                if method == "HEAD":
+                    resp_body = b""
+                    out_headers["Content-Length"] = "0"
+                raw = f"HTTP/1.1 {status} X\r\n" + "".join(
+                    f"{k}: {v}\r\n" for k, v in out_headers.items()
+                )
+                writer.write(raw.encode("latin-1") + b"\r\n" + resp_body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ssl.SSLError):
+            pass
+        finally:
+            writer.close()
+
+    async def __aenter__(self) -> "StandInServer":
+        server_ssl = None
+        if self.tls:
+            server_ssl, self.client_ssl = tls_contexts()
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0, ssl=server_ssl)
+        self._port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        assert self._server is not None
+        self._server.close()
+        # Python 3.12+ espera a los handlers; en 3.10/3.11 basta con cerrar
+        try:
+            await asyncio.wait_for(self._server.wait_closed(), timeout=1)
+        except asyncio.TimeoutError:
+            pass
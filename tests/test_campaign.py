@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from adapters.whatsapp_business.campaign import Campaign, Checkpoint, iter_recipients
+from infrastructure.http import HttpClientPool
+from infrastructure.ratelimit import SendLimiter, TokenBucket
+from infrastructure.settings import settings
+from standins import StandInServer
+
+
+async def graph_api(req):
+    to = req.json()["to"]
+    if to.endswith("13"):
+        return 400, {"Content-Type": "application/json"}, b'{"error":{"code":131026}}'
+    return 200, {"Content-Type": "application/json"}, json.dumps({"messages": [{"id": f"wamid.{to}"}]}).encode()
+
+
+def _csv(tmp_path, n: int) -> str:
+    path = tmp_path / "recipients.csv"
+    path.write_text("to,name\n" + "".join(f"+3460000{i:04d},Cliente {i}\n" for i in range(n)))
+    return str(path)
+
+
+def test_iter_recipients_streams_csv_and_jsonl(tmp_path):
+    (r,) = list(iter_recipients(_csv(tmp_path, 1)))
+    assert (r.to, r.params) == ("+34600000000", ["Cliente 0"])
+    jsonl = tmp_path / "r.jsonl"
+    jsonl.write_text('{"to": "346", "params": ["a", 1]}\n\n')
+    assert [(r.to, r.params) for r in iter_recipients(str(jsonl))] == [("346", ["a", "1"])]
+
+
+@pytest.mark.asyncio
+async def test_campaign_sends_once_reports_and_resumes_without_resending(tmp_path, monkeypatch):
+    recipients = _csv(tmp_path, 40)
+    checkpoint = str(tmp_path / "progress.jsonl")
+    limiter = SendLimiter(TokenBucket(10_000, burst=10_000))
+    async with StandInServer(graph_api) as srv:
+        monkeypatch.setattr(settings, "whatsapp_graph_base_url", srv.url)
+        pool = HttpClientPool()
+        client = pool.get("whatsapp")
+
+        report = await Campaign(
+            "pedido", "es", checkpoint=checkpoint, concurrency=8, client=client, limiter=limiter
+        ).run(iter_recipients(recipients))
+        assert (report.total, report.sent, report.failed, report.skipped) == (40, 39, 1, 0)
+        assert report.errors == {"HTTP 400": 1}
+        assert report.throughput > 0
+        sent_to = [r.json()["to"] for r in srv.requests]
+        assert len(sent_to) == len(set(sent_to)) == 40
+        first = srv.requests[0].json()
+        assert first["template"]["components"][0]["parameters"][0]["text"].startswith("Cliente")
+
+        # Reanudar: nada se reenvía (los fallidos solo con retry_failed)
+        again = await Campaign("pedido", "es", checkpoint=checkpoint, client=client, limiter=limiter).run(
+            iter_recipients(recipients)
+        )
+        assert (again.sent, again.skipped) == (0, 40)
+        assert len(srv.requests) == 40
+
+        retry = await Campaign(
+            "pedido", "es", checkpoint=checkpoint, client=client, limiter=limiter, retry_failed=True
+        ).run(iter_recipients(recipients))
+        assert (retry.failed, retry.skipped) == (1, 39)
+        await pool.aclose()
+
+
+def test_interrupted_send_is_not_resent_by_default(tmp_path):
+    path = tmp_path / "cp.jsonl"
+    path.write_text('{"to": "1", "status": "pending"}\n{"to": "2", "status": "sent"}\n{"to": "3", "sta')
+    cp = Checkpoint(str(path))
+    assert (cp.previous("1"), cp.previous("2"), cp.previous("3")) == ("unknown", "sent", None)
+    campaign = Campaign("t", checkpoint=str(path))
+    assert not campaign._should_send("1") and campaign._should_send("3")
+    campaign.retry_unknown = True
+    assert campaign._should_send("1")
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from adapters.whatsapp_business import handler as wa_handler
+from core.runtime import get_graph_and_deps
+from infrastructure import dedup as dedup_mod
+from infrastructure.chunking import ChunkSendError, send_ordered, split_text, utf16_len
+from infrastructure.dedup import Deduplicator, InMemoryTTLCache
+from infrastructure.inbound import InboundJob
+
+
+def test_split_prefers_paragraphs_then_sentences_then_words():
+    para = "Primer párrafo. Segunda frase. Tercera frase."
+    text = f"{para}\n\n{para}\n\n{para}"
+    assert split_text(text, 110) == [f"{para}\n\n{para}", para]
+
+    sentences = "Una frase corta. Otra frase algo más larga que la anterior. Y la última."
+    assert split_text(sentences, 60) == [
+        "Una frase corta. Otra frase algo más larga que la anterior.",
+        "Y la última.",
+    ]
+    assert split_text("palabra " * 20, 30) == ["palabra palabra palabra"] * 6 + ["palabra palabra"]
+    assert split_text("x" * 25, 10) == ["x" * 10, "x" * 10, "x" * 5]
+    assert split_text("   ", 10) == [] and split_text("hola", 10) == ["hola"]
+
+
+def test_split_respects_limit_and_keeps_content():
+    text = "\n".join(f"Línea {i}: " + "texto " * (i % 17) + "fin." for i in range(400))
+    chunks = split_text(text, 500)
+    assert all(len(c) <= 500 for c in chunks)
+    assert " ".join(" ".join(chunks).split()) == " ".join(text.split())
+
+
+def test_split_measures_utf16_for_telegram():
+    text = "😀" * 10  # 2 unidades UTF-16 cada uno
+    chunks = split_text(text, 8, measure=utf16_len)
+    assert [utf16_len(c) for c in chunks] == [8, 8, 4]
+
+
+@pytest.mark.asyncio
+async def test_send_ordered_keeps_order_and_resumes_after_failure():
+    sent: list = []
+    progress: list = []
+    fail_on = {"c"}
+
+    async def send(payload):
+        await asyncio.sleep(0.01 if payload == "A" else 0)
+        if payload.lower() in fail_on:
+            raise RuntimeError("boom")
+        sent.append(payload)
+
+    chunks = ["a", "b", "c", "d"]
+    with pytest.raises(ChunkSendError) as err:
+        await send_ordered(chunks, send, prepare=str.upper, on_sent=progress.append)
+    assert (err.value.sent, sent, progress) == (2, ["A", "B"], [1, 2])
+
+    fail_on.clear()
+    assert await send_ordered(chunks, send, prepare=str.upper, start=err.value.sent, on_sent=progress.append) == 4
+    assert sent == ["A", "B", "C", "D"] and progress[-1] == 4
+
+
+@pytest.mark.asyncio
+async def test_whatsapp_retry_resends_only_missing_chunks(monkeypatch):
+    dedup = Deduplicator(InMemoryTTLCache(60))
+    monkeypatch.setattr(dedup_mod, "_dedup", dedup)
+    monkeypatch.setattr(dedup_mod.settings, "dedup_enabled", True)
+    reply = "\n\n".join(f"Párrafo {i}. " + "x" * 3000 for i in range(3))
+
+    async def fake_run_turn(mm, session_id, user_text, channel):
+        return reply, []
+
+    sent: list = []
+
+    class FlakySender:
+        fail = True
+
+        async def send_catalog_message(self, payload):
+            body = payload.component.body
+            if body.startswith("Párrafo 2") and self.fail:
+                self.fail = False
+                raise RuntimeError("timeout")
+            sent.append(body[:9])
+
+    _graph, deps = get_graph_and_deps()
+    monkeypatch.setattr(deps, "catalog_sender", FlakySender())
+    monkeypatch.setattr(wa_handler, "run_turn", fake_run_turn)
+
+    key = "whatsapp:w1"
+    assert dedup.claim(key) == (True, None)
+    with pytest.raises(ChunkSendError):  # el fallo se propaga para que Meta reintente
+        await wa_handler.process_message(InboundJob("whatsapp", "A", "hola", {"wa_id": "A", "dedup_key": key}))
+    assert sent == ["Párrafo 0", "Párrafo 1"]
+
+    # reintento de Meta: respuesta cacheada, solo el trozo que faltaba
+    fresh, cached = dedup.claim(key)
+    assert fresh and cached == reply
+    job = InboundJob("whatsapp", "A", "hola", {"wa_id": "A", "dedup_key": key, "cached_reply": cached})
+    await wa_handler.process_message(job)
+    assert sent == ["Párrafo 0", "Párrafo 1", "Párrafo 2"]
+    assert dedup.claim(key) == (False, None)
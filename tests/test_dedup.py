@@ -0,0 +1,201 @@
+import hashlib
+import hmac
+import json
+
+import fakeredis
+import pytest
+from fastapi.testclient import TestClient
+
+from adapters.whatsapp_business import handler as wa_handler
+from core.runtime import get_graph_and_deps
+from infrastructure import dedup as dedup_mod
+from infrastructure.dedup import Deduplicator, InMemoryTTLCache, RedisTTLCache
+from infrastructure.settings import settings
+
+
+@pytest.fixture(params=["memory", "redis"])
+def dedup(request):
+    if request.param == "memory":
+        return Deduplicator(InMemoryTTLCache(ttl_s=60, max_entries=100))
+    return Deduplicator(RedisTTLCache(fakeredis.FakeRedis(decode_responses=True), ttl_s=60))
+
+
+def test_claim_lifecycle(dedup):
+    assert dedup.claim("k") == (True, None)
+    assert dedup.claim("k") == (False, None)  # en curso
+    dedup.remember_reply("k", "hola")
+    assert dedup.claim("k") == (False, None)  # enviando la respuesta
+    dedup.unlease("k")
+    assert dedup.claim("k") == (True, "hola")  # envío fallido: reenviar sin LLM
+    assert dedup.claim("k") == (False, None)  # ya hay un reenvío en curso
+    dedup.mark_sent("k")
+    assert dedup.claim("k") == (False, None)
+    dedup.release("k")
+    assert dedup.claim("k") == (True, None)
+    assert dedup.claim(None) == (True, None)
+
+
+def test_in_memory_cache_is_bounded_and_expires(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(dedup_mod.time, "monotonic", lambda: now[0])
+    cache = InMemoryTTLCache(ttl_s=10, max_entries=3)
+    for k in "abcd":
+        assert cache.add(k, "")
+    assert len(cache) == 3 and cache.get("a") is None  # expulsada la más antigua
+    now[0] = 11
+    assert cache.get("d") is None
+    assert cache.add("d", "")  # expirada: vuelve a entrar
+
+
+def test_whatsapp_retry_of_same_wamid_runs_the_turn_once(monkeypatch):
+    from infrastructure.server import app
+
+    calls: list = []
+
+    async def fake_run_turn(mm, session_id, user_text, channel):
+        calls.append(user_text)
+        return "respuesta", []
+
+    sent: list = []
+    fail = {"send": True}
+
+    class FlakySender:
+        async def send_catalog_message(self, payload):
+            if fail["send"]:
+                fail["send"] = False
+                raise RuntimeError("graph api caída")
+            sent.append(payload.component.body)
+
+    _graph, deps = get_graph_and_deps()
+    monkeypatch.setattr(deps, "catalog_sender", FlakySender())
+    monkeypatch.setattr(wa_handler, "run_turn", fake_run_turn)
+    monkeypatch.setattr(dedup_mod, "_dedup", Deduplicator(InMemoryTTLCache()))
+    monkeypatch.setattr(settings, "meta_app_secret", "test-secret")
+
+    msg = {"from": "346", "id": "wamid.dup", "type": "text", "text": {"body": "hola"}}
+    raw = json.dumps({"entry": [{"changes": [{"value": {"messages": [msg]}}]}]}).encode()
+    sig = hmac.new(settings.meta_app_secret.encode(), raw, hashlib.sha256).hexdigest()
+    headers = {"Content-Type": "application/json", "X-Hub-Signature-256": f"sha256={sig}"}
+    client = TestClient(app)
+    statuses = [client.post("/webhooks/whatsapp/webhook", content=raw, headers=headers).status_code for _ in range(3)]
+
+    assert statuses == [500, 200, 200]  # el envío fallido pide a Meta que reintente
+    assert calls == ["hola"]  # un solo turno
+    assert sent == ["respuesta"]  # el 2º intento reenvía la respuesta cacheada; el 3º se ignora
+
+
+def test_crashed_claim_only_blocks_retries_for_the_inflight_lease(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(dedup_mod.time, "monotonic", lambda: now[0])
+    dedup = Deduplicator(InMemoryTTLCache(ttl_s=86400), ttl_s=86400, inflight_ttl_s=300)
+
+    assert dedup.claim("crash") == (True, None)  # el proceso muere sin responder
+    assert dedup.claim("crash") == (False, None)  # reintento inmediato: sigue "en curso"
+    now[0] = 301
+    assert dedup.claim("crash") == (True, None)  # lease caducado: se vuelve a procesar
+
+    dedup.remember_reply("crash", "hola")  # respuesta y enviado: TTL completo
+    dedup.mark_sent("crash")
+    now[0] = 301 + 3600
+    assert dedup.claim("crash") == (False, None)
+
+
+def test_redis_inflight_marker_gets_the_full_ttl_once_answered():
+    client = fakeredis.FakeRedis(decode_responses=True)
+    dedup = Deduplicator(RedisTTLCache(client, ttl_s=86400), ttl_s=86400, inflight_ttl_s=300)
+    dedup.claim("k")
+    assert 0 < client.ttl("dedup:k") <= 300
+    dedup.remember_reply("k", "hola")
+    assert client.ttl("dedup:k") > 300
+
+
+@pytest.mark.asyncio
+async def test_failed_send_stops_its_session_and_frees_the_rest_for_the_retry(monkeypatch):
+    from infrastructure.inbound import InboundJob
+
+    dedup = Deduplicator(InMemoryTTLCache())
+    monkeypatch.setattr(dedup_mod, "_dedup", dedup)
+    sent: list = []
+
+    async def fake_run_turn(mm, session_id, user_text, channel):
+        return f"re:{user_text}", []
+
+    class Sender:
+        async def send_catalog_message(self, payload):
+            if payload.component.body == "re:a1":
+                raise RuntimeError("graph api caída")
+            sent.append(payload.component.body)
+
+    _graph, deps = get_graph_and_deps()
+    monkeypatch.setattr(deps, "catalog_sender", Sender())
+    monkeypatch.setattr(wa_handler, "run_turn", fake_run_turn)
+    jobs = []
+    for session, text in [("A", "a1"), ("A", "a2"), ("B", "b1")]:
+        key = f"whatsapp:{text}"
+        dedup.claim(key)
+        jobs.append(InboundJob("whatsapp", session, text, {"wa_id": session, "dedup_key": key}))
+
+    with pytest.raises(Exception):
+        await wa_handler.process_batch(jobs)
+    assert sent == ["re:b1"]  # a2 no adelanta a a1
+    assert dedup.claim("whatsapp:a1") == (True, "re:a1")  # el reintento reenvía la respuesta
+    assert dedup.claim("whatsapp:a2") == (True, None)  # y procesa a2 desde cero
+    assert dedup.claim("whatsapp:b1") == (False, None)
+
+
+def test_concurrent_retries_resend_a_cached_reply_only_once(dedup):
+    dedup.claim("k")
+    dedup.remember_reply("k", "hola")
+    dedup.unlease("k")  # el envío original falló
+    claims = [dedup.claim("k") for _ in range(3)]
+    assert claims == [(True, "hola"), (False, None), (False, None)]
+    dedup.unlease("k")  # el reenvío también falló: el siguiente reintento vuelve a poder
+    assert dedup.claim("k") == (True, "hola")
+
+
+def test_reply_and_sent_survive_an_expired_inflight_lease(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(dedup_mod.time, "monotonic", lambda: now[0])
+    client = fakeredis.FakeRedis(decode_responses=True)
+    for dedup in (
+        Deduplicator(InMemoryTTLCache(ttl_s=86400), ttl_s=86400, inflight_ttl_s=300),
+        Deduplicator(RedisTTLCache(client, ttl_s=86400), ttl_s=86400, inflight_ttl_s=300),
+    ):
+        assert dedup.claim("slow") == (True, None)
+        now[0] += 301  # el turno (o la espera en la cola) dura más que el lease
+        client.delete("dedup:slow")
+        dedup.remember_reply("slow", "hola")
+        assert dedup.reply("slow") == "hola"
+        dedup.mark_sent("slow")
+        assert dedup.claim("slow") == (False, None)  # el reintento no repite el turno
+    assert 300 < client.ttl("dedup:slow") <= 86400
+
+
+@pytest.mark.asyncio
+async def test_dedup_failure_while_caching_the_reply_still_sends_it(monkeypatch):
+    from infrastructure.inbound import InboundJob
+
+    class BrokenReplies(Deduplicator):
+        def remember_reply(self, key, reply):
+            raise ConnectionError("redis caído")
+
+    dedup = BrokenReplies(InMemoryTTLCache())
+    monkeypatch.setattr(dedup_mod, "_dedup", dedup)
+    turns: list = []
+    sent: list = []
+
+    async def fake_run_turn(mm, session_id, user_text, channel):
+        turns.append(user_text)
+        return "respuesta", []
+
+    class Sender:
+        async def send_catalog_message(self, payload):
+            sent.append(payload.component.body)
+
+    _graph, deps = get_graph_and_deps()
+    monkeypatch.setattr(deps, "catalog_sender", Sender())
+    monkeypatch.setattr(wa_handler, "run_turn", fake_run_turn)
+    dedup.claim("whatsapp:r1")
+    await wa_handler.process_message(InboundJob("whatsapp", "A", "hola", {"wa_id": "A", "dedup_key": "whatsapp:r1"}))
+    assert turns == ["hola"] and sent == ["respuesta"]
+    assert dedup.claim("whatsapp:r1") == (False, None)
@@ -0,0 +1,64 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from adapters.generic_webhook import handler as generic
+from infrastructure.server import app
+from infrastructure.settings import settings
+
+HEADERS = {"x-api-key": "k"}
+
+
+def _fake_turns(monkeypatch, log: list, delay: float = 0.0):
+    state = {"running": 0, "peak": 0}
+
+    async def fake_run_turn(mm, session_id, user_text, channel):
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        await asyncio.sleep(delay)
+        state["running"] -= 1
+        if user_text == "boom":
+            raise RuntimeError("modelo caído")
+        log.append((session_id, user_text))
+        return f"{channel}:{session_id}:{user_text}", []
+
+    monkeypatch.setattr(generic, "run_turn", fake_run_turn)
+    monkeypatch.setattr(settings, "generic_webhook_api_key", "k")
+    return state
+
+
+def test_single_message_runs_the_graph_turn(monkeypatch):
+    log: list = []
+    _fake_turns(monkeypatch, log)
+    c = TestClient(app)
+    r = c.post("/webhooks/generic/generic-webhook", headers=HEADERS, json={"session_id": "s1", "message": "hola"})
+    assert r.status_code == 200 and r.json() == {"response": "generic:s1:hola"}
+    bad = c.post("/webhooks/generic/generic-webhook", headers={"x-api-key": "otra"}, json={"session_id": "s1", "message": "x"})
+    assert bad.status_code == 401 and log == [("s1", "hola")]
+
+
+def test_batch_keeps_input_order_and_session_order_with_a_concurrency_cap(monkeypatch):
+    log: list = []
+    state = _fake_turns(monkeypatch, log, delay=0.01)
+    monkeypatch.setattr(settings, "generic_webhook_batch_concurrency", 3)
+    items = [{"session_id": f"s{i % 6}", "message": f"m{i}"} for i in range(18)]
+    items[4]["message"] = "boom"
+
+    r = TestClient(app).post("/webhooks/generic/generic-webhook/batch", headers=HEADERS, json=items)
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [x["session_id"] for x in results] == [it["session_id"] for it in items]
+    assert results[4] == {"session_id": "s4", "response": None, "error": "RuntimeError"}
+    assert results[5]["response"] == "generic:s5:m5"
+    assert state["peak"] == 3
+    for s in range(6):  # dentro de una sesión, en el orden de entrada
+        sent = [m for sid, m in log if sid == f"s{s}"]
+        assert sent == [it["message"] for it in items if it["session_id"] == f"s{s}" and it["message"] != "boom"]
+
+
+def test_batch_rejects_oversized_payloads(monkeypatch):
+    _fake_turns(monkeypatch, [])
+    monkeypatch.setattr(settings, "generic_webhook_batch_max_items", 2)
+    items = [{"session_id": "s", "message": "m"}] * 3
+    r = TestClient(app).post("/webhooks/generic/generic-webhook/batch", headers=HEADERS, json=items)
+    assert r.status_code == 413
@@ -0,0 +1,153 @@
+import asyncio
+import time
+
+import pytest
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from core.agents import create_agent
+from core.deps import Deps
+from core.graph import GraphState, node_agent
+from core.hedging import HedgeBudget, Hedger, LatencyWindow
+
+
+def scripted_model(delays: list[float], cancelled: list[int]) -> FunctionModel:
+    """FunctionModel cuya n-ésima llamada tarda delays[n] y responde "call-n"."""
+    calls = {"n": 0}
+
+    async def fn(messages, info: AgentInfo) -> ModelResponse:
+        n = calls["n"]
+        calls["n"] += 1
+        try:
+            await asyncio.sleep(delays[min(n, len(delays) - 1)])
+        except asyncio.CancelledError:
+            cancelled.append(n)
+            raise
+        return ModelResponse(parts=[TextPart(f"call-{n}")])
+
+    return FunctionModel(fn, model_name="scripted")
+
+
+def test_latency_window_percentile():
+    w = LatencyWindow(size=100)
+    assert w.percentile(95) is None
+    for i in range(1, 101):
+        w.add(i / 100)
+    assert w.percentile(50) == 0.5
+    assert w.percentile(95) == 0.95
+
+
+def test_budget_caps_extra_load():
+    b = HedgeBudget(ratio=0.1, max_tokens=2)
+    granted = 0
+    for _ in range(100):
+        b.deposit()
+        granted += b.withdraw()
+    assert 9 <= granted <= 10  # ~10% de carga extra como mucho
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_loser_cancelled():
+    cancelled: list[int] = []
+    model = scripted_model([1.0, 0.01], cancelled)
+    agent = create_agent()
+    hedger = Hedger(initial_delay_s=0.05, budget=HedgeBudget(ratio=1.0))
+
+    t0 = time.perf_counter()
+    res = await hedger.run(lambda: agent.run("consulta", model=model))
+    assert res.output == "call-1"
+    assert time.perf_counter() - t0 < 0.5
+    await asyncio.sleep(0)
+    assert cancelled == [0]
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_when_budget_exhausted():
+    model = scripted_model([0.1, 0.0], [])
+    agent = create_agent()
+    hedger = Hedger(initial_delay_s=0.01, budget=HedgeBudget(ratio=0.0))
+    res = await hedger.run(lambda: agent.run("consulta", model=model))
+    assert res.output == "call-0"
+
+
+@pytest.mark.asyncio
+async def test_hedge_delay_follows_recent_percentile():
+    hedger = Hedger(percentile=90, min_samples=5)
+    assert hedger.hedge_delay() is None  # sin datos: no se hedgea
+    for d in (0.1, 0.1, 0.1, 0.1, 0.5):
+        hedger.latencies.add(d)
+    assert hedger.hedge_delay() == 0.5
+
+
+@pytest.mark.asyncio
+async def test_failed_primary_waits_for_hedge():
+    calls = {"n": 0}
+
+    async def factory():
+        calls["n"] += 1
+        n = calls["n"]
+        if n == 1:
+            await asyncio.sleep(0.05)
+            raise RuntimeError("boom")
+        await asyncio.sleep(0.1)
+        return "hedge-ok"
+
+    hedger = Hedger(initial_delay_s=0.01, budget=HedgeBudget(ratio=1.0))
+    assert await hedger.run(factory) == "hedge-ok"
+
+
+@pytest.mark.asyncio
+async def test_node_agent_uses_hedger_from_deps():
+    from core.routing import ModelRouter, RouteTarget
+
+    model = scripted_model([1.0, 0.0], [])
+    deps = Deps(
+        model_router=ModelRouter([RouteTarget("primary", model)]),
+        hedger=Hedger(initial_delay_s=0.02, budget=HedgeBudget(ratio=1.0)),
+    )
+    state = GraphState(session_id="s", user_input="hola")
+    out = await node_agent(state, deps)
+    assert out.agent_output == "call-1"
+    assert len(deps.hedger.window("scripted")) == 1  # muestra en la ventana de su modelo
+
+
+@pytest.mark.asyncio
+async def test_latency_samples_are_measured_from_the_primary_start():
+    async def factory_for(delays: list[float]):
+        calls = {"n": 0}
+
+        async def factory():
+            n = calls["n"]
+            calls["n"] += 1
+            await asyncio.sleep(delays[n])
+            return n
+
+        return factory
+
+    # gana el hedge (lanzado a los 50 ms, tarda 10 ms): la muestra es ~60 ms, no ~10 ms
+    hedger = Hedger(initial_delay_s=0.05, budget=HedgeBudget(ratio=1.0))
+    assert await hedger.run(await factory_for([1.0, 0.01])) == 1
+    assert len(hedger.latencies) == 1 and hedger.latencies.percentile(100) >= 0.06
+
+    # nos cancelan con la primaria en vuelo pasado el retardo: el retardo es la cota inferior
+    hedger = Hedger(initial_delay_s=0.02, budget=HedgeBudget(ratio=0.0))
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(hedger.run(await factory_for([1.0])), timeout=0.05)
+    assert len(hedger.latencies) == 1 and hedger.latencies.percentile(100) >= 0.05
+
+
+@pytest.mark.asyncio
+async def test_hedge_delay_is_tracked_per_model():
+    hedger = Hedger(percentile=90, min_samples=5)
+    for _ in range(5):
+        hedger.window("fast").add(0.01)
+        hedger.window("slow").add(1.0)
+    assert hedger.hedge_delay("fast") == 0.01
+    assert hedger.hedge_delay("slow") == 1.0
+    assert hedger.hedge_delay("nuevo") is None  # sin datos propios: no hereda los de otro modelo
+
+    async def quick():
+        return "ok"
+
+    assert await hedger.run(quick, key="fast") == "ok"
+    assert len(hedger.window("fast")) == 6 and len(hedger.window("slow")) == 5
@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import hmac
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from infrastructure import inbound
+from infrastructure.inbound import InboundJob, InboundWorkerPool, shard_for
+from infrastructure.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def _app_secret(monkeypatch):
+    # las firmas se calculan con este secreto: no depender de META_APP_SECRET del entorno
+    monkeypatch.setattr(settings, "meta_app_secret", "test-secret")
+
+
+def _job(session: str, text: str) -> InboundJob:
+    return InboundJob(channel="test", session_id=session, text=text)
+
+
+@pytest.mark.asyncio
+async def test_ordered_per_session_and_parallel_across_sessions():
+    seen: dict = {}
+    running = 0
+    peak = 0
+
+    async def handler(job: InboundJob) -> None:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        seen.setdefault(job.session_id, []).append(job.text)
+        running -= 1
+
+    sessions = ["a", "b", "c", "d"]
+    pool = InboundWorkerPool(workers=8, queue_size=100, handler=handler)
+    await pool.start()
+    for i in range(5):
+        for s in sessions:
+            assert await pool.submit(_job(s, str(i)))
+    assert await pool.stop(drain_timeout_s=5) == 0
+
+    assert seen == {s: ["0", "1", "2", "3", "4"] for s in sessions}
+    assert peak > 1  # sesiones en shards distintos avanzan a la vez
+    assert len({shard_for(s, 8) for s in sessions}) > 1
+
+
+@pytest.mark.asyncio
+async def test_full_shard_rejects_after_timeout():
+    gate = asyncio.Event()
+
+    async def handler(job: InboundJob) -> None:
+        await gate.wait()
+
+    pool = InboundWorkerPool(workers=1, queue_size=1, enqueue_timeout_s=0.01, handler=handler)
+    await pool.start()
+    assert await pool.submit(_job("a", "1"))  # lo toma el worker
+    await asyncio.sleep(0)
+    assert await pool.submit(_job("a", "2"))  # ocupa la única plaza
+    assert not await pool.submit(_job("a", "3"))
+    gate.set()
+    await pool.stop(drain_timeout_s=1)
+    assert not await pool.submit(_job("a", "4"))  # parado: ya no acepta
+
+
+@pytest.mark.asyncio
+async def test_stop_reports_undrained_jobs_and_handler_errors_dont_kill_workers():
+    done = []
+
+    async def handler(job: InboundJob) -> None:
+        if job.text == "boom":
+            raise RuntimeError("boom")
+        if job.text == "slow":
+            await asyncio.sleep(10)
+        done.append(job.text)
+
+    pool = InboundWorkerPool(workers=1, queue_size=10, handler=handler)
+    await pool.start()
+    for text in ["boom", "ok", "slow", "never"]:
+        await pool.submit(_job("a", text))
+    assert await pool.stop(drain_timeout_s=0.1) == 1
+    assert done == ["ok"]
+
+
+def test_whatsapp_webhook_acks_before_processing(monkeypatch):
+    from infrastructure.server import app
+
+    processed: list = []
+
+    class Recorder:
+        async def submit(self, job: InboundJob) -> bool:
+            processed.append(job)
+            return len(processed) == 1
+
+    monkeypatch.setattr(inbound, "_pool", Recorder())
+    body = {
+        "entry": [
+            {
+                "changes": [
+                    {
+                        "value": {
+                            "contacts": [{"wa_id": "34600000000"}],
+                            "messages": [{"from": "34600000000", "type": "text", "text": {"body": "hola"}}],
+                        }
+                    }
+                ]
+            }
+        ]
+    }
+    raw = json.dumps(body).encode()
+    sig = hmac.new(settings.meta_app_secret.encode(), raw, hashlib.sha256).hexdigest()
+    headers = {"Content-Type": "application/json", "X-Hub-Signature-256": f"sha256={sig}"}
+    client = TestClient(app)
+
+    assert client.post("/webhooks/whatsapp/webhook", content=raw, headers=headers).status_code == 200
+    job = processed[0]
+    assert (job.channel, job.session_id, job.text) == ("whatsapp", "34600000000", "hola")
+    # cola llena -> 503 para que Meta reintente
+    assert client.post("/webhooks/whatsapp/webhook", content=raw, headers=headers).status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_ack_mode_retries_a_failed_send_in_process_without_rerunning_the_turn(monkeypatch):
+    from adapters.whatsapp_business import handler as wa_handler
+    from core.runtime import get_graph_and_deps
+    from infrastructure import dedup as dedup_mod
+    from infrastructure.dedup import Deduplicator, InMemoryTTLCache
+
+    dedup = Deduplicator(InMemoryTTLCache(60))
+    monkeypatch.setattr(dedup_mod, "_dedup", dedup)
+    turns: list = []
+    sends: list = []
+
+    async def fake_run_turn(mm, session_id, user_text, channel):
+        turns.append(user_text)
+        return "respuesta", []
+
+    class FlakySender:
+        async def send_catalog_message(self, payload):
+            sends.append(payload.component.body)
+            if len(sends) < 3:
+                raise RuntimeError("429")
+
+    _graph, deps = get_graph_and_deps()
+    monkeypatch.setattr(deps, "catalog_sender", FlakySender())
+    monkeypatch.setattr(wa_handler, "run_turn", fake_run_turn)
+
+    pool = InboundWorkerPool(workers=1, queue_size=10, max_attempts=3, retry_max_delay_s=0.01)
+    await pool.start()
+    dedup.claim("whatsapp:ack1")
+    await pool.submit(InboundJob("whatsapp", "A", "hola", {"wa_id": "A", "dedup_key": "whatsapp:ack1"}))
+    assert await pool.stop(drain_timeout_s=2) == 0
+
+    assert turns == ["hola"] and sends == ["respuesta"] * 3
+    assert dedup.claim("whatsapp:ack1") == (False, None)  # enviada
@@ -0,0 +1,248 @@
+import asyncio
+import time
+
+import fakeredis
+import pytest
+
+from infrastructure.inbound import InboundJob
+from infrastructure.job_queue import DurablePublisher, DurableWorker, RedisStreamQueue, SqliteJobQueue
+
+
+@pytest.fixture(params=["redis", "sqlite"])
+def queue(request, tmp_path):
+    if request.param == "redis":
+        yield RedisStreamQueue(fakeredis.FakeRedis(decode_responses=True), partitions=4)
+    else:
+        q = SqliteJobQueue(str(tmp_path / "inbound.db"), partitions=4)
+        yield q
+        q.close()
+
+
+def _job(session: str, text: str) -> InboundJob:
+    return InboundJob(channel="test", session_id=session, text=text)
+
+
+async def _run_until(worker: DurableWorker, cond, timeout: float = 5.0) -> None:
+    async def _wait() -> None:
+        while not cond():
+            await asyncio.sleep(0.01)
+
+    task = asyncio.create_task(worker.run())
+    try:
+        await asyncio.wait_for(_wait(), timeout)
+    finally:
+        worker.stop()
+        await task
+
+
+@pytest.mark.asyncio
+async def test_worker_processes_in_order_per_session_and_acks(queue):
+    publisher = DurablePublisher(queue)
+    for i in range(5):
+        for s in ["a", "b", "c"]:
+            assert await publisher.submit(_job(s, str(i)))
+
+    seen: dict = {}
+
+    async def handler(job: InboundJob) -> None:
+        seen.setdefault(job.session_id, []).append(job.text)
+
+    worker = DurableWorker(queue, consumer="w1", slots=2, batch=3, idle_sleep_s=0.01, handler=handler)
+    await _run_until(worker, lambda: sum(map(len, seen.values())) == 15)
+
+    assert seen == {s: ["0", "1", "2", "3", "4"] for s in ["a", "b", "c"]}
+    assert all(queue.read(p, "w2", 10) == [] for p in range(queue.partitions))
+
+
+def test_unacked_jobs_are_redelivered_to_the_next_lease_holder(queue):
+    queue.publish(_job("a", "1"))
+    queue.publish(_job("a", "2"))
+    p = next(p for p in range(queue.partitions) if queue.acquire(p, "w1", 60000) and queue.read(p, "w1", 1))
+
+    assert not queue.acquire(p, "w2", 60000)  # lease exclusivo
+    queue.release(p, "w1")  # w1 "muere" sin confirmar
+    assert queue.acquire(p, "w2", 60000)
+    (d,) = queue.read(p, "w2", 1)
+    assert (d.job.text, d.attempts) == ("1", 2)
+    queue.ack(d)
+    (d,) = queue.read(p, "w2", 5)
+    assert d.job.text == "2"
+
+
+@pytest.mark.asyncio
+async def test_failing_job_blocks_its_session_then_goes_to_dead_letter(queue):
+    queue.publish(_job("a", "boom"))
+    queue.publish(_job("a", "next"))
+    calls: list = []
+
+    async def handler(job: InboundJob) -> None:
+        calls.append(job.text)
+        if job.text == "boom":
+            raise RuntimeError("boom")
+
+    worker = DurableWorker(
+        queue, consumer="w1", slots=1, max_attempts=3, idle_sleep_s=0.01, retry_max_delay_s=0.01, handler=handler
+    )
+    await _run_until(worker, lambda: "next" in calls)
+
+    assert calls == ["boom", "boom", "boom", "next"]  # "next" espera a que "boom" se resuelva
+
+
+@pytest.mark.asyncio
+async def test_failed_delivery_backs_off_before_the_partition_is_read_again(queue, monkeypatch):
+    from infrastructure import job_queue
+
+    delays: list = []
+
+    def fixed_backoff(attempt, base, cap):
+        delays.append(attempt)
+        return 0.1
+
+    monkeypatch.setattr(job_queue, "backoff_delay", fixed_backoff)
+    queue.publish(_job("a", "boom"))
+    tries: list = []
+
+    async def handler(job: InboundJob) -> None:
+        tries.append(time.monotonic())
+        raise RuntimeError("llm 503")
+
+    worker = DurableWorker(queue, consumer="w1", slots=1, max_attempts=3, idle_sleep_s=0.01, handler=handler)
+    await _run_until(worker, lambda: len(tries) == 3)
+
+    assert delays[:2] == [1, 2]  # backoff según el número de entrega
+    assert all(t2 - t1 >= 0.09 for t1, t2 in zip(tries, tries[1:]))
+
+
+@pytest.mark.asyncio
+async def test_worker_stops_draining_a_partition_whose_lease_was_lost():
+    client = fakeredis.FakeRedis(decode_responses=True)
+    queue = RedisStreamQueue(client, partitions=1)
+    for text in ("1", "2", "3"):
+        queue.publish(_job("a", text))
+    seen: list = []
+
+    async def handler(job: InboundJob) -> None:
+        seen.append(job.text)
+        client.set("inbound:lease:0", "w2", px=60000)  # el turno superó el lease y otro lo tomó
+
+    worker = DurableWorker(queue, consumer="w1", slots=1, batch=10, idle_sleep_s=0.01, handler=handler)
+    task = asyncio.create_task(worker.run())
+    await asyncio.sleep(0.1)
+    worker.stop()
+    await task
+
+    assert seen == ["1"]  # sin lease no sigue con el resto del lote
+    assert client.get("inbound:lease:0") == "w2"
+
+@pytest.mark.parametrize("op", ["renew", "release"])
+def test_lease_expiring_mid_renewal_is_never_touched_by_the_old_holder(monkeypatch, op):
+    import redis.client
+
+    server = fakeredis.FakeServer()
+    queue = RedisStreamQueue(fakeredis.FakeRedis(server=server, decode_responses=True), partitions=1)
+    other = fakeredis.FakeRedis(server=server, decode_responses=True)
+    assert queue.acquire(0, "w1", 60000)
+
+    real_get = redis.client.Pipeline.get
+    expired = []
+
+    def get_then_expire(pipe, name):
+        value = real_get(pipe, name)
+        if not expired:  # el lease caduca justo tras el GET y w2 lo toma
+            expired.append(True)
+            other.delete(name)
+            assert other.set(name, "w2", nx=True, px=60000)
+        return value
+
+    monkeypatch.setattr(redis.client.Pipeline, "get", get_then_expire)
+    if op == "renew":
+        assert not queue.acquire(0, "w1", 60000)
+    else:
+        queue.release(0, "w1")
+    assert other.get("inbound:lease:0") == "w2"
+    assert other.pttl("inbound:lease:0") > 0
+
+
+@pytest.mark.asyncio
+async def test_failed_whatsapp_send_is_redelivered_without_rerunning_the_turn_then_dead_lettered(monkeypatch):
+    from adapters.whatsapp_business import handler as wa_handler
+    from core.runtime import get_graph_and_deps
+    from infrastructure import dedup as dedup_mod
+    from infrastructure.dedup import Deduplicator, InMemoryTTLCache
+    from infrastructure.settings import settings
+
+    turns: list = []
+    sends: list = []
+
+    async def fake_run_turn(mm, session_id, user_text, channel):
+        turns.append(user_text)
+        return "respuesta", []
+
+    class DownSender:
+        async def send_catalog_message(self, payload):
+            sends.append(payload.component.body)
+            raise RuntimeError("graph api caída")
+
+    dedup = Deduplicator(InMemoryTTLCache(60))
+    monkeypatch.setattr(dedup_mod, "_dedup", dedup)
+    monkeypatch.setattr(settings, "inbound_mode", "durable")
+    monkeypatch.setattr(wa_handler, "run_turn", fake_run_turn)
+    _graph, deps = get_graph_and_deps()
+    monkeypatch.setattr(deps, "catalog_sender", DownSender())
+
+    client = fakeredis.FakeRedis(decode_responses=True)
+    queue = RedisStreamQueue(client, partitions=1)
+    assert dedup.claim("whatsapp:w1") == (True, None)
+    queue.publish(InboundJob("whatsapp", "A", "hola", {"wa_id": "A", "dedup_key": "whatsapp:w1"}))
+
+    worker = DurableWorker(
+        queue, consumer="w1", slots=1, max_attempts=3, idle_sleep_s=0.01, retry_max_delay_s=0.01,
+        handler=wa_handler.process_message,
+    )
+    await _run_until(worker, lambda: client.xlen("inbound:dead") == 1)
+
+    assert turns == ["hola"]  # los reintentos reenvían la respuesta cacheada
+    assert sends == ["respuesta"] * 3
+    assert queue.read(0, "w1", 10) == []
+
+
+@pytest.mark.asyncio
+async def test_telegram_redelivery_resends_the_cached_reply_from_the_pending_chunk(monkeypatch):
+    from adapters.telegram import handler as tg_handler
+    from infrastructure import dedup as dedup_mod
+    from infrastructure.dedup import SENT, Deduplicator, InMemoryTTLCache
+    from infrastructure.settings import settings
+
+    turns: list = []
+    starts: list = []
+
+    async def fake_run_turn(mm, session_id, user_text, channel):
+        turns.append(user_text)
+        return "respuesta larga", []
+
+    async def flaky_send(chat_id, text, *, start=0, on_sent=None):
+        starts.append(start)
+        if len(starts) == 1:
+            on_sent(1)  # el primer trozo llegó, el segundo no
+            raise RuntimeError("bot api caída")
+
+    dedup = Deduplicator(InMemoryTTLCache(60))
+    monkeypatch.setattr(dedup_mod, "_dedup", dedup)
+    monkeypatch.setattr(settings, "presence_enabled", False)
+    monkeypatch.setattr(tg_handler, "run_turn", fake_run_turn)
+    monkeypatch.setattr(tg_handler, "get_memory_manager", lambda: None)
+    monkeypatch.setattr(tg_handler, "tg_send_text", flaky_send)
+
+    client = fakeredis.FakeRedis(decode_responses=True)
+    queue = RedisStreamQueue(client, partitions=1)
+    assert dedup.claim("telegram:7") == (True, None)
+    queue.publish(InboundJob("telegram", "42", "hola", {"chat_id": 42, "dedup_key": "telegram:7"}))
+
+    worker = DurableWorker(
+        queue, consumer="w1", slots=1, max_attempts=3, idle_sleep_s=0.01, retry_max_delay_s=0.01,
+        handler=tg_handler.process_update,
+    )
+    await _run_until(worker, lambda: dedup.cache.get("telegram:7") == SENT)
+
+    assert turns == ["hola"] and starts == [0, 1]
+    assert client.xlen("inbound:dead") == 0
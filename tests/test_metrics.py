@@ -0,0 +1,75 @@
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from core.graph import create_graph, run_with_memory
+from core.memory.manager import MemoryManager
+from core.memory.in_memory import InMemoryHistory
+from infrastructure.http import http_clients
+
+prom = pytest.importorskip("prometheus_client")
+
+
+def sample(name: str, **labels: str) -> float:
+    return prom.REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_webhook_latency_by_channel():
+    from infrastructure.server import app
+
+    before = sample("agent_webhook_seconds_count", channel="generic")
+    TestClient(app).post(
+        "/webhooks/generic/generic-webhook",
+        headers={"x-api-key": "dummy"},
+        json={"session_id": "m1", "message": "hola"},
+    )
+    assert sample("agent_webhook_seconds_count", channel="generic") == before + 1
+
+
+@pytest.mark.asyncio
+async def test_pipeline_stages_are_timed():
+    graph, deps = create_graph()
+    mm = MemoryManager(InMemoryHistory())
+    stages = [
+        ("agent_memory_op_seconds_count", {"op": "load"}),
+        ("agent_memory_op_seconds_count", {"op": "save"}),
+        ("agent_graph_node_seconds_count", {"node": "agent"}),
+        ("agent_model_call_seconds_count", {"model": "test"}),
+    ]
+    before = [sample(n, **lbl) for n, lbl in stages]
+
+    await run_with_memory(graph, deps, mm, "m2", "hola")
+
+    after = [sample(n, **lbl) for n, lbl in stages]
+    assert all(a == b + 1 for a, b in zip(after, before))
+
+
+@pytest.mark.asyncio
+async def test_outbound_retries_counted_by_reason(monkeypatch):
+    from adapters.whatsapp_business import client as wa
+
+    async def no_sleep(_s):
+        return None
+
+    monkeypatch.setattr(wa.asyncio, "sleep", no_sleep)
+    stale = http_clients.peek("whatsapp")
+    if stale is not None:
+        await stale.aclose()
+    replies = iter([httpx.Response(429, json={"error": "rate"}), httpx.Response(200, json={"ok": True})])
+    pool = http_clients.get("whatsapp", transport=httpx.MockTransport(lambda req: next(replies)))
+    try:
+        before = sample("agent_outbound_retries_total", channel="whatsapp", reason="429")
+        sends = sample("agent_outbound_send_seconds_count", channel="whatsapp")
+        assert await wa.send_message(wa.get_text_message_input("34600000000", "hola")) == {"ok": True}
+        assert sample("agent_outbound_retries_total", channel="whatsapp", reason="429") == before + 1
+        assert sample("agent_outbound_send_seconds_count", channel="whatsapp") == sends + 1
+    finally:
+        await pool.aclose()
+
+
+def test_metrics_endpoint_exposes_pipeline_metrics():
+    from infrastructure.server import app
+
+    text = TestClient(app).get("/metrics").text
+    for name in ("agent_webhook_seconds", "agent_memory_op_seconds", "agent_model_call_seconds"):
+        assert name in text
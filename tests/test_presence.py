@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import pytest
+
+from adapters.whatsapp_business import client as wa_client
+from adapters.whatsapp_business import handler as wa_handler
+from core.runtime import get_graph_and_deps
+from infrastructure.inbound import InboundJob
+from infrastructure.presence import PresenceNotifier
+from infrastructure.settings import settings
+
+
+@pytest.mark.asyncio
+async def test_pings_run_beside_the_block_and_never_delay_it():
+    pings: list = []
+    landed: list = []
+
+    async def slow_ping(chat, ctx):
+        pings.append((chat, ctx))
+        await asyncio.sleep(0.5)  # API lenta: no debe notarse al salir del bloque
+        landed.append(ctx)
+
+    notifier = PresenceNotifier("test", slow_ping, interval_s=0.03, min_gap_s=0.0, timeout_s=1.0, exit_wait_s=0.02)
+    t0 = time.perf_counter()
+    async with notifier.during("c1", "m1"):
+        await asyncio.sleep(0.01)
+    assert time.perf_counter() - t0 < 0.1
+    assert pings == [("c1", "m1")]
+    await asyncio.sleep(0.6)
+    assert landed == []  # cancelado al salir: no llega después de la respuesta
+    await notifier.aclose()
+
+
+@pytest.mark.asyncio
+async def test_exit_waits_briefly_for_the_in_flight_ping():
+    events: list = []
+
+    async def ping(chat, ctx):
+        await asyncio.sleep(0.03)
+        events.append("typing")
+
+    notifier = PresenceNotifier("test", ping, interval_s=1.0, min_gap_s=0.0, exit_wait_s=0.5)
+    async with notifier.during("c1"):
+        await asyncio.sleep(0.005)
+    events.append("reply")
+    assert events == ["typing", "reply"]
+    await notifier.aclose()
+
+
+@pytest.mark.asyncio
+async def test_long_runs_refresh_and_failures_are_swallowed():
+    calls = 0
+
+    async def flaky(chat, ctx):
+        nonlocal calls
+        calls += 1
+        raise RuntimeError("429")
+
+    notifier = PresenceNotifier("test", flaky, interval_s=0.02, min_gap_s=0.0)
+    async with notifier.during("c1"):
+        await asyncio.sleep(0.09)
+    await notifier.aclose()
+    assert calls >= 3
+
+
+@pytest.mark.asyncio
+async def test_concurrent_turns_of_a_chat_are_coalesced_and_gap_limited():
+    pings: list = []
+
+    async def ping(chat, ctx):
+        pings.append((chat, ctx, time.monotonic()))
+
+    notifier = PresenceNotifier("test", ping, interval_s=0.01, min_gap_s=0.05)
+
+    async def turn(chat, ctx, secs):
+        async with notifier.during(chat, ctx):
+            await asyncio.sleep(secs)
+
+    await asyncio.gather(turn("a", "m1", 0.12), turn("a", "m2", 0.12), turn("b", "m3", 0.01))
+    await notifier.aclose()
+    a = [p for p in pings if p[0] == "a"]
+    assert 2 <= len(a) <= 3  # un solo bucle para "a", un ping cada ≥ 50 ms
+    assert all(t2 - t1 >= 0.045 for (_c, _m, t1), (_c2, _m2, t2) in zip(a, a[1:]))
+    assert a[-1][1] == "m2" and [p[1] for p in pings if p[0] == "b"] == ["m3"]
+
+
+@pytest.mark.asyncio
+async def test_whatsapp_turn_sends_read_receipt_with_wamid(monkeypatch):
+    receipts: list = []
+
+    async def fake_receipt(wamid, **kwargs):
+        receipts.append(wamid)
+
+    async def fake_run_turn(mm, session_id, user_text, channel):
+        await asyncio.sleep(0.02)
+        return "hola", []
+
+    sent: list = []
+
+    class FakeSender:
+        async def send_catalog_message(self, payload):
+            sent.append(payload.component.body)
+
+    monkeypatch.setattr(settings, "presence_enabled", True)
+    monkeypatch.setattr(wa_client, "_presence", None)
+    monkeypatch.setattr(wa_client, "send_read_receipt", fake_receipt)
+    monkeypatch.setattr(wa_handler, "run_turn", fake_run_turn)
+    _graph, deps = get_graph_and_deps()
+    monkeypatch.setattr(deps, "catalog_sender", FakeSender())
+
+    await wa_handler.process_message(InboundJob("whatsapp", "A", "hola", {"wa_id": "A", "wamid": "wamid.1"}))
+    assert receipts == ["wamid.1"] and sent == ["hola"]
+    await wa_client._presence.aclose()
@@ -0,0 +1,96 @@
+import asyncio
+
+import fakeredis
+import httpx
+import pytest
+
+from adapters.whatsapp_business import client as wa
+from infrastructure.ratelimit import (
+    RedisTokenBucket,
+    SendLimiter,
+    TokenBucket,
+    backoff_delay,
+    parse_retry_after,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.slept: list = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, s: float) -> None:
+        self.slept.append(round(s, 3))
+
+
+def test_bucket_spaces_concurrent_reservations_at_the_allowed_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(10, burst=2, clock=clock, sleep=clock.sleep)
+    assert [round(bucket.reserve(), 3) for _ in range(5)] == [0, 0, 0.1, 0.2, 0.3]
+    clock.now += 1.0  # se rellena el burst
+    assert [round(bucket.reserve(), 3) for _ in range(3)] == [0, 0, 0.1]
+
+
+@pytest.mark.asyncio
+async def test_penalize_blocks_every_caller_for_retry_after():
+    clock = FakeClock()
+    bucket = TokenBucket(10, burst=5, clock=clock, sleep=clock.sleep)
+    await bucket.penalize(2.0)
+    await asyncio.gather(bucket.acquire(), bucket.acquire())
+    assert clock.slept == [2.1, 2.2]
+
+
+@pytest.mark.asyncio
+async def test_send_limiter_applies_pair_rate_per_recipient():
+    clock = FakeClock()
+    limiter = SendLimiter(
+        TokenBucket(100, burst=100, clock=clock, sleep=clock.sleep),
+        lambda to: TokenBucket(1, burst=1, clock=clock, sleep=clock.sleep),
+        max_recipients=2,
+    )
+    for to in ["a", "a", "b", "c"]:
+        await limiter.acquire(to)
+    assert clock.slept == [1.0]  # solo el 2º mensaje a "a" espera
+    assert list(limiter._recipients) == ["b", "c"]  # acotado
+
+
+@pytest.mark.asyncio
+async def test_redis_bucket_is_shared_between_instances():
+    r = fakeredis.FakeRedis(decode_responses=True)
+    slept: list = []
+
+    async def sleep(s):
+        slept.append(s)
+
+    a = RedisTokenBucket(r, "rl:test", 10, burst=1, sleep=sleep)
+    b = RedisTokenBucket(r, "rl:test", 10, burst=1, sleep=sleep)  # "otra réplica"
+    assert await a.acquire() == 0
+    assert 0.05 < await b.acquire() <= 0.1
+    await a.penalize(5)
+    assert await b.acquire() > 4.9
+
+
+def test_retry_after_and_jitter():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2026 07:28:10 GMT", now=1792567680.0) == 10.0
+    assert parse_retry_after("pronto") is None and parse_retry_after(None) is None
+    assert all(0 <= backoff_delay(3, 2.0, cap=5.0) <= 5.0 for _ in range(100))
+
+
+@pytest.mark.asyncio
+async def test_send_message_honors_retry_after_through_the_shared_limiter():
+    clock = FakeClock()
+    limiter = SendLimiter(TokenBucket(1000, burst=1000, clock=clock, sleep=clock.sleep))
+    responses = [
+        httpx.Response(429, headers={"Retry-After": "7"}, json={"error": {"code": 130429}}),
+        httpx.Response(200, json={"messages": [{"id": "wamid.1"}]}),
+    ]
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(lambda req: responses.pop(0))) as c:
+        out = await wa.send_message(wa.get_text_message_input("346", "hola"), client=c, limiter=limiter)
+
+    assert out["messages"][0]["id"] == "wamid.1"
+    assert clock.slept == [7.001]  # el reintento esperó Retry-After en el bucket compartido
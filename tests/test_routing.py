@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from core.agents import create_agent
+from core.deps import Deps
+from core.graph import GraphState, node_agent
+from core.routing import (
+    DEFAULT,
+    TRIVIAL,
+    ModelRouter,
+    RouteTarget,
+    default_classifier,
+)
+
+
+def slow_model(name: str, delay_s: float = 0.0, fail: bool = False) -> FunctionModel:
+    """FunctionModel con latencia inyectada que responde con su propio nombre."""
+
+    async def fn(messages, info: AgentInfo) -> ModelResponse:
+        await asyncio.sleep(delay_s)
+        if fail:
+            raise RuntimeError(f"{name} caído")
+        return ModelResponse(parts=[TextPart(name)])
+
+    return FunctionModel(fn, model_name=name)
+
+
+async def _ask(router: ModelRouter, text: str = "explícame la factura de marzo") -> str:
+    agent = create_agent()
+    res = await router.run(lambda m: agent.run(text, model=m), text)
+    return res.output
+
+
+def test_default_classifier():
+    assert default_classifier("hola!") == TRIVIAL
+    assert default_classifier("Gracias") == TRIVIAL
+    assert default_classifier("¿Qué horario tenéis el sábado?") == DEFAULT
+
+
+@pytest.mark.asyncio
+async def test_trivial_messages_go_to_fast_model():
+    router = ModelRouter(
+        [RouteTarget("primary", slow_model("primary"))],
+        fast=RouteTarget("fast", slow_model("fast")),
+    )
+    assert await _ask(router, "hola") == "fast"
+    assert await _ask(router) == "primary"
+
+
+@pytest.mark.asyncio
+async def test_error_falls_back_to_next_in_chain():
+    router = ModelRouter(
+        [
+            RouteTarget("primary", slow_model("primary", fail=True)),
+            RouteTarget("fallback-1", slow_model("backup")),
+        ]
+    )
+    assert await _ask(router) == "backup"
+    assert router.chain[0].stats.error_rate > 0
+
+
+@pytest.mark.asyncio
+async def test_attempt_timeout_falls_back():
+    router = ModelRouter(
+        [
+            RouteTarget("primary", slow_model("primary", delay_s=0.5), timeout_s=0.05),
+            RouteTarget("fallback-1", slow_model("backup")),
+        ]
+    )
+    assert await _ask(router) == "backup"
+
+
+@pytest.mark.asyncio
+async def test_slo_breach_reroutes_and_probe_recovers():
+    primary = RouteTarget("primary", slow_model("primary", delay_s=0.03), slo_s=0.01)
+    backup = RouteTarget("fallback-1", slow_model("backup"), slo_s=0.01)
+    router = ModelRouter([primary, backup], min_samples=2, probe_every=5)
+
+    # Las 2 primeras van al primario (sin muestras suficientes) y rompen su SLO
+    assert [await _ask(router) for _ in range(2)] == ["primary", "primary"]
+    assert primary.degraded(router.min_samples)
+
+    # Con el SLO roto, el tráfico va al fallback...
+    assert [await _ask(router) for _ in range(2)] == ["backup", "backup"]
+    # ...salvo la petición de sondeo (cada probe_every), que vuelve a medir el primario
+    assert await _ask(router) == "primary"
+
+    _, reason = router.plan("otra consulta larga")
+    assert reason == "slo_breach"
+
+
+@pytest.mark.asyncio
+async def test_node_agent_uses_router_from_deps():
+    router = ModelRouter([RouteTarget("primary", slow_model("routed"))])
+    state = GraphState(session_id="s", user_input="necesito ayuda con un pedido")
+    out = await node_agent(state, Deps(model_router=router))
+    assert out.agent_output == "routed"
+
+
+@pytest.mark.asyncio
+async def test_routing_decisions_exported_as_metrics():
+    prom = pytest.importorskip("prometheus_client")
+    router = ModelRouter(
+        [RouteTarget("primary", slow_model("p", fail=True)), RouteTarget("fallback-1", slow_model("b"))]
+    )
+
+    def sample(name, **labels):
+        return prom.REGISTRY.get_sample_value(name, labels) or 0.0
+
+    before = sample("agent_model_route_fallbacks_total", route="primary", cause="error")
+    await _ask(router)
+    assert sample("agent_model_route_fallbacks_total", route="primary", cause="error") == before + 1
+    assert sample("agent_model_route_decisions_total", route="fallback-1", reason="fallback") >= 1
@@ -0,0 +1,66 @@
+import pytest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from infrastructure.settings import settings
+from observability.scrubbing import DEFAULT_DENYLIST, REDACTED, AttributeScrubber
+from observability.span_export import BoundedSpanProcessor, build_span_processor
+
+
+def test_denylist_redacts_by_key_and_keeps_session_id():
+    s = AttributeScrubber(DEFAULT_DENYLIST)
+    out = s.scrub(
+        {
+            "langfuse.session.id": "wa-34600000000",
+            "http.request.header.authorization": "Bearer x",
+            "db.password": "hunter2",
+            "gen_ai.prompt": "mi password es hunter2",  # los valores no se inspeccionan
+        }
+    )
+    assert out["langfuse.session.id"] == "wa-34600000000"
+    assert out["http.request.header.authorization"] == REDACTED
+    assert out["db.password"] == REDACTED
+    assert out["gen_ai.prompt"] == "mi password es hunter2"
+
+
+def test_allowlist_keeps_only_matching_keys_and_caches_decisions():
+    s = AttributeScrubber(["langfuse.*", "gen_ai.*"], mode="allowlist")
+    attrs = {"langfuse.session.id": "s", "gen_ai.system": "openai", "user.email": "a@b.c"}
+    assert s.scrub(attrs) == {"langfuse.session.id": "s", "gen_ai.system": "openai", "user.email": REDACTED}
+    assert set(s._decisions) == set(attrs)
+
+    clean = {"gen_ai.system": "openai"}
+    assert s.scrub(clean) is clean  # sin cambios: ni copia
+
+
+def test_unknown_mode_rejected():
+    with pytest.raises(ValueError):
+        AttributeScrubber(["x"], mode="regex")
+
+
+def test_from_settings_uses_custom_patterns(monkeypatch):
+    monkeypatch.setattr(settings, "otel_scrubbing_mode", "allowlist")
+    monkeypatch.setattr(settings, "otel_scrub_patterns", "tool.*, langfuse.*")
+    s = AttributeScrubber.from_settings()
+    assert s.keep("tool.args") and not s.keep("gen_ai.prompt")
+
+
+def test_exported_spans_are_scrubbed_in_exporter():
+    sink = InMemorySpanExporter()
+    processor = build_span_processor("http://unused", exporter=sink, scrubber=AttributeScrubber(DEFAULT_DENYLIST))
+    assert isinstance(processor, BoundedSpanProcessor)
+    provider = TracerProvider()
+    provider.add_span_processor(processor)
+    tracer = provider.get_tracer("test")
+
+    with tracer.start_as_current_span("tool:x") as span:
+        span.set_attribute("api_key", "sk-123")
+        span.set_attribute("tool.args", "hola")
+        span.add_event("login", {"cookie": "abc", "ok": True})
+    processor.force_flush()
+
+    (exported,) = sink.get_finished_spans()
+    assert exported.attributes["api_key"] == REDACTED
+    assert exported.attributes["tool.args"] == "hola"
+    assert dict(exported.events[0].attributes) == {"cookie": REDACTED, "ok": True}
+    processor.shutdown()
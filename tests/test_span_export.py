@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+import pytest
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from infrastructure.settings import settings
+from observability.span_export import BoundedSpanProcessor, build_span_processor
+from standins import StandInServer
+
+
+def _provider(processor: BoundedSpanProcessor):
+    provider = TracerProvider()
+    provider.add_span_processor(processor)
+    return provider.get_tracer("test")
+
+
+def test_exports_and_counts_without_drops():
+    exporter = InMemorySpanExporter()
+    processor = BoundedSpanProcessor(exporter, max_queue_size=100, max_export_batch_size=10, schedule_delay_ms=10)
+    tracer = _provider(processor)
+    for i in range(25):
+        with tracer.start_as_current_span(f"s{i}"):
+            pass
+    assert processor.force_flush()
+    assert processor.snapshot() == {"pending": 0, "exported": 25, "failed": 0, "dropped": 0}
+    assert len(exporter.get_finished_spans()) == 25
+    processor.shutdown()
+
+
+def test_build_span_processor_uses_bsp_settings(monkeypatch):
+    monkeypatch.setattr(settings, "otel_bsp_max_queue_size", 64)
+    processor = build_span_processor("http://127.0.0.1:9/v1/traces", exporter=InMemorySpanExporter())
+    assert processor.max_queue_size == 64
+    processor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_stalled_collector_drops_instead_of_blocking():
+    release = asyncio.Event()
+
+    async def stalled(req):
+        await release.wait()  # el colector no contesta hasta el final del test
+        return 200, {"Content-Type": "application/x-protobuf"}, b""
+
+    async with StandInServer(stalled) as collector:
+        exporter = OTLPSpanExporter(endpoint=f"{collector.url}/v1/traces", timeout=0.5)
+        processor = BoundedSpanProcessor(
+            exporter, max_queue_size=50, max_export_batch_size=10, schedule_delay_ms=5
+        )
+        tracer = _provider(processor)
+
+        # "peticiones" con spans mientras el colector está colgado
+        worst = 0.0
+        for i in range(400):
+            t0 = time.perf_counter()
+            with tracer.start_as_current_span(f"req{i}") as span:
+                span.set_attribute("i", i)
+            worst = max(worst, time.perf_counter() - t0)
+            if i % 50 == 0:
+                await asyncio.sleep(0)
+
+        assert worst < 0.05  # on_end no espera al colector
+        snap = processor.snapshot()
+        assert snap["dropped"] > 0
+        assert snap["pending"] <= 50
+        assert sum(snap.values()) == 400
+
+        release.set()
+        await asyncio.to_thread(processor.shutdown)
+        snap = processor.snapshot()
+        assert snap["exported"] + snap["failed"] + snap["dropped"] == 400
@@ -0,0 +1,60 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from core import runtime
+from infrastructure import startup
+from infrastructure.settings import settings
+
+
+HEAVY_MODULES = ["core.graph", "langgraph", "openai", "pydantic_ai"]
+
+
+@pytest.fixture(scope="module")
+def server_report():
+    return startup.import_time_report("infrastructure.server")
+
+
+def test_server_import_skips_heavy_modules(server_report):
+    loaded = [m for m in HEAVY_MODULES if server_report.loaded(m)]
+    assert loaded == [], server_report.format()
+
+
+def test_server_import_within_budget(server_report):
+    assert server_report.total_ms > 0
+    assert server_report.total_ms <= settings.startup_import_budget_ms, server_report.format()
+
+
+def test_parse_importtime_depth_and_top():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       100 |        100 |   b\n"
+        "import time:        50 |        150 | a\n"
+    )
+    rep = startup.parse_importtime(stderr, "a")
+    assert [e.depth for e in rep.entries] == [1, 0]
+    assert rep.total_ms == 0.15
+    assert rep.top(1)[0].module == "b"
+    assert rep.loaded("a") and not rep.loaded("c")
+
+
+def test_lifespan_eager_warmup_builds_graph(monkeypatch):
+    from infrastructure.server import build_app
+
+    runtime.reset_graph()
+    monkeypatch.setattr(settings, "observability_enabled", False)
+    monkeypatch.setattr(settings, "eager_warmup", True)
+
+    with TestClient(build_app()) as c:
+        assert runtime.is_graph_ready()
+        assert c.get("/health").status_code == 200
+
+
+def test_lifespan_lazy_by_default(monkeypatch):
+    from infrastructure.server import build_app
+
+    runtime.reset_graph()
+    monkeypatch.setattr(settings, "observability_enabled", False)
+    monkeypatch.setattr(settings, "eager_warmup", False)
+
+    with TestClient(build_app()):
+        assert not runtime.is_graph_ready()
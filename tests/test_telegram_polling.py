@@ -0,0 +1,172 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from adapters.telegram import handler as tg_handler
+from adapters.telegram import sender as tg_sender
+from adapters.telegram.polling import TelegramPoller, handle_update
+from adapters.telegram.sender import TelegramMessageSender
+from infrastructure.http import HttpClientPool
+from standins import StandInServer
+
+
+class FakeBotAPI:
+    """Stand-in de la Bot API: getUpdates con offset/limit y long poll corto."""
+
+    def __init__(self, updates: list):
+        self.updates = updates
+        self.offsets: list = []
+        self.sent: list = []
+
+    async def __call__(self, req):
+        method = req.path.rsplit("/", 1)[-1]
+        body = req.json() or {}
+        result: object = True
+        if method == "getUpdates":
+            offset = body.get("offset", 0)
+            self.offsets.append(offset)
+            result = [u for u in self.updates if u["update_id"] >= offset][: body.get("limit", 100)]
+            if not result:
+                await asyncio.sleep(min(body.get("timeout", 0), 0.02))
+        elif method == "sendMessage":
+            self.sent.append((body["chat_id"], body["text"]))
+            result = {"message_id": len(self.sent)}
+        return 200, {"Content-Type": "application/json"}, json.dumps({"ok": True, "result": result}).encode()
+
+
+def _updates(chats: int, per_chat: int) -> list:
+    # intercalados como llegarían de Telegram: m0 de cada chat, m1 de cada chat...
+    return [
+        {"update_id": 1000 + i * chats + c, "message": {"chat": {"id": c}, "text": f"m{i}"}}
+        for i in range(per_chat)
+        for c in range(chats)
+    ]
+
+
+async def _until(cond, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timeout esperando al poller"
+        await asyncio.sleep(0.005)
+
+
+@pytest.mark.asyncio
+async def test_polling_keeps_chat_order_runs_chats_concurrently_and_acks_in_batches():
+    chats, per_chat, turn_s = 20, 5, 0.02
+    api = FakeBotAPI(_updates(chats, per_chat))
+    seen: dict = {}
+    running = peak = 0
+
+    async def handle(update):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(turn_s)
+        running -= 1
+        seen.setdefault(update["message"]["chat"]["id"], []).append(update["message"]["text"])
+        assert max(api.offsets) <= update["update_id"]  # nada en curso se confirmó antes de acabar
+
+    async with StandInServer(api) as srv:
+        pool = HttpClientPool()
+        poller = TelegramPoller(
+            "t", handle=handle, client=pool.get("telegram"), api_base_url=srv.url,
+            poll_timeout_s=1, limit=30, concurrency=16,
+        )
+        t0 = time.monotonic()
+        await poller.start(delete_webhook=False)
+        await _until(lambda: poller.processed == chats * per_chat)
+        elapsed = time.monotonic() - t0
+        await poller.stop()
+        await pool.aclose()
+
+    assert all(seen[c] == [f"m{i}" for i in range(per_chat)] for c in range(chats))
+    assert peak == 16
+    # 100 turnos de 20 ms: en serie serían 2 s
+    assert elapsed < chats * per_chat * turn_s / 4
+    # el offset confirma por lotes todo lo terminado, nunca pasa del update en curso más antiguo
+    assert api.offsets == sorted(api.offsets) and api.offsets[-1] == 1000 + chats * per_chat
+    assert len(set(api.offsets)) < chats * per_chat / 4
+
+
+@pytest.mark.asyncio
+async def test_polling_drives_the_webhook_pipeline(monkeypatch):
+    api = FakeBotAPI(
+        [
+            {"update_id": 1, "message": {"chat": {"id": 7}, "text": "/start"}},
+            {"update_id": 2, "message": {"chat": {"id": 7}, "text": "hola"}},
+            {"update_id": 3, "message": {"chat": {"id": 7}}},  # sin texto: se confirma y se ignora
+        ]
+    )
+
+    async def fake_run_turn(mm, session_id, user_text, channel):
+        return f"eco: {user_text} ({channel})", []
+
+    async with StandInServer(api) as srv:
+        pool = HttpClientPool()
+        client = pool.get("telegram")
+        monkeypatch.setattr(tg_handler, "run_turn", fake_run_turn)
+        monkeypatch.setattr(tg_handler, "get_memory_manager", lambda: None)
+        monkeypatch.setattr(tg_sender, "_sender", TelegramMessageSender("t", client=client, api_base_url=srv.url))
+        poller = TelegramPoller("t", client=client, api_base_url=srv.url, poll_timeout_s=1)
+        await poller.start()
+        await _until(lambda: len(api.sent) == 2)
+        await poller.stop()
+        await pool.aclose()
+
+    assert api.sent == [("7", "¡Hola! Envía tu consulta."), ("7", "eco: hola (telegram)")]
+    assert srv.requests[0].path.endswith("/deleteWebhook")
+
+
+@pytest.mark.asyncio
+async def test_in_flight_updates_are_never_confirmed_and_are_redelivered_after_stop():
+    api = FakeBotAPI(
+        [
+            {"update_id": 1, "message": {"chat": {"id": 1}, "text": "lento"}},
+            {"update_id": 2, "message": {"chat": {"id": 2}, "text": "rápido"}},
+        ]
+    )
+    done: list = []
+
+    async def handle(update):
+        if update["update_id"] == 1:
+            await asyncio.sleep(5)
+        done.append(update["update_id"])
+
+    async with StandInServer(api) as srv:
+        pool = HttpClientPool()
+        poller = TelegramPoller("t", handle=handle, client=pool.get("telegram"), api_base_url=srv.url, poll_timeout_s=1)
+        await poller.start(delete_webhook=False)
+        await _until(lambda: done == [2] and len(api.offsets) >= 3)
+        left = await poller.stop(drain_timeout_s=0.05)
+        await pool.aclose()
+
+    assert left == 1
+    # el 2 terminó pero el 1 seguía en curso: ningún getUpdates (ni el final) confirma el 1
+    assert max(api.offsets) == 1 and api.offsets[-1] == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_update_releases_its_dedup_claim(monkeypatch):
+    from infrastructure import dedup as dedup_mod
+    from infrastructure.dedup import Deduplicator, InMemoryTTLCache
+    from infrastructure.settings import settings
+
+    dedup = Deduplicator(InMemoryTTLCache(60))
+    monkeypatch.setattr(dedup_mod, "_dedup", dedup)
+    monkeypatch.setattr(settings, "presence_enabled", False)
+    started = asyncio.Event()
+
+    async def slow_turn(mm, session_id, user_text, channel):
+        started.set()
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(tg_handler, "run_turn", slow_turn)
+    monkeypatch.setattr(tg_handler, "get_memory_manager", lambda: None)
+    task = asyncio.create_task(handle_update({"update_id": 9, "message": {"chat": {"id": 1}, "text": "hola"}}))
+    await started.wait()
+    task.cancel()  # como TelegramPoller.stop() con un turno en curso
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert dedup.claim("telegram:9") == (True, None)  # la reentrega tras reiniciar se procesa
@@ -0,0 +1,82 @@
+import json
+import time
+
+import httpx
+import pytest
+
+from adapters.telegram.sender import TelegramAPIError, TelegramMessageSender
+from infrastructure.chunking import ChunkSendError
+from infrastructure.ratelimit import SendLimiter, TokenBucket
+
+
+def _api(calls: list, responses: list | None = None) -> httpx.AsyncClient:
+    async def handler(req: httpx.Request) -> httpx.Response:
+        calls.append((req.url.path.rsplit("/", 1)[-1], json.loads(req.content), time.monotonic()))
+        if responses:
+            status, body = responses.pop(0)
+            return httpx.Response(status, json=body)
+        return httpx.Response(200, json={"ok": True, "result": {"message_id": len(calls)}})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+async def test_send_text_chunks_in_order_over_the_given_client():
+    calls: list = []
+    async with _api(calls) as c:
+        sender = TelegramMessageSender("123:abc", client=c, api_base_url="https://tg.test")
+        progress: list = []
+        await sender.send_text("42", "😀" * 3000, on_sent=progress.append)
+    assert [m for m, _b, _t in calls] == ["sendMessage", "sendMessage"]
+    assert [len(b["text"]) for _m, b, _t in calls] == [2048, 952] and progress == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_429_waits_retry_after_on_the_chat_bucket():
+    calls: list = []
+    flood = {"ok": False, "error_code": 429, "description": "Too Many Requests", "parameters": {"retry_after": 0.1}}
+    limiter = SendLimiter(TokenBucket(1000, 1000), lambda chat: TokenBucket(1000, 10))
+    async with _api(calls, [(429, flood)]) as c:
+        sender = TelegramMessageSender("t", client=c, limiter=limiter, api_base_url="https://tg.test")
+        assert await sender.call("sendMessage", {"chat_id": 1, "text": "a"}, chat_id=1) == {"message_id": 2}
+        t0 = time.monotonic()
+        await sender.call("sendMessage", {"chat_id": 2, "text": "b"}, chat_id=2)  # otro chat: sin espera
+        assert time.monotonic() - t0 < 0.05
+    assert calls[1][2] - calls[0][2] >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_non_retryable_errors_raise_without_retry():
+    calls: list = []
+    async with _api(calls, [(400, {"ok": False, "description": "Bad Request: chat not found"})]) as c:
+        sender = TelegramMessageSender("t", client=c, api_base_url="https://tg.test")
+        with pytest.raises(ChunkSendError) as err:
+            await sender.send_text("1", "hola")
+    cause = err.value.__cause__
+    assert isinstance(cause, TelegramAPIError) and cause.status == 400 and len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_send_cards_uses_photo_caption_and_inline_keyboard():
+    calls: list = []
+    async with _api(calls) as c:
+        sender = TelegramMessageSender("t", client=c, api_base_url="https://tg.test")
+        await sender.send_cards(
+            "7",
+            [
+                {
+                    "title": "Plan_Pro",
+                    "description": "Todo incluido",
+                    "image_url": "https://cdn.test/p.png",
+                    "actions": [{"type": "url", "label": "Ver", "value": "https://x.test"}, {"type": "reply", "label": "Quiero"}],
+                },
+                {"title": "Básico"},
+            ],
+        )
+    (m1, photo, _), (m2, text, _) = calls
+    assert m1 == "sendPhoto" and photo["caption"] == "Plan_Pro\nTodo incluido"
+    assert photo["reply_markup"]["inline_keyboard"] == [
+        [{"text": "Ver", "url": "https://x.test"}],
+        [{"text": "Quiero", "callback_data": "Quiero"}],
+    ]
+    assert m2 == "sendMessage" and text == {"chat_id": "7", "text": "Básico"}
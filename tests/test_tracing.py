@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from pydantic_ai import RunContext
+from pydantic_ai.models.test import TestModel
+from pydantic_ai.usage import RunUsage
+
+from core.deps import Deps
+from core.graph import user_msg
+from observability.langfuse import tracing
+from observability.langfuse.tracing import TracingPolicy, describe, traced_tool
+
+
+@pytest.fixture
+def spans(monkeypatch):
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr(tracing, "tracer", provider.get_tracer("test"))
+    yield exporter
+    tracing.set_tracing_policy(None)
+
+
+def big_ctx() -> RunContext[Deps]:
+    history = [user_msg("x" * 2000) for _ in range(50)]
+    return RunContext(deps=Deps(extra="y" * 10_000), model=TestModel(), usage=RunUsage(), messages=history)
+
+
+@traced_tool("echo")
+async def echo(ctx, payload: str = "", delay: float = 0.0, fail: bool = False) -> str:
+    await asyncio.sleep(delay)
+    if fail:
+        raise ValueError("boom")
+    return payload * 3
+
+
+def test_describe_bounds_context_and_large_values():
+    policy = TracingPolicy(max_attr_chars=64)
+    ctx = big_ctx()
+    assert describe(ctx, policy).startswith("RunContext(model=test")
+    assert describe(ctx, TracingPolicy(context_mode="redacted")) == "RunContext(<redacted>)"
+    assert len(describe(list(range(10_000)), policy)) <= 65
+    assert len(describe("z" * 10_000, policy)) == 65  # 64 + "…"
+
+
+@pytest.mark.asyncio
+async def test_head_sampled_span_has_capped_attributes(spans):
+    tracing.set_tracing_policy(TracingPolicy(max_attr_chars=100))
+    assert await echo(big_ctx(), payload="ab" * 100) == "ab" * 300
+
+    (span,) = spans.get_finished_spans()
+    assert span.name == "tool:echo"
+    assert span.attributes["tool.sampling"] == "head"
+    assert "messages=50" in span.attributes["tool.args"]
+    assert all(len(v) <= 101 for v in span.attributes.values() if isinstance(v, str))
+
+
+@pytest.mark.asyncio
+async def test_tail_sampling_keeps_only_slow_or_failed_calls(spans):
+    tracing.set_tracing_policy(TracingPolicy(sample_rate=0.0, tail_slow_s=0.05))
+
+    await echo(big_ctx(), payload="fast")
+    assert spans.get_finished_spans() == ()
+
+    await echo(big_ctx(), payload="slow", delay=0.06)
+    with pytest.raises(ValueError):
+        await echo(big_ctx(), fail=True)
+
+    slow, failed = spans.get_finished_spans()
+    assert slow.attributes["tool.sampling"] == "tail_slow"
+    assert (slow.end_time - slow.start_time) >= 50_000_000  # span con la duración real
+    assert failed.attributes["tool.sampling"] == "tail_error"
+    assert failed.status.is_ok is False
+
+
+@pytest.mark.asyncio
+async def test_disabled_policy_is_a_noop(spans):
+    tracing.set_tracing_policy(TracingPolicy(enabled=False))
+    assert await echo(big_ctx(), payload="a") == "aaa"
+    assert spans.get_finished_spans() == ()
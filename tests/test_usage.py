@@ -0,0 +1,116 @@
+import fakeredis
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from core.deps import Deps
+from core.graph import GraphState, create_graph, node_agent, node_tool, run_with_memory
+from core.memory.in_memory import InMemoryHistory
+from core.memory.manager import MemoryManager
+from core.memory.usage_store import InMemoryUsage, RedisUsage
+from core.usage import TurnUsage
+
+
+async def _reply(messages, info: AgentInfo) -> ModelResponse:
+    return ModelResponse(parts=[TextPart("vale")])
+
+
+@pytest.mark.asyncio
+async def test_turn_usage_prices_known_models():
+    res = await Agent().run("¿cuánto cuesta el envío?", model=FunctionModel(_reply, model_name="gpt-4.1-mini"))
+    usage = TurnUsage.from_result(res, "primary", 0.2)
+    assert usage.requests == 1
+    assert usage.input_tokens > 0 and usage.output_tokens > 0
+    assert usage.cost_usd is not None and usage.cost_usd > 0
+
+
+@pytest.mark.asyncio
+async def test_turn_usage_unknown_model_has_no_cost():
+    res = await Agent().run("hola", model="test")
+    assert TurnUsage.from_result(res, "test", 0.0).cost_usd is None
+
+
+@pytest.mark.asyncio
+async def test_nodes_carry_usage_into_tool_context():
+    state = await node_agent(GraphState(session_id="u", user_input="hola"), Deps())
+    assert state.usage is not None and state.usage.model == "test"
+    assert state.usage.input_tokens > 0
+
+    # node_tool ya no crea un RunUsage vacío: recibe el consumo del turno
+    run_usage = state.usage.to_run_usage()
+    assert run_usage.input_tokens == state.usage.input_tokens
+    out = await node_tool(state, Deps())
+    assert out.tool_output
+
+
+@pytest.mark.asyncio
+async def test_run_with_memory_accumulates_per_session():
+    graph, deps = create_graph()
+    mm = MemoryManager(InMemoryHistory(), usage=InMemoryUsage())
+
+    await run_with_memory(graph, deps, mm, "caro", "hola", channel="whatsapp")
+    await run_with_memory(graph, deps, mm, "caro", "otra vez", channel="whatsapp")
+    await run_with_memory(graph, deps, mm, "barato", "hola", channel="telegram")
+
+    totals = mm.usage_for("caro")
+    assert totals["turns"] == 2
+    assert totals["requests"] >= 2  # TestModel llama a la tool: 2 requests por turno
+    assert totals["channel"] == "whatsapp" and totals["model"] == "test"
+    assert mm.usage.top(by="latency", n=1)[0][0] in ("caro", "barato")
+
+    mm.reset("caro")
+    assert mm.usage_for("caro") == {}
+
+
+def test_redis_usage_is_compact_and_ranked():
+    r = fakeredis.FakeRedis(decode_responses=True)
+    store = RedisUsage(r)
+    cheap = TurnUsage(model="fast", requests=1, input_tokens=10, output_tokens=2, cost_usd=0.001, latency_s=0.1)
+    pricey = TurnUsage(model="primary", requests=2, input_tokens=900, output_tokens=300, cost_usd=0.05, latency_s=3.0)
+
+    store.add("a", "whatsapp", cheap)
+    store.add("b", "telegram", pricey)
+    store.add("b", "telegram", pricey)
+
+    assert set(r.hkeys("usage:b")) <= {"t", "r", "in", "out", "cr", "cost", "lat", "ch", "m"}
+    b = store.get("b")
+    assert b["turns"] == 2 and b["input_tokens"] == 1800
+    assert b["cost_usd"] == pytest.approx(0.1)
+    assert [sid for sid, _ in store.top("cost")] == ["b", "a"]
+    assert store.top("latency", n=1)[0] == ("b", pytest.approx(6.0))
+
+    store.clear("b")
+    assert store.get("b") == {}
+    assert [sid for sid, _ in store.top("cost")] == ["a"]
+
+
+def test_usage_stores_are_bounded():
+    turn = TurnUsage(model="m", requests=1, cost_usd=0.01, latency_s=0.1)
+    memory = InMemoryUsage(max_sessions=2)
+    for sid in ("a", "b", "a", "c"):
+        memory.add(sid, "web", turn)
+    assert len(memory) == 2 and memory.get("b") == {}  # "b" era la menos reciente
+    assert memory.get("a")["turns"] == 2
+
+    r = fakeredis.FakeRedis(decode_responses=True)
+    store = RedisUsage(r, ttl_s=3600, top_size=2)
+    for i, sid in enumerate(("x", "y", "z")):
+        store.add(sid, "web", TurnUsage(model="m", cost_usd=0.01 * (i + 1), latency_s=i + 1.0))
+    assert 0 < r.ttl("usage:x") <= 3600
+    assert r.zcard("usage:top:cost") == 2 and r.zcard("usage:top:latency") == 2
+    assert [sid for sid, _ in store.top("cost")] == ["z", "y"]
+
+
+@pytest.mark.asyncio
+async def test_usage_metrics_by_channel_and_model():
+    prom = pytest.importorskip("prometheus_client")
+    graph, deps = create_graph()
+
+    def tokens():
+        labels = {"channel": "telegram", "model": "test", "kind": "input"}
+        return prom.REGISTRY.get_sample_value("agent_tokens_total", labels) or 0.0
+
+    before = tokens()
+    await run_with_memory(graph, deps, None, "m", "hola", channel="telegram")
+    assert tokens() > before
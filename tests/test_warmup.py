@@ -0,0 +1,80 @@
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from infrastructure.http import HttpClientPool, http_clients
+from infrastructure.settings import settings
+from infrastructure.warmup import ConnectionWarmer, WarmupTarget
+from standins import StandInServer
+
+
+@pytest.mark.asyncio
+async def test_warmup_primes_pool_and_send_reuses_connection():
+    pytest.importorskip("cryptography")
+    async with StandInServer(tls=True) as srv:
+        pool = HttpClientPool(verify=srv.verify)
+        warmer = ConnectionWarmer([WarmupTarget("whatsapp", f"{srv.url}/v19.0/")], pool=pool)
+        assert not warmer.primed
+
+        assert await warmer.warm_once() == {"whatsapp": True}
+        assert warmer.primed and srv.connections == 1
+
+        # El envío real va por el mismo pool: no abre conexión (ni handshake TLS) nueva
+        r = await pool.get("whatsapp").post(f"{srv.url}/v19.0/123/messages", json={"x": 1})
+        assert r.status_code == 200
+        assert srv.connections == 1
+        assert [q.method for q in srv.requests] == ["HEAD", "POST"]
+        await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_warmup_opens_n_connections():
+    async with StandInServer() as srv:
+        pool = HttpClientPool()
+        warmer = ConnectionWarmer([WarmupTarget("openai", f"{srv.url}/models")], pool=pool, connections=3)
+        await warmer.warm_once()
+        assert srv.connections == 3
+        await pool.aclose()
+
+
+@pytest.mark.asyncio
+async def test_warmup_failure_keeps_not_primed():
+    async with StandInServer() as srv:
+        dead_url = srv.url  # el servidor se cierra al salir del bloque
+    pool = HttpClientPool()
+    warmer = ConnectionWarmer([WarmupTarget("telegram", dead_url)], pool=pool, timeout_s=1)
+    assert await warmer.warm_once() == {"telegram": False}
+    assert not warmer.primed
+    assert warmer.status["telegram"].last_error
+    await pool.aclose()
+
+
+def test_ready_reports_503_until_pools_primed(monkeypatch):
+    from infrastructure.server import build_app
+
+    reachable = {"ok": False}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if not reachable["ok"]:
+            raise httpx.ConnectError("upstream down", request=request)
+        return httpx.Response(401)  # cualquier respuesta HTTP sirve para calentar
+
+    monkeypatch.setattr(settings, "observability_enabled", False)
+    monkeypatch.setattr(settings, "warmup_enabled", True)
+    monkeypatch.setattr(settings, "warmup_interval_s", 0.01)
+    # pools limpios: otros tests pueden haber creado ya el cliente "openai" real
+    monkeypatch.setattr(http_clients, "_clients", {})
+    for name in ("openai", "whatsapp", "telegram"):
+        http_clients.get(name, transport=httpx.MockTransport(handler))
+
+    with TestClient(build_app()) as c:
+        r = c.get("/ready")
+        assert r.status_code == 503 and r.json()["pools"] is False
+
+        reachable["ok"] = True
+        deadline = time.time() + 5
+        while c.get("/ready").status_code != 200 and time.time() < deadline:
+            time.sleep(0.02)
+        assert c.get("/ready").json()["ok"] is True
@@ -0,0 +1,156 @@
+import hashlib
+import hmac
+import json
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from adapters.whatsapp_business import client as wa
+from adapters.whatsapp_business.catalog import OutgoingMessage, TextMessage
+from adapters.whatsapp_business.sender import WhatsAppCatalogSender
+from core.runtime import get_graph_and_deps
+from infrastructure import http as http_mod
+from infrastructure.http import HttpClientPool, pool_profile
+from infrastructure.settings import settings
+from standins import StandInServer
+
+
+@pytest.fixture(autouse=True)
+def _app_secret(monkeypatch):
+    # las firmas se calculan con este secreto: no depender de META_APP_SECRET del entorno
+    monkeypatch.setattr(settings, "meta_app_secret", "test-secret")
+
+
+def _recording_client(seen: list) -> httpx.AsyncClient:
+    def handler(req: httpx.Request) -> httpx.Response:
+        seen.append(req)
+        return httpx.Response(200, json={"messages": [{"id": "wamid.1"}]})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+async def test_send_message_uses_injected_client():
+    seen: list = []
+    async with _recording_client(seen) as c:
+        out = await wa.send_message(wa.get_text_message_input("34600000000", "hola"), client=c)
+    assert out["messages"][0]["id"] == "wamid.1"
+    assert seen[0].url.path.endswith(f"/{settings.whatsapp_phone_id}/messages")
+
+
+@pytest.mark.asyncio
+async def test_catalog_sender_accepts_client():
+    seen: list = []
+    async with _recording_client(seen) as c:
+        await WhatsAppCatalogSender(client=c).send_catalog_message(
+            OutgoingMessage(to="34600000000", component=TextMessage(body="hola"))
+        )
+    assert seen and b'"body":"hola"' in seen[0].content.replace(b" ", b"")
+
+
+@pytest.mark.asyncio
+async def test_shared_pool_reuses_one_connection_and_exports_stats(monkeypatch):
+    async with StandInServer() as srv:
+        monkeypatch.setattr(settings, "whatsapp_graph_base_url", srv.url)
+        pool = HttpClientPool()
+        client = pool.get("whatsapp")
+        for i in range(5):
+            await wa.send_message(wa.get_text_message_input("34600000000", f"msg {i}"), client=client)
+
+        assert srv.connections == 1  # un solo handshake para los 5 envíos
+        assert pool.stats() == {"whatsapp": {"active": 0, "idle": 1}}
+        await pool.aclose()
+
+
+def test_whatsapp_profile_enables_http2_only_with_h2(monkeypatch):
+    monkeypatch.setattr(http_mod, "HTTP2_AVAILABLE", False)
+    assert pool_profile("whatsapp")["http2"] is False
+    monkeypatch.setattr(http_mod, "HTTP2_AVAILABLE", True)
+    assert pool_profile("whatsapp")["http2"] is True
+    monkeypatch.setattr(settings, "whatsapp_http2", False)
+    assert pool_profile("whatsapp")["http2"] is False
+    assert pool_profile("telegram") == {}
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics_by_http_version():
+    prom = pytest.importorskip("prometheus_client")
+    labels = {"pool": "bench", "http_version": "HTTP/1.1"}
+    before = prom.REGISTRY.get_sample_value("agent_http_pool_requests_total", labels) or 0.0
+    async with StandInServer() as srv:
+        pool = HttpClientPool()
+        for _ in range(3):
+            await pool.get("bench").get(f"{srv.url}/ping")
+        await pool.aclose()
+    assert prom.REGISTRY.get_sample_value("agent_http_pool_requests_total", labels) == before + 3
+    assert prom.REGISTRY.get_sample_value("agent_http_pool_in_flight", {"pool": "bench"}) == 0
+
+
+def test_webhook_replies_through_injected_catalog_sender(monkeypatch):
+    from infrastructure.server import app
+
+    sent: list = []
+
+    class FakeSender:
+        async def send_catalog_message(self, payload):
+            sent.append(payload)
+
+    _graph, deps = get_graph_and_deps()
+    monkeypatch.setattr(deps, "catalog_sender", FakeSender())
+    body = {
+        "entry": [
+            {
+                "changes": [
+                    {
+                        "value": {
+                            "contacts": [{"wa_id": "34600000000"}],
+                            "messages": [{"from": "34600000000", "type": "text", "text": {"body": "hola"}}],
+                        }
+                    }
+                ]
+            }
+        ]
+    }
+    raw = json.dumps(body).encode()
+    sig = hmac.new(settings.meta_app_secret.encode(), raw, hashlib.sha256).hexdigest()
+    r = TestClient(app).post(
+        "/webhooks/whatsapp/webhook",
+        content=raw,
+        headers={"Content-Type": "application/json", "X-Hub-Signature-256": f"sha256={sig}"},
+    )
+    assert r.status_code == 200
+    assert [m.to for m in sent] == ["34600000000"]
+
+
+def test_compiled_message_matches_catalog_payload():
+    from adapters.whatsapp_business.cards import dummy_card_message
+    from adapters.whatsapp_business.catalog import TemplateMessage
+    from adapters.whatsapp_business.compiled import CompiledMessage, slot
+
+    card = dummy_card_message("34600000000")
+    static = CompiledMessage(card.component)
+    assert static.slots == frozenset()
+    assert json.loads(static.render("34600000000")) == card.build()
+
+    tpl = CompiledMessage(
+        TemplateMessage(
+            name="pedido",
+            components=[{"type": "body", "parameters": [{"type": "text", "text": f"Hola {slot('name')}"}]}],
+        )
+    )
+    assert tpl.slots == {"name"}
+    body = json.loads(tpl.render("346", name='Ana "ñ"\n'))
+    assert body["to"] == "346"
+    assert body["template"]["components"][0]["parameters"][0]["text"] == 'Hola Ana "ñ"\n'
+    with pytest.raises(KeyError):
+        tpl.render("346")
+
+
+@pytest.mark.asyncio
+async def test_send_message_posts_precompiled_bytes_as_is():
+    seen: list = []
+    async with _recording_client(seen) as c:
+        await wa.send_message(b'{"to":"346","type":"text"}', to="346", client=c)
+    assert seen[0].content == b'{"to":"346","type":"text"}'
+    assert seen[0].headers["content-type"] == "application/json"
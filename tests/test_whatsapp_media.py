@@ -0,0 +1,131 @@
+import asyncio
+import hashlib
+
+import httpx
+import pytest
+
+from adapters.whatsapp_business.catalog import ButtonsMessage, ImageMessage, MediaHeader, ReplyButton
+from adapters.whatsapp_business.media import MediaTooLarge, MediaUploader, download_media, inbound_media
+from adapters.whatsapp_business.models import Message
+from infrastructure.dedup import InMemoryTTLCache
+
+ASSET = b"\x89PNG" + bytes(200_000)
+
+
+def _graph(calls: list, *, upload_status: int = 200) -> httpx.AsyncClient:
+    async def handler(req: httpx.Request) -> httpx.Response:
+        calls.append((req.method, req.url.path))
+        if req.url.path.endswith("/media") and req.method == "POST":
+            await asyncio.sleep(0.01)  # da tiempo a que lleguen envíos concurrentes
+            body = await req.aread()
+            assert b'name="messaging_product"' in body and ASSET[:4] in body
+            return httpx.Response(upload_status, json={"id": f"media-{len(calls)}"})
+        if req.url.path.endswith("/MID"):
+            return httpx.Response(
+                200,
+                json={"url": "https://cdn.test/blob", "mime_type": "image/png", "sha256": hashlib.sha256(ASSET).hexdigest()},
+            )
+        return httpx.Response(200, content=ASSET, headers={"Content-Type": "image/png"})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_inbound_media_reads_known_and_extra_types():
+    image = Message.model_validate({"type": "image", "image": {"id": "1", "mime_type": "image/jpeg"}})
+    doc = Message.model_validate({"type": "document", "document": {"id": "2"}})
+    assert inbound_media(image) == {"kind": "image", "id": "1", "mime_type": "image/jpeg"}
+    assert inbound_media(doc) == {"kind": "document", "id": "2", "mime_type": None}
+    assert inbound_media(Message.model_validate({"type": "text", "text": {"body": "x"}})) is None
+
+
+@pytest.mark.asyncio
+async def test_download_streams_to_disk_named_by_content(tmp_path):
+    calls: list = []
+    async with _graph(calls) as c:
+        path = await download_media("MID", tmp_path, client=c)
+        assert path.read_bytes() == ASSET and path.suffix == ".png"
+        with pytest.raises(MediaTooLarge):
+            await download_media("MID", tmp_path, client=c, max_bytes=1000)
+    assert [p.name for p in tmp_path.iterdir()] == [path.name]  # sin .part huérfanos
+
+
+
+@pytest.mark.asyncio
+async def test_inbound_media_is_archived_off_the_reply_path_with_one_placeholder(tmp_path, monkeypatch):
+    from adapters.whatsapp_business import handler as wa_handler
+    from adapters.whatsapp_business import media as media_mod
+    from core.runtime import get_graph_and_deps
+    from infrastructure.inbound import InboundJob
+
+    monkeypatch.setattr("infrastructure.settings.settings.whatsapp_media_dir", str(tmp_path))
+    downloaded = asyncio.Event()
+    turns: list = []
+
+    async def slow_download(media_id):
+        await asyncio.sleep(0.2)
+        downloaded.set()
+
+    async def fake_run_turn(mm, session_id, user_text, channel):
+        turns.append(user_text)
+        return "ok", []
+
+    class Sender:
+        async def send_catalog_message(self, payload):
+            pass
+
+    monkeypatch.setattr(media_mod, "download_media", slow_download)
+    monkeypatch.setattr(wa_handler, "run_turn", fake_run_turn)
+    _graph, deps = get_graph_and_deps()
+    monkeypatch.setattr(deps, "catalog_sender", Sender())
+
+    msg = Message.model_validate({"from": "A", "id": "w1", "type": "image", "image": {"id": "MID"}})
+    job = InboundJob("whatsapp", "A", wa_handler.extract_user_text(msg), {"wa_id": "A", "media": inbound_media(msg)})
+    await asyncio.wait_for(wa_handler.process_message(job), 0.1)  # no espera a la descarga
+    assert turns == ["[image]"]  # un solo marcador y sin rutas locales
+    await asyncio.wait_for(downloaded.wait(), 1)
+
+
+def test_prune_removes_only_files_older_than_the_retention(tmp_path):
+    import os
+    import time
+
+    from adapters.whatsapp_business.media import prune_media_dir
+
+    old, fresh = tmp_path / "old.png", tmp_path / "fresh.png"
+    old.write_bytes(b"x")
+    fresh.write_bytes(b"y")
+    os.utime(old, (time.time() - 3600, time.time() - 3600))
+    assert prune_media_dir(tmp_path, max_age_s=60) == 1
+    assert [p.name for p in tmp_path.iterdir()] == ["fresh.png"]
+
+
+@pytest.mark.asyncio
+async def test_uploader_uploads_once_and_reuses_media_id(tmp_path, monkeypatch):
+    monkeypatch.setattr("infrastructure.settings.settings.whatsapp_media_dir", str(tmp_path))
+    calls: list = []
+    async with _graph(calls) as c:
+        uploader = MediaUploader(InMemoryTTLCache(60), client=c, fetch_client=c, phone_id="P")
+        card = ButtonsMessage(
+            body_text="hola",
+            header=MediaHeader(kind="image", link="https://cdn.test/card.png"),
+            buttons=[ReplyButton(id="a", title="A")],
+        )
+        cards = await asyncio.gather(*(uploader.prepare(card) for _ in range(5)))
+        media_id = cards[0].header.media_id
+        assert media_id and all(x.header.media_id == media_id for x in cards)
+        assert cards[0].to_payload()["interactive"]["header"] == {"type": "image", "image": {"id": media_id}}
+
+        # misma imagen desde otra URL: se descarga para hashear, pero no se vuelve a subir
+        other = await uploader.prepare(ImageMessage(link="https://cdn.test/copy.png"))
+        assert other.media_id == media_id
+        assert sum(1 for m, p in calls if m == "POST") == 1
+        assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_upload_failure_falls_back_to_link():
+    calls: list = []
+    async with _graph(calls, upload_status=500) as c:
+        uploader = MediaUploader(InMemoryTTLCache(60), client=c, fetch_client=c)
+        image = ImageMessage(link="https://cdn.test/a.png")
+        assert await uploader.prepare(image) is image
@@ -0,0 +1,204 @@
+import pytest
+import asyncio
+import hashlib
+import hmac
+import json
+
+from fastapi.testclient import TestClient
+
+from adapters.whatsapp_business import handler as wa_handler
+from adapters.whatsapp_business.handler import extract_user_text, iter_messages, parse_webhook
+from adapters.whatsapp_business.models import Webhook
+from core.runtime import get_graph_and_deps
+from infrastructure.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def _app_secret(monkeypatch):
+    # las firmas se calculan con este secreto: no depender de META_APP_SECRET del entorno
+    monkeypatch.setattr(settings, "meta_app_secret", "test-secret")
+
+
+def _msg(wa_id: str, text: str) -> dict:
+    return {"from": wa_id, "id": f"wamid.{wa_id}.{text}", "type": "text", "text": {"body": text}}
+
+
+BATCH = {
+    "entry": [
+        {
+            "changes": [
+                {"value": {"contacts": [{"wa_id": "A"}], "messages": [_msg("A", "1"), _msg("B", "1")]}},
+                {"value": {"statuses": [{"id": "wamid.x", "status": "read"}]}},
+            ]
+        },
+        {"changes": [{"value": {"messages": [_msg("A", "2"), _msg("C", "1")]}}]},
+    ]
+}
+
+
+def _post(body: dict):
+    from infrastructure.server import app
+
+    raw = json.dumps(body).encode()
+    sig = hmac.new(settings.meta_app_secret.encode(), raw, hashlib.sha256).hexdigest()
+    return TestClient(app).post(
+        "/webhooks/whatsapp/webhook",
+        content=raw,
+        headers={"Content-Type": "application/json", "X-Hub-Signature-256": f"sha256={sig}"},
+    )
+
+
+def test_iter_messages_walks_every_entry_change_and_message():
+    webhook = parse_webhook(json.dumps(BATCH).encode())
+    assert webhook is not None
+    assert [(w, extract_user_text(m)) for w, m in iter_messages(webhook)] == [
+        ("A", "1"),
+        ("B", "1"),
+        ("A", "2"),
+        ("C", "1"),
+    ]
+    assert list(iter_messages(Webhook.model_validate({"entry": [{"changes": [{}]}]}))) == []
+    assert parse_webhook(b"[]") is None and parse_webhook(b"") is None
+
+
+def test_typed_ingest_tolerates_unknown_message_and_status_types():
+    body = {
+        "object": "whatsapp_business_account",
+        "entry": [
+            {
+                "id": "1",
+                "changes": [
+                    {
+                        "field": "messages",
+                        "value": {
+                            "messages": [
+                                {"from": "A", "id": "w1", "type": "order", "order": {"catalog_id": "c"}},
+                                {"from": "A", "id": "w2", "type": "image", "image": {"id": "m1"}},
+                            ],
+                            "statuses": [{"id": "w0", "status": "brand_new_status", "pricing": {}}],
+                        },
+                    }
+                ],
+            }
+        ],
+    }
+    webhook = parse_webhook(json.dumps(body).encode())
+    assert webhook is not None
+    msgs = [m for _w, m in iter_messages(webhook)]
+    assert [extract_user_text(m) for m in msgs] == ["[order]", "[image]"]
+    assert msgs[0].model_extra == {"order": {"catalog_id": "c"}}
+    assert webhook.entry[0].changes[0].value.statuses[0].status == "brand_new_status"
+
+
+def test_batch_is_fanned_out_concurrently_across_wa_ids_and_ordered_within(monkeypatch):
+    log: list = []
+    active = {"now": 0, "peak": 0}
+
+    async def fake_run_turn(mm, session_id, user_text, channel):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        await asyncio.sleep(0.02 if user_text == "1" else 0)
+        log.append((session_id, user_text))
+        active["now"] -= 1
+        return f"re:{user_text}", []
+
+    sent: list = []
+
+    class FakeSender:
+        async def send_catalog_message(self, payload):
+            sent.append((payload.to, payload.component.body))
+
+    _graph, deps = get_graph_and_deps()
+    monkeypatch.setattr(deps, "catalog_sender", FakeSender())
+    monkeypatch.setattr(wa_handler, "run_turn", fake_run_turn)
+
+    assert _post(BATCH).status_code == 200
+    assert sorted(sent) == [("A", "re:1"), ("A", "re:2"), ("B", "re:1"), ("C", "re:1")]
+    assert [t for w, t in log if w == "A"] == ["1", "2"]
+    assert active["peak"] == 3  # A, B y C a la vez
+
+
+def test_status_only_posts_take_the_fast_path(monkeypatch):
+    from adapters.whatsapp_business import statuses
+
+    tracker = statuses.StatusTracker(max_entries=2)
+    monkeypatch.setattr(statuses, "_tracker", tracker)
+
+    def no_memory():
+        raise AssertionError("los statuses no deben tocar la memoria")
+
+    monkeypatch.setattr(wa_handler, "get_memory_manager", no_memory)
+
+    def status(wamid: str, state: str, **extra) -> dict:
+        return {"id": wamid, "status": state, "pricing": {"billable": True}, **extra}
+
+    body = {
+        "entry": [
+            {
+                "changes": [
+                    {
+                        "field": "messages",
+                        "value": {
+                            "statuses": [
+                                status("w1", "sent"),
+                                status("w1", "read"),
+                                status("w1", "delivered"),  # desordenado: no retrocede
+                                status("w2", "failed", errors=[{"code": 131026, "title": "x"}]),
+                            ]
+                        },
+                    }
+                ]
+            }
+        ]
+    }
+    raw = json.dumps(body).encode()
+    assert statuses.is_status_only(raw) and not statuses.is_status_only(json.dumps(BATCH).encode())
+    assert _post(body).status_code == 200
+    assert tracker.get("w1") == "read" and tracker.get("w2") == "failed"
+    assert tracker.counts == {"sent": 1, "read": 1, "delivered": 1, "failed": 1}
+    assert tracker.errors == {131026: 1}
+
+    _post({"entry": [{"changes": [{"value": {"statuses": [status("w3", "sent")]}}]}]})
+    assert len(tracker) == 2 and tracker.get("w1") is None  # índice acotado
+
+
+def test_message_text_mentioning_messages_key_is_not_status_only():
+    from adapters.whatsapp_business.statuses import is_status_only
+
+    body = {"entry": [{"changes": [{"value": {"messages": [_msg("A", '{"statuses": 1}')]}}]}]}
+    assert not is_status_only(json.dumps(body).encode())
+    text_only = json.dumps({"x": '"messages": "statuses"'}).encode()
+    assert not is_status_only(text_only)  # solo aparece escapado: sin clave "statuses"
+
+
+def test_one_malformed_message_does_not_drop_the_rest_of_the_batch(monkeypatch):
+    prom = pytest.importorskip("prometheus_client")
+
+    def invalid(kind):
+        return prom.REGISTRY.get_sample_value("agent_whatsapp_invalid_elements_total", {"kind": kind}) or 0.0
+
+    async def fake_run_turn(mm, session_id, user_text, channel):
+        return f"re:{user_text}", []
+
+    sent: list = []
+
+    class FakeSender:
+        async def send_catalog_message(self, payload):
+            sent.append((payload.to, payload.component.body))
+
+    _graph, deps = get_graph_and_deps()
+    monkeypatch.setattr(deps, "catalog_sender", FakeSender())
+    monkeypatch.setattr(wa_handler, "run_turn", fake_run_turn)
+
+    broken = {"from": "M", "id": "wamid.bad", "type": "text", "text": {"body": ["no", "es", "texto"]}}
+    body = {
+        "entry": [
+            {"changes": [{"value": {"messages": [broken, _msg("M", "ok")], "statuses": [{"id": 5}]}}]},
+            "basura",
+            {"changes": [{"value": {"messages": [_msg("N", "ok")]}}]},
+        ]
+    }
+    before = (invalid("message"), invalid("status"), invalid("entry"))
+    assert _post(body).status_code == 200
+    assert sorted(sent) == [("M", "re:ok"), ("N", "re:ok")]
+    assert (invalid("message"), invalid("status"), invalid("entry")) == tuple(b + 1 for b in before)